@@ -4,6 +4,10 @@ Plugin contract:
 - provide function `can_handle(query: str) -> bool`
 - provide function `handle(query: str) -> dict|bool` which performs action and returns
   {'handled': True, 'candidate': path} on success (or True) and False if not handled.
+- optionally provide `KEYWORDS`, a static set of phrases; the loader only calls
+  can_handle() for queries that contain one of them.
+- optionally provide `MANIFEST`, a literal dict the loader reads without importing
+  the module (name, version, keywords, keyword_files); see io/plugin_loader.py.
 """
 import os
 import sys
@@ -14,6 +18,31 @@ import json
 import re
 from pathlib import Path
 
+# Static metadata read by the plugin loader without importing this module:
+# keep it a plain literal.
+MANIFEST = {
+    'name': 'apps',
+    'version': '1.1',
+    'keywords': ['باز', 'باز کن', 'open', 'اجرای', 'اجرا کن', 'run'],
+    'keyword_files': [{'path': '../config/apps.json', 'sections': ['apps', 'aliases']}],
+}
+
+try:
+    # shared vocabulary matcher from the assistant package (io/fuzzy_index.py)
+    from fuzzy_index import FuzzyIndex
+except Exception:
+    FuzzyIndex = None
+try:
+    # shared query folding (io/text_normalizer.py)
+    from text_normalizer import normalize_text as _fold
+except Exception:
+    _fold = None
+try:
+    # shared, hot-reloaded apps.json (io/config_service.py)
+    import config_service as _config_service
+except Exception:
+    _config_service = None
+
 # Prefer to reuse main logger if available; otherwise create a plugin logger
 def _get_logger():
     # Try to retrieve the logger object from loaded modules (avoid importing stdlib io)
@@ -33,6 +62,10 @@ CONFIG = Path(__file__).resolve().parent.parent / 'config' / 'apps.json'
 
 
 def load_config():
+    """(apps, aliases) from apps.json; parsed once by the shared config service when available."""
+    if _config_service is not None:
+        snapshot = _config_service.apps(CONFIG).snapshot
+        return dict(snapshot['apps']), dict(snapshot['aliases'])
     apps = {}
     aliases = {}
     try:
@@ -53,31 +86,100 @@ def load_config():
     return apps, aliases
 
 
-APPS, ALIASES = load_config()
-
-
 def _normalize_text(t: str) -> str:
+    if _fold is not None:
+        return _fold(t)
     return (t or '').lower().strip()
 
 
+def _build_fuzzy(apps, aliases):
+    if FuzzyIndex is None:
+        return None
+    index = FuzzyIndex()
+    for k in apps.keys():
+        index.add(k, k)
+    for a, k in aliases.items():
+        index.add(a, k)
+    return index
+
+
+# common verbs + app name patterns
+VERBS = list(MANIFEST['keywords'])
+# whole words only ('باز' must not match inside 'بازی', 'run' inside 'running'); longest first
+_VERB_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(_normalize_text(v)) for v in
+                                                sorted(VERBS, key=len, reverse=True)) + r')\b')
+# Persian object marker between a name and a final verb ("استیم رو باز کن")
+_OBJECT_MARKERS = ('رو', 'را')
+
+
+def _rebuild(snapshot=None):
+    """(Re)build everything derived from apps.json; subscribed to config changes.
+
+    Reloads are applied by io between commands (config_service.SERVICE.poll()); the tables
+    are still built first and swapped in with one assignment.
+    """
+    global APPS, ALIASES, _KEY_PATTERNS, _ALIAS_PATTERNS, KEYWORDS, _FUZZY
+    if snapshot is not None:
+        apps, aliases = dict(snapshot['apps']), dict(snapshot['aliases'])
+    else:
+        apps, aliases = load_config()
+    # Whole-word patterns compiled once per config (APPS order first, then aliases)
+    key_patterns = [(k, re.compile(r'\b' + re.escape(_normalize_text(k)) + r'\b')) for k in apps.keys()]
+    alias_patterns = [(k, re.compile(r'\b' + re.escape(_normalize_text(a)) + r'\b')) for a, k in aliases.items()]
+    # Dispatch prefilter: can_handle() can only succeed if one of these occurs in the query
+    keywords = frozenset(_normalize_text(k) for k in list(apps.keys()) + list(aliases.keys()) + VERBS)
+    # Misheard app names ("vscod", "استیمم") resolved against keys and aliases
+    fuzzy = _build_fuzzy(apps, aliases)
+    APPS, ALIASES, _KEY_PATTERNS, _ALIAS_PATTERNS, KEYWORDS, _FUZZY = \
+        apps, aliases, key_patterns, alias_patterns, keywords, fuzzy
+
+
+_rebuild()
+if _config_service is not None:
+    _config_service.apps(CONFIG).subscribe(_rebuild)
+
+
+def _fuzzy_app_key(q: str):
+    if _FUZZY is None:
+        return None
+    hits = _FUZZY.search(q)
+    if not hits:
+        return None
+    return max(hits.items(), key=lambda kv: kv[1][0])[0]
+
+
+def _verb_object(q: str):
+    """The words a launch verb applies to: those after it ("open vscod", "اجرای استیمم"), or
+    before it when the verb ends the query ("استیمم رو باز کن"); None without a verb."""
+    m = _VERB_PATTERN.search(q)
+    if not m:
+        return None
+    after = q[m.end():].strip()
+    if after:
+        return after
+    words = q[:m.start()].split()
+    while words and words[-1] in _OBJECT_MARKERS:
+        words.pop()
+    return ' '.join(words)
+
+
+def _misheard_app_key(q: str):
+    """Fuzzy app match, only for the object of an explicit launch verb."""
+    target = _verb_object(q)
+    return _fuzzy_app_key(target) if target else None
+
+
 def can_handle(query: str) -> bool:
     q = _normalize_text(query)
     # match whole words for keys and aliases to reduce false positives
-    for k in APPS.keys():
-        if re.search(r'\b' + re.escape(k) + r'\b', q):
+    for _k, pattern in _KEY_PATTERNS:
+        if pattern.search(q):
             return True
-    for a in ALIASES.keys():
-        if re.search(r'\b' + re.escape(a) + r'\b', q):
+    for _k, pattern in _ALIAS_PATTERNS:
+        if pattern.search(q):
             return True
-    # also common verbs + app name patterns
-    verbs = ['باز', 'باز کن', 'open', 'اجرای', 'اجرا کن', 'run']
-    for v in verbs:
-        if v in q:
-            # if any known app key appears with a verb, claim it
-            for k in list(APPS.keys()) + list(ALIASES.keys()):
-                if k in q:
-                    return True
-    return False
+    # with an explicit launch verb, also accept a misheard app name
+    return _misheard_app_key(q) is not None
 
 
 def resolve_candidate(app_key: str, username: str) -> list:
@@ -128,16 +230,18 @@ def handle(query: str) -> typing.Union[bool, dict]:
 
     app_key = None
     # Find by key
-    for k in APPS.keys():
-        if re.search(r'\b' + re.escape(k) + r'\b', q):
+    for k, pattern in _KEY_PATTERNS:
+        if pattern.search(q):
             app_key = k
             break
     # Find by alias
     if not app_key:
-        for a, k in ALIASES.items():
-            if re.search(r'\b' + re.escape(a) + r'\b', q):
+        for k, pattern in _ALIAS_PATTERNS:
+            if pattern.search(q):
                 app_key = k
                 break
+    if not app_key:
+        app_key = _misheard_app_key(q)
     if not app_key:
         return False
 
@@ -0,0 +1,154 @@
+"""Microphone selection, cached per process and persisted across restarts.
+
+Enumerating PortAudio devices is slow on some hosts, and takecommand() used
+to do it (plus the loopback/stereo-mix heuristic) for every command.
+DeviceManager enumerates once, remembers the chosen device and the listener's
+calibrated energy threshold in ../config/audio_device.json, and only
+enumerates again when opening the device fails. A stored choice is reused
+only while the device-list fingerprint matches, so plugging in or removing a
+device triggers a fresh selection (and a fresh calibration).
+
+Tests and headless runs can inject the device list and the opener:
+
+    DeviceManager(state_path=tmp, list_devices=lambda: ['Stereo Mix', 'USB Microphone'],
+                  opener=lambda index: FakeSource())
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from lazy_imports import lazy_import
+
+sr = lazy_import('speech_recognition')
+
+STATE_PATH = Path(__file__).resolve().parent.parent / 'config' / 'audio_device.json'
+
+_logger = logging.getLogger('io.audio')
+
+
+def choose_microphone(names) -> Optional[int]:
+    """Index of the first real microphone, skipping loopback/stereo-mix; None = system default."""
+    names = list(names)
+    for i, name in enumerate(names):
+        n = (name or '').lower()
+        if 'loopback' in n or 'stereo mix' in n:
+            continue
+        if 'microphone' in n or 'mic' in n or len(names) == 1:
+            return i
+    return None
+
+
+def fingerprint(names) -> str:
+    return hashlib.sha1('\n'.join(str(n) for n in names).encode('utf-8')).hexdigest()
+
+
+def _list_portaudio_devices() -> list:
+    return list(sr.Microphone.list_microphone_names())
+
+
+def _open_microphone(index):
+    return sr.Microphone(device_index=index)
+
+
+class DeviceManager:
+    def __init__(self, state_path=STATE_PATH, list_devices: Optional[Callable] = None,
+                 opener: Optional[Callable] = None) -> None:
+        self.state_path = Path(state_path)
+        self.list_devices = list_devices or _list_portaudio_devices
+        self.opener = opener or _open_microphone
+        self.enumerations = 0
+        self._names: Optional[list] = None
+        self._selection = None  # (index, name) once selected
+        self._state = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            _logger.debug('Ignoring unreadable audio device state %s: %s', self.state_path, e)
+            return {}
+
+    def _save_state(self) -> None:
+        """Write the state atomically (temp file + replace) so a crash never leaves half a file."""
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix='.audio_device.', dir=str(self.state_path.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.state_path)
+        except Exception:
+            _logger.exception('Failed to save audio device state to %s', self.state_path)
+
+    def devices(self) -> list:
+        """The device names, enumerated once and then cached."""
+        if self._names is None:
+            try:
+                self._names = list(self.list_devices())
+            except Exception:
+                _logger.exception('Listing audio devices failed')
+                self._names = []
+            self.enumerations += 1
+        return self._names
+
+    def select(self) -> tuple:
+        """Return (index, name) of the microphone to use, reusing the stored choice when the devices are unchanged."""
+        with self._lock:
+            if self._selection is not None:
+                return self._selection
+            names = self.devices()
+            fp = fingerprint(names)
+            if self._state.get('fingerprint') == fp and 'index' in self._state:
+                index = self._state['index']
+                _logger.debug('Reusing stored microphone %r', self._state.get('name'))
+            else:
+                index = choose_microphone(names)
+                name = names[index] if index is not None else None
+                # a different device list invalidates the stored choice and its calibration
+                self._state = {'fingerprint': fp, 'index': index, 'name': name}
+                self._save_state()
+                _logger.info('Selected microphone %r (index %s)', name, index)
+            name = names[index] if index is not None and index < len(names) else None
+            self._selection = (index, name)
+            return self._selection
+
+    @property
+    def energy_threshold(self) -> Optional[float]:
+        """Calibrated threshold stored for the selected device, if any."""
+        self.select()
+        value = self._state.get('energy_threshold')
+        return float(value) if isinstance(value, (int, float)) else None
+
+    def save_threshold(self, value: float) -> None:
+        """Persist the listener's energy threshold (skipped when it moved by less than 10%)."""
+        old = self._state.get('energy_threshold')
+        if isinstance(old, (int, float)) and old and abs(value - old) / old < 0.10:
+            return
+        self._state['energy_threshold'] = round(float(value), 1)
+        self._save_state()
+
+    def invalidate(self) -> None:
+        """Forget the enumeration and selection; the next select() enumerates again."""
+        with self._lock:
+            self._names = None
+            self._selection = None
+
+    def open(self):
+        """Open the selected device; on failure re-enumerate so the next attempt can pick another one."""
+        index, _name = self.select()
+        try:
+            return self.opener(index)
+        except Exception:
+            _logger.warning('Opening microphone %s failed; devices will be enumerated again', index)
+            self.invalidate()
+            raise
@@ -0,0 +1,697 @@
+"""One audio output for the whole assistant: named channels mixed on one thread.
+
+Music played through pygame.mixer.music, online speech loaded its mp3 into
+the same pygame.mixer.music (which stopped the song that was playing) and
+every notification chime started a thread for a winsound.PlaySound call, so
+chimes were Windows-only. AudioOutput owns the device instead:
+
+    AUDIO = audio_output.default()
+    AUDIO.play(MUSIC, song_path)                   # streamed; replaces the current song
+    AUDIO.play(SPEECH, mp3_bytes).wait()           # music is ducked while speech plays
+    AUDIO.play(ALERTS, AUDIO.sound('info.wav'))    # preloaded: decoded once, then reused
+    with AUDIO.ducked():                           # duck for speech the mixer does not play
+        engine.runAndWait()
+
+- channels: music (one stream at a time, pause/resume), speech and alerts
+  (voices overlap); each channel has its own volume
+- ducking: while speech plays or a ducked() block is open, the music gain
+  ramps down to `duck_gain` over `attack` seconds and back over `release`
+- one mixing thread sums the active voices block by block (NumPy) and writes
+  16-bit PCM to a sink; it sleeps while nothing is playing
+- sinks: PipeSink feeds aplay / pw-cat / paplay on Linux, PygameSink queues
+  blocks on one pygame channel elsewhere, WavSink writes a file and NullSink
+  discards; the last two are for headless runs and tests
+- decoding: WAV with the wave module, other formats with ffmpeg when it is
+  on PATH, else pygame; a song is never decoded whole: without ffmpeg it is
+  streamed by pygame.mixer.music, which the mixer thread pauses, stops and
+  ducks like any other music voice
+
+Every sink keeps at most `lead` seconds ahead of the clock, so stop() and
+ducking are heard within a block or two. stats counts blocks mixed, voices
+started and late blocks (mixing fell behind real time).
+"""
+from __future__ import annotations
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pygame = lazy_import('pygame')
+
+_logger = logging.getLogger('io.audio_output')
+
+MUSIC = 'music'
+SPEECH = 'speech'
+ALERTS = 'alerts'
+CHANNELS = (MUSIC, SPEECH, ALERTS)
+
+RATE = 22050
+BLOCK_MS = 20
+
+# Linux players that take raw 16-bit PCM on stdin, in order of preference
+_PIPE_PLAYERS = (
+    ('pw-cat', lambda rate, ch: ['pw-cat', '--playback', '--format', 's16', '--rate', str(rate),
+                                 '--channels', str(ch), '-']),
+    ('paplay', lambda rate, ch: ['paplay', '--raw', '--format=s16le', f'--rate={rate}', f'--channels={ch}']),
+    ('aplay', lambda rate, ch: ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-r', str(rate), '-c', str(ch)]),
+)
+
+
+# --- decoding ------------------------------------------------------------------------
+
+
+def _from_pcm(raw, width: int, in_channels: int, channels: int):
+    """Interleaved little-endian PCM -> float32 array of shape (frames, channels)."""
+    if width == 2:
+        x = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 4:
+        x = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f'unsupported sample width {width}')
+    x = x[:len(x) - len(x) % in_channels].reshape(-1, in_channels)
+    if in_channels == channels:
+        return x
+    if channels == 1:
+        return x.mean(axis=1, keepdims=True)
+    if in_channels == 1:
+        return np.repeat(x, channels, axis=1)
+    return x[:, :channels]
+
+
+def _resample(x, rate: int, target: int):
+    if rate == target or not len(x):
+        return x
+    from audio_preprocess import resample
+    return np.stack([resample(x[:, c], rate, target) for c in range(x.shape[1])], axis=1)
+
+
+def _read_wav(source, rate: int, channels: int):
+    with wave.open(source, 'rb') as w:
+        x = _from_pcm(w.readframes(w.getnframes()), w.getsampwidth(), w.getnchannels(), channels)
+        return _resample(x, w.getframerate(), rate)
+
+
+def _ffmpeg_args(rate: int, channels: int, source: str) -> list:
+    """ffmpeg decoding source (a path, or 'pipe:0' for stdin) to raw 16-bit PCM on stdout."""
+    stdin = [] if source == 'pipe:0' else ['-nostdin']
+    return [shutil.which('ffmpeg'), '-v', 'error', *stdin, '-i', source,
+            '-f', 's16le', '-ac', str(channels), '-ar', str(rate), 'pipe:1']
+
+
+def decode(source, rate: int = RATE, channels: int = 2):
+    """Decode a path or encoded bytes (wav/mp3/ogg/...) to float32 (frames, channels) at rate."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+        if data[:4] == b'RIFF':
+            return _read_wav(io.BytesIO(data), rate, channels)
+        if shutil.which('ffmpeg'):
+            out = subprocess.run(_ffmpeg_args(rate, channels, 'pipe:0'), input=data,
+                                 stdout=subprocess.PIPE, check=True).stdout
+            return _from_pcm(out, 2, channels, channels)
+        return _pygame_decode(io.BytesIO(data), rate, channels)
+    path = str(source)
+    if path.lower().endswith('.wav'):
+        return _read_wav(path, rate, channels)
+    if shutil.which('ffmpeg'):
+        out = subprocess.run(_ffmpeg_args(rate, channels, path), stdout=subprocess.PIPE, check=True).stdout
+        return _from_pcm(out, 2, channels, channels)
+    return _pygame_decode(path, rate, channels)
+
+
+def _pygame_decode(source, rate: int, channels: int):
+    mixer = pygame.mixer
+    if not mixer.get_init():
+        mixer.init(frequency=rate, size=-16, channels=channels)
+    freq, size, mixer_channels = mixer.get_init()
+    raw = mixer.Sound(file=source).get_raw()
+    x = _from_pcm(raw, abs(size) // 8, mixer_channels, channels)
+    return _resample(x, freq, rate)
+
+
+# --- sounds and voices -----------------------------------------------------------------
+
+
+class Sound:
+    """Decoded samples, ready to mix; play it as often as needed."""
+    __slots__ = ('samples', 'rate', 'name')
+
+    def __init__(self, samples, rate: int, name: str = '') -> None:
+        self.samples = samples
+        self.rate = rate
+        self.name = name
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / float(self.rate)
+
+    def __repr__(self) -> str:
+        return f'<Sound {self.name or "buffer"} {self.duration:.2f}s>'
+
+
+class _ArrayVoice:
+    def __init__(self, samples, loop: bool = False) -> None:
+        self.samples = samples
+        self.loop = loop
+        self.pos = 0
+
+    def read(self, n: int):
+        """Up to n frames (a view, no copy); fewer only at the end."""
+        if self.loop and len(self.samples):
+            if self.pos + n > len(self.samples):
+                idx = (self.pos + np.arange(n)) % len(self.samples)
+                self.pos = (self.pos + n) % len(self.samples)
+                return self.samples[idx]
+        chunk = self.samples[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+
+class _StreamVoice:
+    """Music decoded on the fly by ffmpeg, read half a second at a time."""
+
+    def __init__(self, path: str, rate: int, channels: int) -> None:
+        self.channels = channels
+        self.chunk = rate // 2
+        self.proc = subprocess.Popen(_ffmpeg_args(rate, channels, path), stdout=subprocess.PIPE,
+                                     stdin=subprocess.DEVNULL)
+        self.buffer = np.zeros((0, channels), dtype=np.float32)
+
+    def read(self, n: int):
+        if len(self.buffer) < n and self.proc.stdout is not None:
+            raw = self.proc.stdout.read(max(n, self.chunk) * self.channels * 2)
+            if raw:
+                self.buffer = np.concatenate([self.buffer, _from_pcm(raw, 2, self.channels, self.channels)])
+        chunk, self.buffer = self.buffer[:n], self.buffer[n:]
+        return chunk
+
+    def close(self) -> None:
+        try:
+            self.proc.kill()
+            self.proc.wait(1)
+        except Exception:
+            pass
+
+
+class _PygameMusicVoice:
+    """A song streamed from disk by pygame.mixer.music (no ffmpeg to decode it for the mixer).
+
+    SDL plays it; read() returns silence while it does, so the mixer keeps its
+    clock and ducking ramp, and gain() sets the stream's volume each block.
+    """
+    external = True
+
+    def __init__(self, path: str, rate: int, channels: int) -> None:
+        mixer = pygame.mixer
+        if not mixer.get_init():
+            mixer.init(frequency=rate, size=-16, channels=channels, buffer=512)
+        self.music = mixer.music
+        self.music.load(path)
+        self.music.play()
+        self.paused = False
+        self._silence = np.zeros((0, channels), dtype=np.float32)
+        self._volume = None
+
+    def read(self, n: int):
+        if len(self._silence) != n:
+            self._silence = np.zeros((n, self._silence.shape[1]), dtype=np.float32)
+        # get_busy() is also False while paused (a block mixed just as pause() lands)
+        return self._silence if self.paused or self.music.get_busy() else self._silence[:0]
+
+    def gain(self, volume: float) -> None:
+        volume = round(volume, 3)
+        if volume != self._volume:
+            self.music.set_volume(volume)
+            self._volume = volume
+
+    def pause(self) -> None:
+        self.music.pause()
+        self.paused = True
+
+    def resume(self) -> None:
+        self.music.unpause()
+        self.paused = False
+
+    def close(self) -> None:
+        try:
+            self.music.stop()
+        except Exception:
+            pass
+
+
+def _pygame_music_available() -> bool:
+    try:
+        pygame.mixer.music  # noqa: B018 - triggers the lazy import
+        return True
+    except (ImportError, AttributeError):
+        return False
+
+
+class Playback:
+    """Handle for one voice on a channel."""
+
+    def __init__(self, output: 'AudioOutput', channel: str, voice, volume: float = 1.0) -> None:
+        self.output = output
+        self.channel = channel
+        self.voice = voice
+        self.volume = volume
+        self.done = threading.Event()
+        self.stopped = False
+
+    def stop(self) -> None:
+        if self.output is not None:
+            self.output._remove(self, stopped=True)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the voice has finished (or was stopped); False on timeout."""
+        return self.done.wait(timeout)
+
+    @property
+    def playing(self) -> bool:
+        return not self.done.is_set()
+
+
+def _finished(channel: str) -> Playback:
+    p = Playback(None, channel, None)
+    p.done.set()
+    return p
+
+
+# --- sinks -------------------------------------------------------------------------------
+
+
+class Sink:
+    """Writes mixed 16-bit blocks; keeps at most `lead` seconds ahead of real time when realtime."""
+
+    def __init__(self, rate: int, channels: int, realtime: bool = True, lead: float = 0.06) -> None:
+        self.rate = rate
+        self.channels = channels
+        self.realtime = realtime
+        self.lead = lead
+        self.late = 0
+        self._t0: Optional[float] = None
+        self._frames = 0
+
+    def write(self, pcm: bytes) -> None:
+        frames = len(pcm) // (2 * self.channels)
+        if self.realtime:
+            now = time.perf_counter()
+            if self._t0 is None or now > self._t0 + self._frames / float(self.rate) + self.lead:
+                if self._t0 is not None:
+                    self.late += 1
+                self._t0, self._frames = now, 0  # (re)start the clock after idling or falling behind
+            ahead = self._t0 + self._frames / float(self.rate) - now
+            if ahead > self.lead:
+                time.sleep(ahead - self.lead)
+        self._frames += frames
+        self._write(pcm)
+
+    def idle(self) -> None:
+        """Nothing is playing; the clock restarts with the next write."""
+        self._t0 = None
+
+    def _write(self, pcm: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(Sink):
+    """Discards audio; counts what it was given (headless runs, tests)."""
+
+    def __init__(self, rate: int = RATE, channels: int = 2, realtime: bool = False) -> None:
+        super().__init__(rate, channels, realtime)
+        self.bytes = 0
+
+    def _write(self, pcm: bytes) -> None:
+        self.bytes += len(pcm)
+
+
+class WavSink(Sink):
+    """Writes everything that would have been heard to a WAV file."""
+
+    def __init__(self, path, rate: int = RATE, channels: int = 2, realtime: bool = False) -> None:
+        super().__init__(rate, channels, realtime)
+        self.path = str(path)
+        self._wav = wave.open(self.path, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(rate)
+
+    def _write(self, pcm: bytes) -> None:
+        self._wav.writeframes(pcm)
+
+    def close(self) -> None:
+        self._wav.close()
+
+
+class PipeSink(Sink):
+    """Raw PCM into a Linux command-line player (pw-cat, paplay or aplay)."""
+
+    def __init__(self, rate: int = RATE, channels: int = 2, command: Optional[list] = None) -> None:
+        super().__init__(rate, channels, realtime=True)
+        if command is None:
+            command = next((build(rate, channels) for name, build in _PIPE_PLAYERS if shutil.which(name)), None)
+            if command is None:
+                raise RuntimeError('no PCM player found (pw-cat, paplay or aplay)')
+        self.command = command
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _write(self, pcm: bytes) -> None:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL)
+        try:
+            self._proc.stdin.write(pcm)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            _logger.warning('Audio player %s exited; restarting', self.command[0])
+            self._proc = None
+
+    def close(self) -> None:
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(2)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+
+class PygameSink(Sink):
+    """Queues each block on one pygame mixer channel (SDL plays it; Windows and macOS)."""
+
+    def __init__(self, rate: int = RATE, channels: int = 2) -> None:
+        super().__init__(rate, channels, realtime=False)
+        self._channel = None
+
+    def _write(self, pcm: bytes) -> None:
+        mixer = pygame.mixer
+        if self._channel is None:
+            if not mixer.get_init():
+                mixer.init(frequency=self.rate, size=-16, channels=self.channels, buffer=512)
+            self._channel = mixer.Channel(0)
+            mixer.set_reserved(1)
+        sound = mixer.Sound(buffer=pcm)
+        if not self._channel.get_busy():
+            self._channel.play(sound)
+            return
+        # one block may wait in the queue; this paces the mixing thread
+        while self._channel.get_queue() is not None:
+            time.sleep(0.002)
+        self._channel.queue(sound)
+
+
+def pick_sink(rate: int = RATE, channels: int = 2) -> Sink:
+    """The platform's output: a PCM pipe on Linux, pygame elsewhere, else a NullSink."""
+    if os.environ.get('IO_AUDIO_SINK') == 'null':
+        return NullSink(rate, channels, realtime=True)
+    if sys.platform.startswith('linux'):
+        try:
+            return PipeSink(rate, channels)
+        except RuntimeError:
+            pass
+    try:
+        pygame.mixer  # noqa: B018 - triggers the lazy import
+        return PygameSink(rate, channels)
+    except ImportError:
+        _logger.warning('No audio output available; sound is discarded')
+        return NullSink(rate, channels, realtime=True)
+
+
+# --- the mixer ------------------------------------------------------------------------
+
+
+class AudioOutput:
+    def __init__(self, sink: Optional[Sink] = None, rate: int = RATE, channels: int = 2,
+                 block_ms: float = BLOCK_MS, duck_gain: float = 0.3, attack: float = 0.08,
+                 release: float = 0.4) -> None:
+        self.rate = rate
+        self.channels = channels
+        self.block = max(1, int(rate * block_ms / 1000.0))
+        self.duck_gain = duck_gain
+        self.attack = attack
+        self.release = release
+        self.volume = {name: 1.0 for name in CHANNELS}
+        self._sink = sink
+        self._voices: dict[str, list] = {name: [] for name in CHANNELS}
+        self._paused: set = set()
+        self._sounds: dict[str, Sound] = {}
+        self._duck_holds = 0
+        self._duck = 1.0  # current music gain from ducking
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._available: Optional[bool] = None
+        self.stats = {'blocks': 0, 'voices': 0, 'late': 0}
+
+    def available(self) -> bool:
+        """NumPy importable (checked once); without it nothing is played."""
+        if self._available is None:
+            try:
+                np.ndarray  # noqa: B018 - triggers the lazy import
+                self._available = True
+            except ImportError:
+                self._available = False
+                _logger.warning('numpy is not installed; audio output is disabled')
+        return self._available
+
+    @property
+    def sink(self) -> Sink:
+        if self._sink is None:
+            self._sink = pick_sink(self.rate, self.channels)
+        return self._sink
+
+    # --- sounds ---
+
+    def sound(self, source, name: str = '') -> Sound:
+        """A Sound for a path (decoded once and cached) or for encoded bytes."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return Sound(decode(source, self.rate, self.channels), self.rate, name)
+        key = str(Path(source).resolve())
+        cached = self._sounds.get(key)
+        if cached is None:
+            cached = Sound(decode(key, self.rate, self.channels), self.rate, name or Path(key).name)
+            self._sounds[key] = cached
+        return cached
+
+    def preload(self, paths) -> int:
+        """Decode sound files ahead of their first use; returns how many loaded."""
+        loaded = 0
+        for path in paths:
+            try:
+                self.sound(path)
+                loaded += 1
+            except Exception:
+                _logger.exception('Preloading %s failed', path)
+        return loaded
+
+    # --- playing ---
+
+    def play(self, channel: str, source, loop: bool = False, volume: float = 1.0) -> Playback:
+        """Start source on channel: a Sound, encoded bytes, a SpeechBuffer-like object or a file path."""
+        if channel not in self._voices:
+            raise ValueError(f'unknown channel {channel!r}')
+        if not self.available():
+            return _finished(channel)
+        voice = self._voice(channel, source, loop)
+        playback = Playback(self, channel, voice, volume)
+        with self._cond:
+            if channel == MUSIC:
+                for old in self._voices[MUSIC]:
+                    self._finish(old, stopped=True)
+                self._voices[MUSIC] = []
+                self._paused.discard(MUSIC)
+            self._voices[channel].append(playback)
+            self.stats['voices'] += 1
+            self._start()
+            self._cond.notify_all()
+        return playback
+
+    def _voice(self, channel: str, source, loop: bool):
+        if isinstance(source, Sound):
+            return _ArrayVoice(source.samples, loop)
+        fmt = None if isinstance(source, (str, Path)) else getattr(source, 'format', None)
+        if fmt == 'pcm':  # SpeechBuffer.pcm(): raw frames with their own format
+            x = _from_pcm(memoryview(source.data).cast('B'), source.width, source.channels, self.channels)
+            return _ArrayVoice(_resample(x, source.rate, self.rate), loop)
+        if fmt is not None:
+            source = source.data
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return _ArrayVoice(decode(source, self.rate, self.channels), loop)
+        path = str(source)
+        if channel == MUSIC and not loop and not path.lower().endswith('.wav'):
+            # streamed: decoding a whole song up front costs ~100 MB and blocks the caller
+            if shutil.which('ffmpeg'):
+                return _StreamVoice(path, self.rate, self.channels)
+            if _pygame_music_available():
+                return _PygameMusicVoice(path, self.rate, self.channels)
+        if channel == MUSIC:
+            return _ArrayVoice(decode(path, self.rate, self.channels), loop)
+        return _ArrayVoice(self.sound(path).samples, loop)
+
+    def stop(self, channel: Optional[str] = None) -> None:
+        with self._cond:
+            for name in ([channel] if channel else CHANNELS):
+                for playback in self._voices[name]:
+                    self._finish(playback, stopped=True)
+                self._voices[name] = []
+            self._cond.notify_all()
+
+    def pause(self, channel: str = MUSIC) -> None:
+        with self._cond:
+            self._paused.add(channel)
+            for playback in self._voices[channel]:
+                if getattr(playback.voice, 'external', False):
+                    playback.voice.pause()
+
+    def resume(self, channel: str = MUSIC) -> None:
+        with self._cond:
+            self._paused.discard(channel)
+            for playback in self._voices[channel]:
+                if getattr(playback.voice, 'external', False):
+                    playback.voice.resume()
+            self._cond.notify_all()
+
+    def busy(self, channel: str) -> bool:
+        """Something is playing (or paused) on channel."""
+        with self._cond:
+            return bool(self._voices[channel])
+
+    def paused(self, channel: str = MUSIC) -> bool:
+        with self._cond:
+            return channel in self._paused
+
+    def set_volume(self, channel: str, volume: float) -> None:
+        self.volume[channel] = max(0.0, min(1.0, float(volume)))
+
+    @contextmanager
+    def ducked(self):
+        """Keep music ducked for the duration (speech rendered outside the mixer, e.g. pyttsx3)."""
+        with self._cond:
+            self._duck_holds += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._duck_holds -= 1
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(2)
+        self.stop()
+        if self._sink is not None:
+            self._sink.close()
+
+    # --- mixing thread ---
+
+    def _remove(self, playback: Playback, stopped: bool) -> None:
+        with self._cond:
+            voices = self._voices.get(playback.channel, [])
+            if playback in voices:
+                voices.remove(playback)
+            self._finish(playback, stopped)
+
+    @staticmethod
+    def _finish(playback: Playback, stopped: bool) -> None:
+        if not playback.done.is_set():
+            playback.stopped = stopped
+            playback.voice.close()
+            playback.done.set()
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name='io-audio-mixer', daemon=True)
+            self._thread.start()
+
+    def _audible(self) -> bool:
+        return any(voices for name, voices in self._voices.items() if name not in self._paused)
+
+    def _run(self) -> None:
+        sink = self.sink
+        while True:
+            with self._cond:
+                while not self._closed and not self._audible():
+                    sink.idle()
+                    self._duck = self.duck_gain if self._ducking() else 1.0
+                    self._cond.wait()
+                if self._closed:
+                    return
+                active = {name: list(voices) for name, voices in self._voices.items() if name not in self._paused}
+                ducking = self._ducking()
+            try:
+                block = self._mix(active, ducking)
+                sink.write(block)
+            except Exception:
+                _logger.exception('Audio mixing failed; stopping all channels')
+                self.stop()
+            self.stats['blocks'] += 1
+            self.stats['late'] = sink.late
+
+    def _ducking(self) -> bool:
+        return bool(self._duck_holds or (self._voices[SPEECH] and SPEECH not in self._paused))
+
+    def _mix(self, active: dict, ducking: bool) -> bytes:
+        n = self.block
+        out = np.zeros((n, self.channels), dtype=np.float32)
+        # ramp the music gain toward its target over attack/release seconds
+        start = self._duck
+        target = self.duck_gain if ducking else 1.0
+        step = (n / float(self.rate)) / max(self.attack if ducking else self.release, 1e-3) * (1.0 - self.duck_gain)
+        end = max(target, start - step) if target < start else min(target, start + step)
+        self._duck = end
+        for name, voices in active.items():
+            gain = self.volume[name]
+            for playback in voices:
+                chunk = playback.voice.read(n)
+                if getattr(playback.voice, 'external', False):
+                    # played outside the mixer: only its volume follows the channel and ducking
+                    playback.voice.gain(end * gain * playback.volume if name == MUSIC else gain * playback.volume)
+                    if not len(chunk):
+                        self._remove(playback, stopped=False)
+                    continue
+                if len(chunk):
+                    if name == MUSIC and (start != 1.0 or end != 1.0):
+                        ramp = np.linspace(start, end, len(chunk), dtype=np.float32)[:, None]
+                        out[:len(chunk)] += chunk * (ramp * (gain * playback.volume))
+                    else:
+                        out[:len(chunk)] += chunk * np.float32(gain * playback.volume)
+                if len(chunk) < n:
+                    self._remove(playback, stopped=False)
+        np.clip(out, -1.0, 32767.0 / 32768.0, out=out)
+        return (out * 32768.0).astype('<i2').tobytes()
+
+
+_default: Optional[AudioOutput] = None
+_default_lock = threading.Lock()
+
+
+def default() -> AudioOutput:
+    """The process-wide output shared by io.py and notification.py."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = AudioOutput()
+        return _default
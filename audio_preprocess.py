@@ -0,0 +1,184 @@
+"""Vectorized clean-up of captured phrases before recognition.
+
+Phrases reached the recognizer exactly as captured: at the device rate
+(often 44.1 or 48 kHz), with the listener's pre-roll and trailing pause
+still attached and at whatever level the microphone delivered. Preprocessor
+does one NumPy pass over the frame buffer instead:
+
+1. decode to float32 and mix down to mono
+2. trim leading/trailing silence (frames more than `trim_db` below the
+   loudest frame or close to the noise floor), keeping `pad` seconds on
+   either side
+3. noise gate: frames near the estimated noise floor are attenuated by
+   `gate_db`, with the gain smoothed so the gate does not click
+4. peak-normalize to `target_dbfs`, with at most `max_gain_db` of boost
+5. resample to 16 kHz (box-filter anti-aliasing + linear interpolation) and
+   encode as 16-bit PCM
+
+It sits between capture and the recognizer chain:
+
+    recognize = PREPROCESS.wrap(RECOGNIZERS.recognize)
+
+Without NumPy (optional dependency) audio passes through unchanged. stats and
+summary() report bytes and processing time per phrase; benchmarks.py
+preprocess compares payload size and recognition latency with and without it.
+"""
+from __future__ import annotations
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from lazy_imports import lazy_import
+
+sr = lazy_import('speech_recognition')
+np = lazy_import('numpy')
+
+_logger = logging.getLogger('io.preprocess')
+
+
+def decode(raw: bytes, sample_width: int, channels: int = 1):
+    """Little-endian PCM bytes -> mono float32 array in [-1, 1]."""
+    if sample_width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        x = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw[:len(raw) - len(raw) % 3], dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        x = (np.where(v >= 1 << 23, v - (1 << 24), v)).astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        x = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f'unsupported sample width {sample_width}')
+    if channels > 1:
+        x = x[:len(x) - len(x) % channels].reshape(-1, channels).mean(axis=1)
+    return x
+
+
+def encode(x) -> bytes:
+    """float32 samples -> 16-bit little-endian PCM bytes."""
+    return (np.clip(x, -1.0, 32767.0 / 32768.0) * 32768.0).astype('<i2').tobytes()
+
+
+def frame_db(x, frame: int):
+    """Per-frame RMS level in dBFS (the last partial frame is zero-padded)."""
+    n = -(-len(x) // frame)
+    padded = np.zeros(n * frame, dtype=np.float32)
+    padded[:len(x)] = x
+    power = np.mean(padded.reshape(n, frame) ** 2, axis=1)
+    return 10.0 * np.log10(power + 1e-10)
+
+
+def resample(x, rate: int, target: int):
+    """Linear-interpolation resampling with a box low-pass in front when downsampling."""
+    if rate == target or not len(x):
+        return x
+    if rate > target:
+        width = int(round(rate / float(target)))
+        if width > 1:
+            x = np.convolve(x, np.full(width, 1.0 / width, dtype=np.float32), mode='same')
+    n_out = int(len(x) * target / float(rate))
+    positions = np.arange(n_out, dtype=np.float64) * (rate / float(target))
+    return np.interp(positions, np.arange(len(x), dtype=np.float64), x).astype(np.float32)
+
+
+class Preprocessor:
+    def __init__(self, target_rate: int = 16000, frame_ms: float = 20.0, trim_db: float = 35.0, pad: float = 0.15,
+                 gate_db: float = 18.0, gate_margin_db: float = 6.0, target_dbfs: float = -3.0,
+                 max_gain_db: float = 20.0, audio_factory: Optional[Callable] = None) -> None:
+        self.target_rate = target_rate
+        self.frame_ms = frame_ms
+        self.trim_db = trim_db
+        self.pad = pad
+        self.gate_db = gate_db
+        self.gate_margin_db = gate_margin_db
+        self.target_dbfs = target_dbfs
+        self.max_gain_db = max_gain_db
+        self.audio_factory = audio_factory
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+        self.stats = {'phrases': 0, 'passed_through': 0, 'bytes_in': 0, 'bytes_out': 0,
+                      'seconds_in': 0.0, 'seconds_out': 0.0, 'process_seconds': 0.0}
+
+    def available(self) -> bool:
+        """NumPy importable (checked once)."""
+        if self._available is None:
+            try:
+                np.ndarray  # noqa: B018 - triggers the lazy import
+                self._available = True
+            except ImportError:
+                self._available = False
+                _logger.info('numpy is not installed; audio goes to recognition unprocessed')
+        return self._available
+
+    def wrap(self, recognize: Callable) -> Callable:
+        def preprocessed(audio):
+            return recognize(self.process(audio))
+        return preprocessed
+
+    def process_array(self, x, rate: int):
+        """The clean-up steps on mono float32 samples; returns the 16 kHz result."""
+        if not len(x):
+            return resample(x, rate, self.target_rate)
+        frame = max(1, int(rate * self.frame_ms / 1000.0))
+        levels = frame_db(x, frame)
+        loudest = float(levels.max())
+
+        # the quietest tenth of the frames estimates the noise floor
+        floor = float(np.percentile(levels, 10))
+
+        # trim: first/last frame within trim_db of the loudest and clearly above the floor, plus padding
+        threshold = min(max(loudest - self.trim_db, floor + 2 * self.gate_margin_db), loudest)
+        voiced = np.flatnonzero(levels >= threshold)
+        pad_frames = int(round(self.pad * 1000.0 / self.frame_ms))
+        first = max(0, int(voiced[0]) - pad_frames)
+        last = min(len(levels), int(voiced[-1]) + 1 + pad_frames)
+        x = x[first * frame:last * frame]
+        levels = levels[first:last]
+
+        # noise gate
+        if loudest - floor > self.gate_margin_db * 2:
+            gain_db = np.where(levels < floor + self.gate_margin_db, -self.gate_db, 0.0)
+            # smooth the gain over 3 frames, then spread it to samples
+            gain_db = np.convolve(gain_db, np.full(3, 1.0 / 3), mode='same')
+            gains = np.repeat(10.0 ** (gain_db / 20.0), frame)[:len(x)].astype(np.float32)
+            x = x * gains
+
+        # normalize the peak
+        peak = float(np.abs(x).max()) if len(x) else 0.0
+        if peak > 0:
+            gain = min(10.0 ** (self.target_dbfs / 20.0) / peak, 10.0 ** (self.max_gain_db / 20.0))
+            x = x * np.float32(gain)
+        return resample(x, rate, self.target_rate)
+
+    def process(self, audio, channels: int = 1):
+        """Return a cleaned-up 16 kHz / 16-bit AudioData; the input unchanged when NumPy is missing."""
+        raw = audio.frame_data
+        rate, width = audio.sample_rate, audio.sample_width
+        if not self.available():
+            with self._lock:
+                self.stats['phrases'] += 1
+                self.stats['passed_through'] += 1
+            return audio
+        start = time.perf_counter()
+        out = encode(self.process_array(decode(raw, width, channels), rate))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            st = self.stats
+            st['phrases'] += 1
+            st['bytes_in'] += len(raw)
+            st['bytes_out'] += len(out)
+            st['seconds_in'] += len(raw) / float(rate * width * channels)
+            st['seconds_out'] += len(out) / float(self.target_rate * 2)
+            st['process_seconds'] += elapsed
+        factory = self.audio_factory or sr.AudioData
+        return factory(out, self.target_rate, 2)
+
+    def summary(self) -> dict:
+        with self._lock:
+            st = dict(self.stats)
+        n = st['phrases'] - st['passed_through']
+        st['bytes_ratio'] = st['bytes_out'] / st['bytes_in'] if st['bytes_in'] else 1.0
+        st['mean_process_ms'] = st['process_seconds'] / n * 1000 if n else 0.0
+        return st
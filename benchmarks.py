@@ -0,0 +1,1608 @@
+"""Micro-benchmarks for the assistant's command-dispatch hot paths.
+
+Runs without microphone, speakers or network. The dispatch benchmarks use
+only the helper modules next to io.py; the assistant-level ones load io.py,
+notification.py and apps_plugin.py with every output channel stubbed.
+
+Run: python benchmarks.py [name ...] [--json results.json] [--compare base.json]
+(no names = run everything; --compare exits 1 if a timing got >10% slower)
+
+These only measure; behaviour is checked by the per-module test files next to
+it (python -m pytest test_pipeline.py test_wake_word.py ...).
+"""
+import contextlib
+import difflib
+import importlib
+import importlib.machinery
+import importlib.util
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from array import array
+from pathlib import Path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from intent_index import AhoCorasick, build_intent_index
+from fuzzy_index import FuzzyIndex
+from intent_registry import IntentRegistry
+import plugin_loader
+import text_normalizer
+
+BENCHMARKS = {}
+
+# Syllables used to build synthetic Persian-looking command phrases
+_SYLLABLES = ['صدا', 'نور', 'کم', 'زیاد', 'پخش', 'موزیک', 'آهنگ', 'باز', 'کن', 'قطع', 'وصل',
+              'بعدی', 'قبلی', 'ساعت', 'تاریخ', 'فای', 'وای', 'روشن', 'خاموش', 'play', 'open', 'stop']
+_FILLER = ['لطفا', 'یکم', 'الان', 'برام', 'میشه', 'please', 'now', 'the', 'یه', 'رو']
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__[len('bench_'):]] = fn
+    return fn
+
+
+def _per_call_us(fn, items, repeat=3):
+    """Best-of-`repeat` mean wall time per item, in microseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter() - start) / max(len(items), 1))
+    return best * 1e6
+
+
+def synthetic_synonyms(n_intents, phrases_per_intent=4, seed=0):
+    rnd = random.Random(seed)
+    table = {}
+    for i in range(n_intents):
+        phrases = []
+        for _ in range(phrases_per_intent):
+            words = rnd.sample(_SYLLABLES, rnd.randint(1, 3))
+            phrases.append(' '.join(words) + f' {i}')
+        table[f'intent_{i}'] = phrases
+    return table
+
+
+def synthetic_queries(synonyms, n_queries, hit_ratio=0.7, seed=1):
+    rnd = random.Random(seed)
+    all_phrases = [p for ps in synonyms.values() for p in ps]
+    queries = []
+    for _ in range(n_queries):
+        words = rnd.sample(_FILLER, 3)
+        if all_phrases and rnd.random() < hit_ratio:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(all_phrases))
+        queries.append(' '.join(words))
+    return queries
+
+
+def _legacy_keyword_in_query(q, candidates, fuzzy_thresh=0.78):
+    """The pre-index matcher: regex + substring + difflib per candidate."""
+    qq = q.lower()
+    for cand in candidates:
+        c = cand.lower()
+        if re.search(r'\b' + re.escape(c) + r'\b', qq):
+            return True
+        if c in qq:
+            return True
+        words = re.findall(r"\w+", qq, flags=re.UNICODE)
+        for w in words:
+            if difflib.SequenceMatcher(None, w, c).ratio() >= fuzzy_thresh:
+                return True
+    return False
+
+
+@benchmark
+def bench_intent_dispatch():
+    """Cost to find the matching intent(s) of one query vs. command-table size."""
+    print(f"{'intents':>8} {'phrases':>8} {'legacy us/q':>12} {'index us/q':>11} {'speedup':>8}")
+    metrics = {}
+    for n in (16, 64, 256, 1024):
+        synonyms = synthetic_synonyms(n)
+        queries = synthetic_queries(synonyms, 200)
+        index = build_intent_index(synonyms)
+
+        def legacy(q):
+            for intent, phrases in synonyms.items():
+                if _legacy_keyword_in_query(q, phrases):
+                    return intent
+            return None
+
+        def indexed(q):
+            return index.match(q + ' ')  # defeat the single-query memo
+
+        # the legacy path is slow on large tables; a smaller sample is enough
+        legacy_us = _per_call_us(legacy, queries[:max(10, 2000 // n)], repeat=1)
+        index_us = _per_call_us(indexed, queries)
+        phrases = sum(len(p) for p in synonyms.values())
+        print(f"{n:>8} {phrases:>8} {legacy_us:>12.1f} {index_us:>11.1f} {legacy_us / index_us:>7.0f}x")
+        metrics[f'legacy_us@{n}'] = legacy_us
+        metrics[f'index_us@{n}'] = index_us
+    return metrics
+
+
+
+def _misheard(phrases, n, seed=2):
+    """Query words derived from vocabulary phrases with a few characters garbled."""
+    rnd = random.Random(seed)
+    words = []
+    for _ in range(n):
+        chars = list(rnd.choice(phrases))
+        for _ in range(rnd.randint(0, 3)):
+            chars[rnd.randrange(len(chars))] = rnd.choice('ابپتسشکگ ')
+        words.append(''.join(chars))
+    return words
+
+
+@benchmark
+def bench_fuzzy_lookup():
+    """Best fuzzy candidates (ratio >= 0.78) for one misheard word vs. vocabulary size."""
+    print(f"{'phrases':>8} {'difflib us/w':>13} {'index us/w':>11} {'speedup':>8}")
+    metrics = {}
+    for n in (16, 64, 256, 1024):
+        phrases = [p for ps in synthetic_synonyms(n).values() for p in ps]
+        words = _misheard(phrases, 300)
+
+        def legacy(w):
+            return [p for p in phrases if difflib.SequenceMatcher(None, w, p).ratio() >= 0.78]
+
+        def indexed(w):
+            return index._lookup(w.lower(), 0.78)  # bypass the per-word memo
+
+        index = FuzzyIndex()
+        for p in phrases:
+            index.add(p, p)
+        legacy_us = _per_call_us(legacy, words[:max(20, 6000 // n)], repeat=1)
+        index_us = _per_call_us(indexed, words)
+        print(f"{len(phrases):>8} {legacy_us:>13.1f} {index_us:>11.1f} {legacy_us / index_us:>7.0f}x")
+        metrics[f'difflib_us@{len(phrases)}'] = legacy_us
+        metrics[f'index_us@{len(phrases)}'] = index_us
+    return metrics
+
+
+
+def synthetic_plugins(n, keywords_per_plugin=6, seed=3):
+    """Plugin-like modules whose can_handle() costs about what apps_plugin's used to."""
+    rnd = random.Random(seed)
+    plugins = []
+    for i in range(n):
+        words = [f"{rnd.choice(_SYLLABLES)}{i}x{j}" for j in range(keywords_per_plugin)]
+
+        def can_handle(q, _words=words):
+            return any(re.search(r'\b' + re.escape(w) + r'\b', q) for w in _words)
+
+        plugins.append(types.SimpleNamespace(
+            __name__=f'plugins.synthetic_{i}', KEYWORDS=frozenset(words),
+            can_handle=can_handle, handle=lambda q: True))
+    return plugins
+
+
+@benchmark
+def bench_plugin_dispatch():
+    """Per-query plugin dispatch cost: every can_handle() vs. the keyword prefilter."""
+    print(f"{'plugins':>8} {'loop us/q':>10} {'indexed us/q':>13}")
+    metrics = {}
+    for n in (5, 50, 200, 800):
+        plugins = synthetic_plugins(n)
+        registry = IntentRegistry(cache_size=0)  # measure resolution, not the query cache
+        for mod in plugins:
+            registry.register(mod.__name__, lambda query, _m=mod: _m.handle(query), triggers=mod.KEYWORDS,
+                              predicate=mod.can_handle, extract=lambda q: {'query': q}, source='plugin')
+        rnd = random.Random(4)
+        queries = []
+        for k in range(300):
+            words = rnd.sample(_FILLER, 3)
+            if k % 3 == 0:
+                words.append(rnd.choice(sorted(rnd.choice(plugins).KEYWORDS)))
+            queries.append(' '.join(words))
+
+        def loop(q):
+            for mod in plugins:
+                if mod.can_handle(q):
+                    return mod.handle(q)
+            return None
+
+        loop_us = _per_call_us(loop, queries[:max(30, 6000 // n)], repeat=1)
+        index_us = _per_call_us(registry.dispatch, queries)
+        print(f"{n:>8} {loop_us:>10.1f} {index_us:>13.1f}")
+        metrics[f'loop_us@{n}'] = loop_us
+        metrics[f'indexed_us@{n}'] = index_us
+    return metrics
+
+
+
+def _command_registry(synonyms, plugins, cache_size):
+    """A registry shaped like io.py's: fuzzy synonym intents plus keyword-gated plugins."""
+    registry = IntentRegistry(cache_size=cache_size)
+    for i, (intent, phrases) in enumerate(synonyms.items()):
+        registry.register(intent, lambda: True, triggers=phrases, priority=10 + i, fuzzy=True)
+    for mod in plugins:
+        registry.register(mod.__name__, lambda query, _m=mod: _m.handle(query), triggers=mod.KEYWORDS,
+                          predicate=mod.can_handle, extract=lambda q: {'query': q}, priority=0, source='plugin')
+    return registry
+
+
+@benchmark
+def bench_intent_cache(n_commands=3000):
+    """Dispatch latency for a repetitive command stream with and without the resolution cache."""
+    synonyms = synthetic_synonyms(64)
+    plugins = synthetic_plugins(50)
+    # a small working set of commands, said over and over (Zipf-like)
+    distinct = synthetic_queries(synonyms, 120, hit_ratio=0.9, seed=6)
+    weights = [1.0 / (k + 1) for k in range(len(distinct))]
+    stream = random.Random(7).choices(distinct, weights, k=n_commands)
+    print(f"{'cache':>6} {'us/cmd':>8} {'hit rate':>9} {'hit us':>7} {'miss us':>8}")
+    metrics = {}
+    for size in (0, 256):
+        registry = _command_registry(synonyms, plugins, size)
+        registry.build()
+        start = time.perf_counter()
+        for q in stream:
+            registry.dispatch(q)
+        per_cmd = (time.perf_counter() - start) / len(stream) * 1e6
+        st = registry.cache.stats()
+        print(f"{size:>6} {per_cmd:>8.1f} {st['hit_rate']:>8.0%} {st['avg_hit_us']:>7.1f} {st['avg_miss_us']:>8.1f}")
+        metrics[f'us_per_cmd@cache{size}'] = per_cmd
+    registry.register('late_plugin', lambda: True, triggers=['kw_late'])
+    registry.dispatch(stream[0])
+    print(f"registering an intent invalidates: {registry.cache.stats()['invalidations']} invalidation(s)")
+    metrics['hit_rate'] = st['hit_rate']
+    return metrics
+
+
+_PLUGIN_SOURCE = """MANIFEST = {{'name': 'synthetic_{i}', 'version': '1.0', 'keywords': ['kw{i}a', 'kw{i}b']}}
+import time
+time.sleep({import_cost})  # stands in for heavy imports / config parsing
+def can_handle(q):
+    return 'kw{i}' in q
+def handle(q):
+    return True
+"""
+
+
+@benchmark
+def bench_plugin_startup(import_cost=0.002):
+    """Plugin loading cost at startup: eager import of every plugin vs. manifest discovery."""
+    print(f"{'plugins':>8} {'eager ms':>9} {'lazy ms':>8}")
+    metrics = {}
+    for n in (5, 50, 200):
+        root = tempfile.mkdtemp(prefix='io_bench_plugins_')
+        pkg_name = f'bench_plugins_{n}'
+        try:
+            pkg_dir = os.path.join(root, pkg_name)
+            os.makedirs(pkg_dir)
+            open(os.path.join(pkg_dir, '__init__.py'), 'w').close()
+            for i in range(n):
+                with open(os.path.join(pkg_dir, f'p{i}.py'), 'w', encoding='utf-8') as f:
+                    f.write(_PLUGIN_SOURCE.format(i=i, import_cost=import_cost))
+            sys.path.insert(0, root)
+            pkg = importlib.import_module(pkg_name)
+
+            start = time.perf_counter()
+            plugin_loader.discover(pkg)
+            lazy_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for i in range(n):
+                importlib.import_module(f'{pkg_name}.p{i}')
+            eager_ms = (time.perf_counter() - start) * 1000
+            print(f"{n:>8} {eager_ms:>9.1f} {lazy_ms:>8.1f}")
+            metrics[f'eager_ms@{n}'] = eager_ms
+            metrics[f'lazy_ms@{n}'] = lazy_ms
+        finally:
+            sys.path.remove(root)
+            for name in [m for m in sys.modules if m == pkg_name or m.startswith(pkg_name + '.')]:
+                del sys.modules[name]
+            shutil.rmtree(root, ignore_errors=True)
+    return metrics
+
+
+
+# A few real command phrases plus the spelling variants speech recognizers produce
+_VARIANT_PHRASES = {
+    'mute': 'بی\u200cصدا', 'volume_small_up': '۵ درصد زیاد', 'volume_down': 'کم کن صدا',
+    'next': 'آهنگ بعدی', 'wikipedia': 'ویکی پدیا', 'brightness_up': 'نور زیاد کن',
+}
+
+
+def _spelling_variant(text, rnd):
+    """Swap in Arabic yeh/kaf, ZWNJ<->space and Persian/ASCII digits at random."""
+    out = []
+    for ch in text:
+        if ch == '\u06cc' and rnd.random() < 0.5:  # Persian yeh -> Arabic yeh
+            ch = '\u064a'
+        elif ch == '\u06a9' and rnd.random() < 0.5:  # Persian kaf -> Arabic kaf
+            ch = '\u0643'
+        elif ch == '\u200c' and rnd.random() < 0.5:
+            ch = ' '
+        elif ch == ' ' and rnd.random() < 0.2:
+            ch = '\u200c'
+        elif ch == '۵' and rnd.random() < 0.5:
+            ch = '5'
+        out.append(ch)
+    return ''.join(out)
+
+
+@benchmark
+def bench_normalize(n=3000):
+    """Per-transcript normalization cost (cold vs memoized) and variant-matching consistency."""
+    rnd = random.Random(5)
+    intents = list(_VARIANT_PHRASES)
+    corpus = []
+    for _ in range(n):
+        intent = rnd.choice(intents)
+        words = rnd.sample(_FILLER, 2) + [_spelling_variant(_VARIANT_PHRASES[intent], rnd)]
+        rnd.shuffle(words)
+        corpus.append((intent, ' '.join(words)))
+    texts = [t for _, t in corpus]
+
+    def cold(t):
+        return text_normalizer.NormalizedQuery(t)
+
+    text_normalizer._normalize_cached.cache_clear()
+    cold_us = _per_call_us(cold, texts)
+    repeated = texts[:500]  # the memo holds the most recent 1024 utterances
+    for t in repeated:
+        text_normalizer.normalize_query(t)
+    warm_us = _per_call_us(text_normalizer.normalize_query, repeated)
+
+    raw = AhoCorasick()
+    for intent, phrase in _VARIANT_PHRASES.items():
+        raw.add(phrase.lower(), intent)
+    index = build_intent_index({k: [v] for k, v in _VARIANT_PHRASES.items()})
+    raw_ok = sum(any(v == intent for _, _, v in raw.iter_matches(t.lower())) for intent, t in corpus)
+    norm_ok = sum(index.has(t, intent) for intent, t in corpus)
+    print(f"transcripts: {n}, distinct: {len(set(texts))}")
+    print(f"normalize cold: {cold_us:.2f} us/transcript, memoized: {warm_us:.2f} us/transcript")
+    print(f"intent found: raw lowercase {raw_ok}/{n} ({100 * raw_ok / n:.1f}%), "
+          f"normalized {norm_ok}/{n} ({100 * norm_ok / n:.1f}%)")
+    return {'cold_us': cold_us, 'memoized_us': warm_us, 'raw_match_rate': raw_ok / n, 'normalized_match_rate': norm_ok / n}
+
+
+
+# --- Assistant-level benchmarks ----------------------------------------------
+# These load the real io.py / notification.py / apps_plugin.py. Heavy and
+# platform subsystems are lazy (see lazy_imports), and every output channel is
+# stubbed, so they run on a plain Linux box without audio devices.
+
+_LOADED = {}
+
+
+def _load_source(name, path):
+    """Import a source file under `name` (io.py would otherwise clash with the stdlib io)."""
+    loader = importlib.machinery.SourceFileLoader(name, path)
+    spec = importlib.util.spec_from_loader(name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    loader.exec_module(mod)
+    return mod
+
+
+def _assistant():
+    if 'io' not in _LOADED:
+        _LOADED['io'] = _load_source('bench_assist_io', os.path.join(HERE, 'io.py'))
+    return _LOADED['io']
+
+
+def synthetic_commands(phrase_table, n, hit_ratio=0.7, garble_ratio=0.2, seed=8):
+    """Persian/English transcripts around real phrases, with recognizer spelling variants and garbled letters."""
+    rnd = random.Random(seed)
+    out = []
+    for q in synthetic_queries(phrase_table, n, hit_ratio, seed):
+        q = _spelling_variant(q, rnd)
+        if rnd.random() < garble_ratio:
+            chars = list(q)
+            chars[rnd.randrange(len(chars))] = rnd.choice('ابپتسشکگ')
+            q = ''.join(chars)
+        out.append(q)
+    return out
+
+
+@benchmark
+def bench_detect_emotion(n=3000):
+    """detect_emotion() cost per transcript and how many emotional transcripts it recognizes."""
+    io_mod = _assistant()
+    table = {emotion: words for emotion, words in io_mod.EMOTION_WORDS}
+    texts = synthetic_commands(table, n, hit_ratio=0.5, garble_ratio=0.0)
+    folded = {e: [text_normalizer.normalize_text(w) for w in ws] for e, ws in table.items()}
+    labels = [next((e for e, ws in folded.items() if any(w in text_normalizer.normalize_text(t) for w in ws)), None)
+              for t in texts]
+    us = _per_call_us(lambda t: io_mod.detect_emotion(t + ' '), texts)  # defeat the normalizer memo
+    found = sum(io_mod.detect_emotion(t) is not None for t in texts)
+    expected = sum(label is not None for label in labels)
+    print(f"transcripts: {n}, detect_emotion: {us:.2f} us/transcript, detected {found} (planted {expected})")
+    return {'detect_emotion_us': us, 'detected': found, 'planted': expected}
+
+
+@benchmark
+def bench_keyword_matcher(n=1000):
+    """io.INTENTS.resolve() (every registered command, fuzzy included) and find_site(), per transcript."""
+    io_mod = _assistant()
+    table = dict(io_mod.SYNONYMS)
+    table['sites'] = list(io_mod.SITES)
+    texts = synthetic_commands(table, n)
+
+    matched = sum(io_mod.INTENTS.resolve(t) is not None for t in texts)
+    resolve_us = _per_call_us(lambda t: io_mod.INTENTS.resolve(t + ' '), texts)
+    site_us = _per_call_us(lambda t: io_mod.find_site(t + ' '), texts)
+    print(f"transcripts: {n} ({matched} matched an intent)")
+    print(f"INTENTS.resolve over {len(io_mod.INTENTS)} intents: {resolve_us:.1f} us/transcript, "
+          f"find_site: {site_us:.1f} us/transcript")
+    return {'resolve_us': resolve_us, 'find_site_us': site_us, 'matched': matched}
+
+
+def _synthetic_apps(n_apps, root, seed=9):
+    """apps.json content with English keys, Persian aliases and half of the paths existing on disk."""
+    rnd = random.Random(seed)
+    apps, aliases = {}, {}
+    for i in range(n_apps):
+        key = f"{rnd.choice(['code', 'steam', 'chat', 'paint', 'note', 'play'])}app{i}"
+        path = os.path.join(root, f'{key}.exe')
+        if i % 2 == 0:
+            open(path, 'w').close()
+        apps[key] = [os.path.join(root, 'missing', f'{key}.exe'), path]
+        aliases[f"{rnd.choice(_SYLLABLES)} {rnd.choice(_SYLLABLES)}{i}"] = key
+    return apps, aliases
+
+
+@benchmark
+def bench_apps_plugin(n_apps=150, n_queries=600):
+    """apps_plugin can_handle()/handle() resolution cost vs. the size of apps.json (launching stubbed)."""
+    root = tempfile.mkdtemp(prefix='io_bench_apps_')
+    try:
+        os.makedirs(os.path.join(root, 'config'))
+        os.makedirs(os.path.join(root, 'plugins'))
+        apps, aliases = _synthetic_apps(n_apps, root)
+        with open(os.path.join(root, 'config', 'apps.json'), 'w', encoding='utf-8') as f:
+            json.dump({'apps': apps, 'aliases': aliases}, f, ensure_ascii=False)
+        # a copy of the real plugin, so its CONFIG (../config/apps.json) points at the synthetic table
+        plugin_path = os.path.join(root, 'plugins', 'apps_plugin.py')
+        shutil.copy(os.path.join(HERE, 'apps_plugin.py'), plugin_path)
+        start = time.perf_counter()
+        plugin = _load_source('bench_apps_plugin', plugin_path)
+        import_ms = (time.perf_counter() - start) * 1000
+        launched = []
+        plugin._try_launch = lambda path: (launched.append(path) or True, '')
+
+        names = list(apps) + list(aliases)
+        phrases = {'apps': [f'{v} {k}' for k in names for v in ('باز کن', 'open', 'run')]}
+        queries = synthetic_commands(phrases, n_queries, hit_ratio=0.6, seed=10)
+        claimed = [q for q in queries if plugin.can_handle(q)]
+        can_us = _per_call_us(plugin.can_handle, queries)
+        handle_us = _per_call_us(plugin.handle, claimed, repeat=1) if claimed else 0.0
+        print(f"apps: {n_apps}, aliases: {len(aliases)}, plugin import: {import_ms:.1f} ms")
+        print(f"can_handle: {can_us:.1f} us/query ({len(claimed)}/{n_queries} claimed), "
+              f"handle: {handle_us:.1f} us/claimed query ({len(launched)} stubbed launches)")
+        return {'import_ms': import_ms, 'can_handle_us': can_us, 'handle_us': handle_us, 'claimed': len(claimed)}
+    finally:
+        sys.modules.pop('bench_apps_plugin', None)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+class _Counter:
+    """Callable stub that only counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+
+
+def _stubbed_notification(root):
+    """Load notification.py with desktop, sound and voice channels replaced by counters."""
+    notif = _load_source('bench_notification', os.path.join(HERE, 'notification.py'))
+    sound = os.path.join(root, 'info.wav')
+    open(sound, 'w').close()
+    cfg_path = os.path.join(root, 'notifications.json')
+    with open(cfg_path, 'w', encoding='utf-8') as f:
+        json.dump({'desktop': True, 'voice': True, 'voice_queue': True, 'quiet_hours': {},
+                   'sounds': {'info': sound, 'warning': sound, 'reminder': sound},
+                   'voice_options': {'lang': 'fa'}}, f)
+    notif.CONFIG_PATH = Path(cfg_path)
+    notif.load_config()
+    channels = {'desktop': _Counter(), 'sound': _Counter(), 'voice': _Counter()}
+    notif.plyer_notify = types.SimpleNamespace(notify=channels['desktop'])
+    notif._play_sound_async = channels['sound']
+    notif._preload_sounds = _Counter()  # part of the sound channel: no decoding in the timed loop
+    notif.set_speak_callable(channels['voice'])
+    return notif, channels
+
+
+def _synthetic_payloads(n, seed=11):
+    rnd = random.Random(seed)
+    texts = synthetic_commands({'m': ['یادآوری جلسه', 'باتری کم است', 'download finished', 'پیام جدید']}, n, seed=seed)
+    payloads = []
+    for i, text in enumerate(texts):
+        payload = {'title': 'iO', 'message': text, 'level': rnd.choice(['info', 'warning', 'reminder'])}
+        if i % 4 == 0:
+            payload['voice'] = True
+        if i % 5 == 0:
+            payload['actions'] = [{'id': 'snooze', 'label': 'بعداً', 'callback': 'bench.snooze'}]
+        if i % 10 == 0:
+            payload['message'] = 'متاسفم، متوجه نشدم.'  # suppressed
+        payloads.append(payload)
+    return payloads
+
+
+@benchmark
+def bench_notify(n=2000):
+    """notification.notify() per payload with desktop, sound and voice stubbed."""
+    root = tempfile.mkdtemp(prefix='io_bench_notify_')
+    try:
+        notif, channels = _stubbed_notification(root)
+        payloads = _synthetic_payloads(n)
+        notify_us = _per_call_us(notif.notify, payloads, repeat=1)
+        notif._tts_output.wait()
+        config_us = _per_call_us(lambda _: notif.load_config(), range(n), repeat=1)
+        print(f"notify: {notify_us:.1f} us/payload (config change check, off the notify path: {config_us:.1f} us), "
+              f"desktop {channels['desktop'].calls}, sound {channels['sound'].calls}, voice {channels['voice'].calls}")
+        return {'notify_us': notify_us, 'load_config_us': config_us}
+    finally:
+        sys.modules.pop('bench_notification', None)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@benchmark
+def bench_execute_action(n=5000):
+    """notification.execute_action() for pending notifications (registry names and callables), and misses."""
+    root = tempfile.mkdtemp(prefix='io_bench_actions_')
+    try:
+        notif, _channels = _stubbed_notification(root)
+        calls = _Counter()
+        for k in range(20):
+            notif.register_action(f'bench.action{k}', calls)
+        ids = []
+        for i in range(n):
+            nid = f'bench-{i}'
+            callback = f'bench.action{i % 20}' if i % 2 else calls
+            notif._PENDING[nid] = {'title': 'iO', 'message': 'm', 'payload': {},
+                                   'actions': [{'id': 'open'}, {'id': 'snooze', 'callback': callback}]}
+            ids.append(nid)
+        hit_us = _per_call_us(lambda nid: notif.execute_action(nid, 'snooze'), ids, repeat=1)
+        miss_us = _per_call_us(lambda nid: notif.execute_action(nid, 'snooze'), ids[:1000], repeat=1)
+        print(f"execute_action: {hit_us:.2f} us/action ({calls.calls} callbacks run), unknown id: {miss_us:.2f} us")
+        return {'hit_us': hit_us, 'miss_us': miss_us}
+    finally:
+        sys.modules.pop('bench_notification', None)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+
+def synthetic_pcm(segments, rate=16000, seed=12):
+    """16-bit mono PCM from (seconds, amplitude) segments: amplitude 0 = low background noise, else a tone."""
+    rnd = random.Random(seed)
+    samples = array('h')
+    for seconds, amp in segments:
+        n = int(seconds * rate)
+        if amp:
+            samples.extend(int(amp * math.sin(2 * math.pi * 220 * i / rate)) + rnd.randint(-40, 40) for i in range(n))
+        else:
+            samples.extend(rnd.randint(-40, 40) for _ in range(n))
+    return samples.tobytes()
+
+
+class _PCMSource:
+    """sr.AudioFile-shaped source over raw PCM bytes."""
+
+    CHUNK = 1024
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, data):
+        self.data = data
+
+    def __enter__(self):
+        self.stream = io.BytesIO(self.data)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@benchmark
+def bench_listener(n_phrases=40):
+    """Background listener segmentation: CPU per second of audio and phrases found in a synthetic session."""
+    from listener import BackgroundListener
+    rnd = random.Random(13)
+    segments = [(1.0, 0)]
+    for _ in range(n_phrases):
+        segments += [(rnd.uniform(0.5, 2.5), rnd.choice([3000, 6000, 9000])), (rnd.uniform(1.0, 2.0), 0)]
+    data = synthetic_pcm(segments)
+    audio_seconds = len(data) / (2 * _PCMSource.SAMPLE_RATE)
+    listener = BackgroundListener(lambda: _PCMSource(data), max_phrases=n_phrases + 1,
+                                  audio_factory=lambda raw, rate, width: raw)
+    start = time.process_time()
+    listener.start()
+    found = 0
+    while listener.get_phrase(timeout=5) is not None:
+        found += 1
+    cpu = time.process_time() - start
+    per_audio_s_ms = cpu / audio_seconds * 1000
+    print(f"audio: {audio_seconds:.0f} s, phrases: {found}/{n_phrases}, "
+          f"CPU: {per_audio_s_ms:.2f} ms per second of audio")
+    # the per-command cost it replaces: a blocking 1.5 s ambient calibration before every listen
+    print(f"dead time before listening: 0 ms per command (was 1500 ms of calibration)")
+    return {'cpu_ms_per_audio_s': per_audio_s_ms, 'phrases_found': found}
+
+
+@benchmark
+def bench_device_selection(n_commands=50, enumerate_cost=0.03):
+    """Microphone selection per command: enumerate every time vs. DeviceManager (fake slow device list)."""
+    from audio_devices import DeviceManager, choose_microphone
+    names = ['HDA Intel PCH: ALC3246 Analog', 'Stereo Mix (Realtek Audio)', 'USB Microphone (C-Media)',
+             'Loopback Audio', 'pulse', 'default']
+
+    def slow_list():
+        time.sleep(enumerate_cost)  # stands in for PortAudio initialisation + enumeration
+        return list(names)
+
+    start = time.perf_counter()
+    for _ in range(n_commands):
+        choose_microphone(slow_list())
+    legacy_ms = (time.perf_counter() - start) / n_commands * 1000
+
+    root = tempfile.mkdtemp(prefix='io_bench_devices_')
+    try:
+        state = os.path.join(root, 'audio_device.json')
+        manager = DeviceManager(state, list_devices=slow_list, opener=lambda index: index)
+        start = time.perf_counter()
+        for _ in range(n_commands):
+            manager.open()
+        cached_ms = (time.perf_counter() - start) / n_commands * 1000
+        manager.save_threshold(412.0)
+        restarted = DeviceManager(state, list_devices=slow_list, opener=lambda index: index)
+        restored = restarted.energy_threshold
+        names.append('Bluetooth Headset Microphone')
+        replugged = DeviceManager(state, list_devices=slow_list, opener=lambda index: index)
+        print(f"per command: enumerate every time {legacy_ms:.2f} ms, cached {cached_ms:.3f} ms "
+              f"({manager.enumerations} enumeration(s) for {n_commands} commands)")
+        print(f"after restart: threshold {restored} restored (no calibration); "
+              f"after device change: threshold {replugged.energy_threshold} (recalibrate)")
+        return {'legacy_ms': legacy_ms, 'cached_ms': cached_ms, 'enumerations': manager.enumerations}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def write_wav(path, pcm, rate=16000):
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+
+
+@benchmark
+def bench_recognizer_chain(n_fixtures=20, n_rounds=5):
+    """Recognizer chain over WAV fixtures (sr.AudioFile): fast offline fake first, slow/flaky online fake second."""
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        print('speech_recognition is not installed; skipped')
+        return {}
+    import recognizers
+    root = tempfile.mkdtemp(prefix='io_bench_stt_')
+    try:
+        rnd = random.Random(14)
+        fixtures = []
+        for i in range(n_fixtures):
+            path = os.path.join(root, f'cmd{i}.wav')
+            write_wav(path, synthetic_pcm([(0.2, 0), (rnd.uniform(0.5, 1.5), 5000), (0.3, 0)], seed=i))
+            with sr.AudioFile(path) as source:
+                fixtures.append(sr.Recognizer().record(source))
+        keys = [recognizers.audio_key(a) for a in fixtures]
+        # the offline model knows two thirds of the commands; the online service answers the rest,
+        # but every fifth request fails
+        offline = recognizers.FakeBackend({k: f'command {i}' for i, k in enumerate(keys) if i % 3},
+                                          name='offline', latency=0.01, timeout=0.5)
+        online = recognizers.FakeBackend({k: (recognizers.BackendError('lost') if i % 5 == 0 else f'command {i}')
+                                          for i, k in enumerate(keys)}, name='online', latency=0.08, timeout=0.5)
+        chains = {'online only': recognizers.RecognizerChain([online]),
+                  'offline -> online': recognizers.RecognizerChain([offline, online])}
+        metrics = {}
+        print(f"{'chain':<18} {'ms/phrase':>10} {'recognized':>11}")
+        for label, chain in chains.items():
+            recognized = 0
+            start = time.perf_counter()
+            for _ in range(n_rounds):
+                for audio in fixtures:
+                    try:
+                        chain.recognize(audio)
+                        recognized += 1
+                    except (recognizers.NoSpeech, recognizers.BackendError):
+                        pass
+            ms = (time.perf_counter() - start) / (n_rounds * n_fixtures) * 1000
+            print(f"{label:<18} {ms:>10.1f} {recognized:>6}/{n_rounds * n_fixtures}")
+            metrics[f"{label.replace(' ', '')}_ms"] = ms
+            for name, st in chain.summary().items():
+                print(f"    {name:<8} calls {st['calls']:>4}  ok {st['ok']:>4}  p50 {st['p50_ms']:.1f} ms  "
+                      f"p95 {st['p95_ms']:.1f} ms")
+        return metrics
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@benchmark
+def bench_pipeline(n_phrases=12, speak_s=0.1, dispatch_s=0.03):
+    """Sequential listen/recognize/dispatch vs. SpeechPipeline, with variable recognition latency."""
+    from pipeline import SpeechPipeline
+    rnd = random.Random(15)
+    recognize_s = [rnd.uniform(0.05, 0.2) for _ in range(n_phrases)]
+
+    def recognize(i):
+        time.sleep(recognize_s[i])
+        return f'phrase {i}'
+
+    start = time.perf_counter()
+    for i in range(n_phrases):
+        time.sleep(speak_s)  # listening to the phrase
+        recognize(i)
+        time.sleep(dispatch_s)
+    sequential = time.perf_counter() - start
+
+    phrases = iter(range(n_phrases))
+
+    def capture(timeout):
+        i = next(phrases, None)
+        if i is not None:
+            time.sleep(speak_s)
+        return i
+
+    pipeline = SpeechPipeline(capture, recognize, workers=2)
+    start = time.perf_counter()
+    pipeline.start()
+    order = []
+    for _ in range(n_phrases):
+        item = pipeline.get(timeout=5)
+        order.append(item.value)
+        time.sleep(dispatch_s)
+        pipeline.record_dispatch(dispatch_s)
+    pipelined = time.perf_counter() - start
+    pipeline.stop()
+    in_order = order == [f'phrase {i}' for i in range(n_phrases)]
+    m = pipeline.metrics()
+    print(f"{n_phrases} phrases: sequential {sequential * 1000:.0f} ms, pipelined {pipelined * 1000:.0f} ms "
+          f"({sequential / pipelined:.2f}x), delivered in order: {in_order}")
+    for stage in ('queue_wait', 'recognize', 'reorder', 'end_to_end'):
+        st = m[stage]
+        print(f"    {stage:<11} mean {st['mean_ms']:6.1f} ms  max {st['max_ms']:6.1f} ms  "
+              f"max queue depth {st['max_queue_depth']}")
+    return {'sequential_ms': sequential * 1000, 'pipelined_ms': pipelined * 1000, 'in_order': int(in_order)}
+
+
+def tone_word(syllables, rate=16000, tempo=1.0, gain=1.0, noise=40, seed=0):
+    """16-bit mono PCM of a synthetic "word": (seconds, amplitude, frequency) syllables, stretched by tempo."""
+    rnd = random.Random(seed)
+    samples = array('h')
+    for seconds, amp, freq in syllables:
+        n = int(seconds * tempo * rate)
+        a = amp * gain
+        samples.extend(max(-32768, min(32767, int(a * math.sin(2 * math.pi * freq * i / rate))
+                                       + rnd.randint(-noise, noise))) for i in range(n))
+    return samples.tobytes()
+
+
+class _Audio:
+    """The AudioData fields the wake-word gate reads."""
+
+    def __init__(self, frame_data, sample_rate, sample_width):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+
+def _read_wav_dir(path):
+    out = []
+    for name in sorted(os.listdir(path)) if os.path.isdir(path) else ():
+        if name.lower().endswith('.wav'):
+            with wave.open(os.path.join(path, name), 'rb') as w:
+                out.append((w.readframes(w.getnframes()), w.getframerate(), w.getsampwidth()))
+    return out
+
+
+def _wake_fixtures(root, n_positive, n_negative):
+    """Write synthetic WAV fixtures (templates/, positive/, negative/) and return the directory."""
+    rnd = random.Random(16)
+    wake = [(0.12, 7000, 300), (0.08, 2500, 2400), (0.18, 6000, 600), (0.10, 3000, 1800)]
+    silence = (0.15, 0, 0)
+    dirs = {d: os.path.join(root, d) for d in ('templates', 'positive', 'negative')}
+    for d in dirs.values():
+        os.makedirs(d)
+
+    def other_word():
+        return [(rnd.uniform(0.06, 0.2), rnd.choice([2000, 4000, 7000]), rnd.choice([200, 450, 900, 1500, 3000]))
+                for _ in range(rnd.randint(3, 6))]
+
+    def say(syllables, i):
+        return tone_word(syllables, tempo=rnd.uniform(0.85, 1.15), gain=rnd.uniform(0.6, 1.4),
+                         noise=rnd.choice([40, 200, 600]), seed=i)
+
+    for i in range(3):
+        write_wav(os.path.join(dirs['templates'], f'wake{i}.wav'), say([silence] + wake + [silence], i))
+    for i in range(n_positive):
+        # half say the command in the same breath, half pause for the gate to open
+        tail = [silence] + (other_word() if i % 2 else []) + [silence]
+        write_wav(os.path.join(dirs['positive'], f'wake{i}.wav'), say([silence] + wake + tail, 100 + i))
+    for i in range(n_negative):
+        write_wav(os.path.join(dirs['negative'], f'other{i}.wav'),
+                  say([silence] + other_word() + other_word() + [silence], 1000 + i))
+    return root
+
+
+@benchmark
+def bench_wake_word(n_positive=60, n_negative=120):
+    """Wake-word gate on WAV fixtures: false-accept / false-reject rates and CPU per phrase.
+
+    Uses synthetic tone "words" by default; set IO_WAKE_FIXTURES to a directory with
+    templates/, positive/ and negative/ recordings of the real name to measure those instead.
+    """
+    from wake_word import TemplateSpotter, WakeWordGate
+    root = None
+    fixtures = os.environ.get('IO_WAKE_FIXTURES')
+    if not fixtures:
+        root = fixtures = _wake_fixtures(tempfile.mkdtemp(prefix='io_bench_wake_'), n_positive, n_negative)
+    try:
+        spotter = TemplateSpotter(_read_wav_dir(os.path.join(fixtures, 'templates')))
+        gate = WakeWordGate([spotter], awake_seconds=0, audio_factory=_Audio)
+        gate.spotter = spotter
+        positives = _read_wav_dir(os.path.join(fixtures, 'positive'))
+        negatives = _read_wav_dir(os.path.join(fixtures, 'negative'))
+
+        def accepted(fixture):
+            before = gate.stats['wake_hits']
+            gate.filter(_Audio(*fixture))
+            return gate.stats['wake_hits'] > before
+
+        start = time.process_time()
+        false_rejects = sum(not accepted(f) for f in positives)
+        false_accepts = sum(accepted(f) for f in negatives)
+        cpu_ms = (time.process_time() - start) / max(1, len(positives) + len(negatives)) * 1000
+        audio_s = sum(len(raw) / (rate * width) for raw, rate, width in positives + negatives)
+        frr = false_rejects / max(1, len(positives))
+        far = false_accepts / max(1, len(negatives))
+        print(f"{len(spotter.templates)} templates, {len(positives)} wake phrases, {len(negatives)} other phrases "
+              f"({audio_s:.0f} s of audio)")
+        print(f"false reject: {frr:.1%}  false accept: {far:.1%}  CPU: {cpu_ms:.2f} ms per phrase")
+        # without the gate every other-phrase would have gone to the recognizer chain
+        print(f"recognizer calls avoided: {len(negatives) - false_accepts}/{len(negatives)}")
+        return {'false_reject_rate': frr, 'false_accept_rate': far, 'cpu_ms_per_phrase': cpu_ms}
+    finally:
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+@benchmark
+def bench_preprocess(n_fixtures=20, rate=48000, uplink_kbps=1000.0):
+    """Bytes sent and recognition latency per phrase with and without audio_preprocess.Preprocessor.
+
+    Phrases are 48 kHz WAV fixtures shaped like listener output: pre-roll, a quiet command, a trailing
+    pause, background noise. The recognizer is a fake online service whose latency is a round trip
+    plus uploading the FLAC payload at `uplink_kbps` plus 50 ms per second of audio on the server.
+    """
+    try:
+        import speech_recognition as sr
+        import numpy  # noqa: F401
+    except ImportError as e:
+        print(f'{e.name} is not installed; skipped')
+        return {}
+    from audio_preprocess import Preprocessor
+    root = tempfile.mkdtemp(prefix='io_bench_pre_')
+    try:
+        rnd = random.Random(17)
+        fixtures = []
+        for i in range(n_fixtures):
+            path = os.path.join(root, f'cmd{i}.wav')
+            pcm = synthetic_pcm([(0.5, 0), (rnd.uniform(0.6, 1.8), rnd.choice([600, 1200, 2500])), (0.8, 0)],
+                                rate=rate, seed=i)
+            write_wav(path, pcm, rate)
+            with sr.AudioFile(path) as source:
+                fixtures.append(sr.Recognizer().record(source))
+
+        def online_latency(audio):
+            payload = len(audio.get_flac_data())
+            seconds = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+            return 0.03 + payload * 8 / (uplink_kbps * 1000) + 0.05 * seconds, payload
+
+        pre = Preprocessor()
+        rows = {}
+        for label, prepare in (('as captured', lambda a: a), ('preprocessed', pre.process)):
+            raw_bytes = flac_bytes = 0
+            latency = prep = 0.0
+            for audio in fixtures:
+                start = time.perf_counter()
+                out = prepare(audio)
+                prep += time.perf_counter() - start
+                modeled, payload = online_latency(out)
+                raw_bytes += len(out.frame_data)
+                flac_bytes += payload
+                latency += modeled
+            rows[label] = (raw_bytes / n_fixtures, flac_bytes / n_fixtures, prep / n_fixtures * 1000,
+                           latency / n_fixtures * 1000)
+        print(f"{'':<14} {'PCM bytes':>10} {'FLAC bytes':>11} {'prep ms':>8} {'recognize ms':>13}")
+        for label, (pcm_b, flac_b, prep_ms, rec_ms) in rows.items():
+            print(f"{label:<14} {pcm_b:>10.0f} {flac_b:>11.0f} {prep_ms:>8.2f} {rec_ms + prep_ms:>13.1f}")
+        before, after = rows['as captured'], rows['preprocessed']
+        return {'bytes_before': before[1], 'bytes_after': after[1], 'preprocess_ms': after[2],
+                'recognize_before_ms': before[3], 'recognize_after_ms': after[3] + after[2]}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def _garble(text, rnd, n=2):
+    """Replace n letters, the way a recognizer mishears a word."""
+    chars = list(text)
+    spots = [i for i, ch in enumerate(chars) if not ch.isspace()]
+    for i in rnd.sample(spots, min(n, len(spots))):
+        chars[i] = rnd.choice('ابپتسشکگ')
+    return ''.join(chars)
+
+
+@benchmark
+def bench_nbest(n_fixtures=40, latency=0.05, reprompt_s=2.0):
+    """Top hypothesis vs. n-best rescoring on WAV fixtures: retry rate and end-to-end time per command.
+
+    Each fixture has a scripted n-best list: the recognizer's first guess is misheard for most of
+    them, the right command is further down, and some are free text with no command at all.
+    A command that does not resolve to the intended intent costs a retry: the re-prompt
+    (`reprompt_s`), saying the phrase again and another recognition.
+    """
+    try:
+        import speech_recognition as sr
+    except ImportError:
+        print('speech_recognition is not installed; skipped')
+        return {}
+    import recognizers
+    io_mod = _assistant()
+    rnd = random.Random(18)
+    commands = []
+    for phrases in io_mod.SYNONYMS.values():
+        for phrase in phrases:
+            intent = io_mod.INTENTS.resolve(phrase)
+            if intent is not None:
+                commands.append((phrase, intent[0].name))
+    root = tempfile.mkdtemp(prefix='io_bench_nbest_')
+    try:
+        fixtures, responses, expected = [], {}, []
+        for i in range(n_fixtures):
+            path = os.path.join(root, f'cmd{i}.wav')
+            seconds = rnd.uniform(0.8, 1.6)
+            write_wav(path, synthetic_pcm([(0.2, 0), (seconds, 5000), (0.3, 0)], seed=100 + i))
+            with sr.AudioFile(path) as source:
+                audio = sr.Recognizer().record(source)
+            phrase, intent = rnd.choice(commands)
+            kind = i % 5
+            if kind == 0:  # heard right
+                nbest = [(phrase, 0.92), (_garble(phrase, rnd), None)]
+            elif kind == 4:  # no command in it: free text must survive untouched
+                phrase, intent = ' '.join(rnd.sample(_FILLER, 3)), None
+                nbest = [(phrase, 0.7), (_garble(phrase, rnd), None)]
+            else:  # misheard first guess, the command is the 2nd/3rd alternative
+                wrong = [_garble(phrase, rnd) for _ in range(kind % 2 + 1)]
+                nbest = [(wrong[0], 0.81)] + [(w, None) for w in wrong[1:]] + [(phrase, None)]
+            responses[recognizers.audio_key(audio)] = nbest
+            fixtures.append((audio, seconds))
+            expected.append((phrase, intent))
+
+        chains = {'top hypothesis': recognizers.RecognizerChain(
+                      [recognizers.FakeBackend(responses, name='online', latency=latency)]),
+                  'n-best rescored': recognizers.RecognizerChain(
+                      [recognizers.FakeBackend(responses, name='online', latency=latency)], io_mod.RESCORER)}
+        metrics = {}
+        print(f"{'':<16} {'retry rate':>10} {'free text kept':>15} {'ms/command':>11} {'rescore us':>11}")
+        for label, chain in chains.items():
+            retries = kept = free = 0
+            total = 0.0
+            start_pick = io_mod.RESCORER.stats['picks']
+            for (audio, seconds), (phrase, intent) in zip(fixtures, expected):
+                start = time.perf_counter()
+                text, _backend = chain.recognize(audio)
+                recognize_s = time.perf_counter() - start
+                total += recognize_s
+                if intent is None:
+                    free += 1
+                    kept += text == phrase
+                    continue
+                found = io_mod.INTENTS.resolve(text)
+                if found is None or found[0].name != intent:
+                    retries += 1
+                    total += reprompt_s + seconds + recognize_s
+            picks = io_mod.RESCORER.stats['picks'] - start_pick
+            n_commands = len(fixtures) - free
+            rate = retries / max(1, n_commands)
+            ms = total / len(fixtures) * 1000
+            rescore_us = _per_call_us(io_mod.RESCORER.pick, [nb for nb in responses.values()], repeat=3) \
+                if picks else 0.0
+            print(f"{label:<16} {rate:>10.1%} {kept:>9}/{free:<5} {ms:>11.0f} {rescore_us:>11.1f}")
+            key = label.split()[0].replace('-', '')
+            metrics[f'{key}_retry_rate'] = rate
+            metrics[f'{key}_e2e_ms'] = ms
+        return metrics
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+@benchmark
+def bench_speech_output(n=20, speech_s=0.05):
+    """Time the caller is blocked per speak(): synthesis on the caller vs. the SpeechOutput worker."""
+    from speech_output import SpeechOutput
+
+    def render(text, opts, cancelled):
+        cancelled.wait(speech_s)  # stands in for runAndWait()
+
+    start = time.perf_counter()
+    for i in range(n):
+        render(f'reply {i}', {}, threading.Event())
+    blocking_ms = (time.perf_counter() - start) / n * 1000
+
+    out = SpeechOutput(render)
+    start = time.perf_counter()
+    futures = [out.say(f'reply {i}') for i in range(n)]
+    queued_ms = (time.perf_counter() - start) / n * 1000
+    time.sleep(speech_s * 2.5)
+    start = time.perf_counter()
+    out.cancel()
+    cancel_ms = (time.perf_counter() - start) * 1000
+    out.wait(5)
+    spoken = sum(1 for f in futures if not f.cancelled() and f.result())
+    print(f"caller blocked per utterance: {blocking_ms:.2f} ms inline, {queued_ms:.3f} ms queued")
+    print(f"barge-in after ~2 utterances: cancel() took {cancel_ms:.2f} ms, {spoken} spoken, "
+          f"{out.stats['interrupted']} interrupted, {out.stats['dropped']} dropped")
+    return {'inline_ms': blocking_ms, 'queued_ms': queued_ms, 'cancel_ms': cancel_ms}
+
+class _FakeVoiceEngine:
+    """pyttsx3-shaped engine whose getProperty('voices') builds the voice list like a driver does."""
+
+    def __init__(self, n_voices, persian=True):
+        self.n_voices = n_voices
+        self.persian = persian
+        self.voice_lists = 0
+
+    def getProperty(self, name):
+        if name != 'voices':
+            return None
+        self.voice_lists += 1
+        voices = [types.SimpleNamespace(id=f'HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\Tokens\\'
+                                           f'TTS_MS_EN-US_VOICE{i}_11.0', name=f'Microsoft Voice {i} - English',
+                                        languages=[]) for i in range(self.n_voices)]
+        if self.persian:
+            voices.append(types.SimpleNamespace(id='HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Speech\\Voices\\'
+                                                   'Tokens\\TTS_MS_FA-IR_DARIUS_11.0',
+                                                name='Microsoft Darius - Persian', languages=[]))
+        return voices
+
+
+def _legacy_use_online(engine, lang):
+    """The per-call routing scan speak() used to do."""
+    if not lang.startswith('fa'):
+        return False
+    vs = engine.getProperty('voices')
+    for v in vs:
+        s = f"{getattr(v, 'id', '') or ''} {getattr(v, 'name', '') or ''}".lower()
+        if 'fa' in s or 'farsi' in s or 'persian' in s:
+            return False
+    return True
+
+
+@benchmark
+def bench_voice_routing(n_voices=120, n=2000):
+    """speak() routing decision (local voice vs. online TTS): per-call voice scan vs. VoiceRegistry lookup."""
+    from tts_voices import VoiceRegistry
+    metrics = {}
+    print(f"{'voices':<22} {'scan us':>9} {'registry us':>12} {'probe ms':>9}  fa voice")
+    for persian in (True, False):
+        engine = _FakeVoiceEngine(n_voices, persian)
+        langs = ['fa-IR' if i % 3 else 'en' for i in range(n)]
+        scan_us = _per_call_us(lambda lang: _legacy_use_online(engine, lang), langs, repeat=1)
+        start = time.perf_counter()
+        registry = VoiceRegistry().probe(engine)
+        probe_ms = (time.perf_counter() - start) * 1000
+        lookup_us = _per_call_us(lambda lang: lang.startswith('fa') and not registry.has('fa'), langs)
+        label = f"{n_voices}{' + Persian' if persian else ' English only'}"
+        print(f"{label:<22} {scan_us:>9.2f} {lookup_us:>12.3f} {probe_ms:>9.2f}  {registry.preferred('fa')}")
+        key = 'fa' if persian else 'nofa'
+        metrics[f'{key}_scan_us'] = scan_us
+        metrics[f'{key}_lookup_us'] = lookup_us
+    return metrics
+
+@benchmark
+def bench_tts_cache(n_utterances=200, latency=0.02):
+    """Online TTS per utterance: temp-file render every time vs. TTSCache (fake gTTS with network latency)."""
+    from tts_cache import TTSCache, cache_key
+    io_mod = _assistant()
+    phrases = io_mod.static_phrases()
+    rnd = random.Random(19)
+    # replies repeat: a few (greetings, volume, music) dominate
+    session = [phrases[min(len(phrases) - 1, int(rnd.paretovariate(1.2)) - 1)] for _ in range(n_utterances)]
+    synth_calls = _Counter()
+
+    def synthesize(text):
+        synth_calls()
+        time.sleep(latency)  # request round trip
+        return text.encode('utf-8') * 200  # ~mp3-sized payload
+
+    root = tempfile.mkdtemp(prefix='io_bench_tts_')
+    try:
+        start = time.perf_counter()
+        for text in session:  # the old path: mkstemp, save, play, delete
+            fd, path = tempfile.mkstemp(suffix='.mp3', dir=root)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(synthesize(text))
+            with open(path, 'rb') as f:
+                f.read()
+            os.remove(path)
+        legacy_ms = (time.perf_counter() - start) / n_utterances * 1000
+
+        cache = TTSCache(os.path.join(root, 'cache'), max_bytes=2 * 1024 * 1024)
+        synth_calls.calls = 0
+        start = time.perf_counter()
+        for text in session:
+            with open(cache.fetch(cache_key(text, 'fa', None, 'gtts'), lambda: synthesize(text)), 'rb') as f:
+                f.read()
+        cached_ms = (time.perf_counter() - start) / n_utterances * 1000
+        cached_synth = synth_calls.calls
+
+        items = [(cache_key(text, 'fa', None, 'gtts'), text) for text in phrases]
+        warm_ms = {}
+        for workers in (1, 8):
+            warm_cache = TTSCache(os.path.join(root, f'warm{workers}'))
+            start = time.perf_counter()
+            warm_cache.warm(items, synthesize, workers=workers)
+            warm_ms[workers] = (time.perf_counter() - start) * 1000
+        small = TTSCache(os.path.join(root, 'small'), max_bytes=20000)
+        for key, text in items:
+            small.put(key, synthesize(text))
+        print(f"{n_utterances} utterances over {len(set(session))} distinct replies")
+        print(f"per utterance: render every time {legacy_ms:.1f} ms, cached {cached_ms:.2f} ms "
+              f"({cached_synth} syntheses, hit rate {cache.stats['hits'] / n_utterances:.0%})")
+        print(f"warm-up of {len(items)} static replies: {warm_ms[1]:.0f} ms serial, {warm_ms[8]:.0f} ms on 8 workers")
+        print(f"size cap 20 KB: {len(small)} files, {small.size} bytes kept, {small.stats['evictions']} evicted")
+        return {'legacy_ms': legacy_ms, 'cached_ms': cached_ms, 'warm_serial_ms': warm_ms[1],
+                'warm_pool_ms': warm_ms[8]}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# --- Results ------------------------------------------------------------------
+
+class _FakeMixer:
+    """pygame.mixer stand-in: load() reads and parses the WAV (path or file object), playback lasts its duration."""
+
+    def __init__(self):
+        self.music = self
+        self.first_sound = None
+        self._until = 0.0
+        self._loaded = 0.0
+
+    def get_init(self):
+        return (22050, -16, 1)
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def load(self, source, namehint=''):
+        with wave.open(source, 'rb') as w:
+            frames = w.readframes(w.getnframes())
+            self._loaded = len(frames) / float(w.getframerate() * w.getsampwidth())
+
+    def play(self):
+        self.first_sound = time.perf_counter()
+        self._until = self.first_sound + self._loaded
+
+    def get_busy(self):
+        return time.perf_counter() < self._until
+
+    def stop(self):
+        self._until = 0.0
+
+    def Sound(self, buffer):
+        mixer = self
+
+        class _Sound:
+            def play(self):
+                mixer._loaded = len(buffer) / (22050 * 2.0)
+                mixer.play()
+                return mixer
+        return _Sound()
+
+
+@benchmark
+def bench_first_sound(n=30, speech_s=0.33):
+    """Online TTS handoff: temp file + path load + sleep poll vs. in-memory buffer (fake local synthesizer)."""
+    from speech_playback import MixerPlayer, SpeechBuffer
+    pcm = synthetic_pcm([(speech_s, 0.4)], rate=22050, seed=21)
+
+    def synthesize_into(fp):  # gTTS.write_to_fp stand-in: local, no network
+        with wave.open(fp, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(22050)
+            w.writeframes(pcm)
+
+    mixer = _FakeMixer()
+    root = tempfile.mkdtemp(prefix='io_bench_play_')
+    legacy = {'first': [], 'tail': [], 'cancel': []}
+    buffered = {'first': [], 'tail': [], 'cancel': []}
+    pcm_first = []
+    try:
+        for i in range(n):
+            cancel_at = speech_s * 0.37 if i % 2 else None
+            fired = []
+            # before: mkstemp, save, load(path), play, sleep(0.05) until idle, remove
+            cancelled = threading.Event()
+            if cancel_at:
+                threading.Timer(cancel_at, lambda ev=cancelled: (fired.append(time.perf_counter()), ev.set(), mixer.stop())).start()
+            start = time.perf_counter()
+            fd, path = tempfile.mkstemp(suffix='.wav', dir=root)
+            with os.fdopen(fd, 'wb') as f:
+                synthesize_into(f)
+            mixer.load(path)
+            mixer.play()
+            legacy['first'].append(mixer.first_sound - start)
+            end = mixer._until
+            while mixer.get_busy() and not cancelled.is_set():
+                time.sleep(0.05)
+            done = time.perf_counter()
+            os.remove(path)
+            if cancel_at:
+                legacy['cancel'].append(done - fired[0])
+            else:
+                legacy['tail'].append(done - end)
+
+            # after: synthesize into memory, hand the buffer to the player
+            player = MixerPlayer(lambda: mixer)
+            cancelled = threading.Event()
+            fired = []
+            if cancel_at:
+                threading.Timer(cancel_at, lambda ev=cancelled, pl=player: (fired.append(time.perf_counter()), ev.set(), pl.stop())).start()
+            start = time.perf_counter()
+            buf = io.BytesIO()
+            synthesize_into(buf)
+            play_start = time.perf_counter()
+            player.play(SpeechBuffer(buf.getvalue(), 'wav'), cancelled, start)
+            done = time.perf_counter()
+            buffered['first'].append(mixer.first_sound - start)
+            if cancel_at:
+                buffered['cancel'].append(done - fired[0])
+            else:
+                buffered['tail'].append(done - max(play_start, mixer.first_sound + speech_s))
+
+            # pre-decoded PCM: no container, no decode
+            start = time.perf_counter()
+            player.play(SpeechBuffer.pcm(pcm, 22050), threading.Event(), start)
+            pcm_first.append(mixer.first_sound - start)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    def ms(values):
+        return sum(values) / len(values) * 1000 if values else 0.0
+
+    print(f"{n} utterances of {speech_s:.2f} s (every 2nd cancelled part-way); tail = idle after the audio ends")
+    print(f"{'':14}{'first sound':>13}{'tail':>10}{'cancel':>10}")
+    print(f"{'temp file':14}{ms(legacy['first']):>10.3f} ms{ms(legacy['tail']):>7.1f} ms{ms(legacy['cancel']):>7.1f} ms")
+    print(f"{'in memory':14}{ms(buffered['first']):>10.3f} ms{ms(buffered['tail']):>7.1f} ms{ms(buffered['cancel']):>7.1f} ms")
+    print(f"{'decoded PCM':14}{ms(pcm_first):>10.3f} ms")
+    return {'legacy_first_ms': ms(legacy['first']), 'buffered_first_ms': ms(buffered['first']),
+            'pcm_first_ms': ms(pcm_first), 'legacy_tail_ms': ms(legacy['tail']),
+            'buffered_tail_ms': ms(buffered['tail']), 'legacy_cancel_ms': ms(legacy['cancel']),
+            'buffered_cancel_ms': ms(buffered['cancel'])}
+
+
+_SUMMARY = ("تهران پایتخت و بزرگ‌ترین شهر ایران است. این شهر در دامنه جنوبی رشته‌کوه البرز قرار دارد و "
+            "جمعیت آن بیش از ۸.۷ میلیون نفر است؛ با احتساب حومه، این رقم به حدود ۱۵ میلیون می‌رسد. "
+            "تهران از زمان آقا محمدخان قاجار پایتخت ایران بوده است، و امروز مرکز سیاسی، اقتصادی و فرهنگی کشور است. "
+            "آیا می‌دانستید که برج میلاد ششمین برج مخابراتی بلند جهان است؟ "
+            "این شهر دارای موزه‌ها، پارک‌ها و بازارهای تاریخی فراوانی است.")
+
+
+@benchmark
+def bench_chunked_tts(n=5, request_s=0.08, synth_ms_per_char=0.6, play_ms_per_char=3.0):
+    """Long reply: one whole-text render vs. sentence chunks rendered ahead while the previous one plays."""
+    import speech_chunks
+    chunks = speech_chunks.split_sentences(_SUMMARY)
+    renders = []
+
+    def synthesize(text):  # fake gTTS: request overhead + time proportional to the text
+        renders.append(text)
+        time.sleep(request_s + len(text) * synth_ms_per_char / 1000)
+        return text
+
+    def play(text, cancelled):
+        cancelled.wait(len(text) * play_ms_per_char / 1000)
+
+    whole = {'first': 0.0, 'total': 0.0}
+    chunked = {'first': 0.0, 'total': 0.0}
+    for _ in range(n):
+        start = time.perf_counter()
+        data = synthesize(_SUMMARY)
+        whole['first'] += time.perf_counter() - start
+        play(data, threading.Event())
+        whole['total'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        first = None
+        for _chunk, data in speech_chunks.prefetched(chunks, synthesize, threading.Event()):
+            if first is None:
+                first = time.perf_counter() - start
+            play(data, threading.Event())
+        chunked['first'] += first
+        chunked['total'] += time.perf_counter() - start
+
+    # barge-in during the first sentence: what is still rendered afterwards
+    renders.clear()
+    cancelled = threading.Event()
+    played = 0
+    for _chunk, data in speech_chunks.prefetched(chunks, synthesize, cancelled):
+        threading.Timer(0.05, cancelled.set).start()
+        play(data, cancelled)
+        played += 1
+    time.sleep(request_s * 2)
+    print(f"{len(_SUMMARY)} chars in {len(chunks)} chunks: " + ', '.join(str(len(c)) for c in chunks))
+    print(f"{'':12}{'first audio':>12}{'finished':>11}")
+    for label, m in (('whole text', whole), ('chunked', chunked)):
+        print(f"{label:12}{m['first'] / n * 1000:>9.0f} ms{m['total'] / n * 1000:>8.0f} ms")
+    print(f"cancel in chunk 1: {played} played, {len(renders)} of {len(chunks)} chunks rendered")
+    return {'whole_first_ms': whole['first'] / n * 1000, 'chunked_first_ms': chunked['first'] / n * 1000,
+            'whole_total_ms': whole['total'] / n * 1000, 'chunked_total_ms': chunked['total'] / n * 1000,
+            'rendered_after_cancel': len(renders)}
+
+
+class _StartupEngine:
+    """pyttsx3 stand-in: every runAndWait() pays a fixed startup before speaking its text."""
+
+    def __init__(self, startup_s, per_char_s):
+        self.startup_s = startup_s
+        self.per_char_s = per_char_s
+        self.runs = 0
+        self._text = ''
+
+    def say(self, text):
+        self._text += str(text)
+
+    def runAndWait(self):
+        self.runs += 1
+        time.sleep(self.startup_s + len(self._text) * self.per_char_s)
+        self._text = ''
+
+    def getProperty(self, name):
+        return []
+
+    def setProperty(self, name, value):
+        pass
+
+    def stop(self):
+        pass
+
+
+# the speak() sequences of date(), tell_time(), system_status(), show_ip() and the events intent
+_HANDLER_REPLIES = [
+    ['تاریخ امروز:', 'میلادی: 18 October 2026', 'شمسی: 26 مهر 1405'],
+    ['ساعت فعلی:', '14:05:09'],
+    ['وضعیت سیستم:', 'باتری 80 درصد، رم 41 درصد، پردازنده 12 درصد، هارد 63 درصد.'],
+    ['آیپی سیستم:', 'آیپی داخلی 192.168.1.5 و آیپی عمومی 5.6.7.8'],
+    ['مناسبت‌های امروز:', 'جشن نوروز', 'روز جمهوری اسلامی', 'سیزده بدر'],
+]
+
+
+@benchmark
+def bench_speech_batch(rounds=3, startup_s=0.02, per_char_s=0.0002):
+    """Multi-part replies: one speak() job each vs. speech_batch() (one synthesis + one notification)."""
+    io_mod = _assistant()
+    engine = _StartupEngine(startup_s, per_char_s)
+    notify = _Counter()
+    saved = (io_mod._get_engine, io_mod.notify)
+    io_mod._get_engine, io_mod.notify = (lambda: engine), notify
+    results = {}
+    try:
+        for label, batched in (('separate', False), ('batched', True)):
+            engine.runs = notify.calls = 0
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for replies in _HANDLER_REPLIES:
+                    with (io_mod.speech_batch() if batched else contextlib.nullcontext()):
+                        for text in replies:
+                            io_mod.speak(text)
+                io_mod.OUTPUT.wait(30)
+            handled = rounds * len(_HANDLER_REPLIES)
+            results[label] = ((time.perf_counter() - start) / handled * 1000, engine.runs, notify.calls)
+    finally:
+        io_mod._get_engine, io_mod.notify = saved
+    calls = sum(len(r) for r in _HANDLER_REPLIES) * rounds
+    print(f"{rounds * len(_HANDLER_REPLIES)} handler replies, {calls} speak() calls")
+    for label, (ms, runs, notes) in results.items():
+        print(f"{label:9} {ms:7.1f} ms per reply, {runs} runAndWait, {notes} notifications")
+    saved_ms = (results['separate'][0] - results['batched'][0]) * len(_HANDLER_REPLIES) * rounds / (calls - results['batched'][1])
+    print(f"saved per merged call: {saved_ms:.1f} ms")
+    return {'separate_ms': results['separate'][0], 'batched_ms': results['batched'][0], 'saved_per_call_ms': saved_ms}
+
+
+def _tone_wav(path, seconds, freq, rate=22050, amp=0.5):
+    samples = array('h', (int(amp * 32767 * math.sin(2 * math.pi * freq * i / rate)) for i in range(int(seconds * rate))))
+    write_wav(path, samples.tobytes(), rate)
+
+
+@benchmark
+def bench_audio_output(n_chimes=50):
+    """Chimes: thread + file per sound vs. preloaded Sounds on the mixer; music ducking under speech; mixing cost."""
+    import audio_output
+    import numpy as np
+    root = tempfile.mkdtemp(prefix='io_bench_audio_')
+    try:
+        chime = os.path.join(root, 'info.wav')
+        _tone_wav(chime, 0.15, 880)
+
+        # before: a thread per notification that opens and plays the file (winsound stand-in: read + parse)
+        def legacy_play(path):
+            with wave.open(path, 'rb') as w:
+                w.readframes(w.getnframes())
+        start = time.perf_counter()
+        threads = []
+        for _ in range(n_chimes):
+            t = threading.Thread(target=legacy_play, args=(chime,), daemon=True)
+            t.start()
+            threads.append(t)
+        legacy_ms = (time.perf_counter() - start) / n_chimes * 1000
+        for t in threads:
+            t.join()
+
+        out = audio_output.AudioOutput(audio_output.NullSink())
+        out.preload([chime])
+        start = time.perf_counter()
+        for _ in range(n_chimes):
+            out.play(audio_output.ALERTS, chime)
+        mixer_ms = (time.perf_counter() - start) / n_chimes * 1000
+        out.close()
+
+        # music with speech over it, rendered to a WAV file
+        _tone_wav(os.path.join(root, 'music.wav'), 1.5, 220, amp=0.4)
+        wav_path = os.path.join(root, 'mix.wav')
+        out = audio_output.AudioOutput(audio_output.WavSink(wav_path, realtime=True), attack=0.05, release=0.2)
+        song = out.play(audio_output.MUSIC, os.path.join(root, 'music.wav'))
+        time.sleep(0.4)
+        speech = np.zeros(int(0.5 * 22050), dtype='<i2').tobytes()  # silent "speech": the mix is music alone
+        out.play(audio_output.SPEECH, types.SimpleNamespace(data=speech, format='pcm', rate=22050, channels=1, width=2)).wait(2)
+        song.wait(3)
+        out.close()
+        with wave.open(wav_path, 'rb') as w:
+            mix = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2').reshape(-1, 2)[:, 0].astype(np.float32)
+
+        def level(t0, t1):
+            seg = mix[int(t0 * 22050):int(t1 * 22050)]
+            return float(np.sqrt(np.mean(seg ** 2))) if len(seg) else 0.0
+        before, during, after = level(0.1, 0.35), level(0.6, 0.85), level(1.25, 1.45)
+
+        # mixing cost: music + speech + 3 chimes, as fast as the mixer goes
+        out = audio_output.AudioOutput(audio_output.NullSink(realtime=False))
+        out.play(audio_output.MUSIC, os.path.join(root, 'music.wav'), loop=True)
+        out.play(audio_output.SPEECH, os.path.join(root, 'music.wav'), loop=True)
+        for _ in range(3):
+            out.play(audio_output.ALERTS, chime, loop=True)
+        time.sleep(0.5)
+        blocks = out.stats['blocks']
+        out.close()
+        block_us = 0.5 / max(blocks, 1) * 1e6
+        print(f"start a chime: {legacy_ms:.3f} ms (thread + file) vs {mixer_ms:.3f} ms (preloaded, mixer)")
+        print(f"music level before / under speech / after: {before:.0f} / {during:.0f} / {after:.0f} "
+              f"(ducked to {during / before:.0%})")
+        print(f"mixing 5 voices: {block_us:.0f} us per 20 ms block ({block_us / 20000:.1%} of real time)")
+        return {'legacy_chime_ms': legacy_ms, 'mixer_chime_ms': mixer_ms, 'duck_ratio': during / before,
+                'block_us': block_us}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+@benchmark
+def bench_config_service(n=2000, n_apps=150):
+    """apps.json / notifications.json: parse per use vs. shared snapshots; reload latency after an edit."""
+    import config_service
+    root = tempfile.mkdtemp(prefix='io_bench_config_')
+    try:
+        apps, aliases = _synthetic_apps(n_apps, root)
+        path = os.path.join(root, 'apps.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'apps': apps, 'aliases': aliases}, f, ensure_ascii=False)
+
+        def parse(_):  # what every reader did: open, parse, normalize
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {k: [v] if isinstance(v, str) else v for k, v in data.get('apps', {}).items()}
+        parse_us = _per_call_us(parse, range(n // 10), repeat=1)
+
+        service = config_service.ConfigService(interval=0.05)
+        config = service.register('apps', path, config_service.validate_apps)
+        snapshot_us = _per_call_us(lambda _: config.snapshot['apps'], range(n))
+        check_us = _per_call_us(lambda _: config.check(), range(n), repeat=1)
+
+        seen = []
+        config.subscribe(lambda snap: seen.append((time.perf_counter(), len(snap['apps']))))
+        apps['newapp'] = ['/opt/newapp']
+        time.sleep(0.02)
+        written = time.perf_counter()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'apps': apps, 'aliases': aliases}, f, ensure_ascii=False)
+        deadline = time.time() + 2
+        while not seen and time.time() < deadline:
+            time.sleep(0.005)
+        reload_ms = (seen[0][0] - written) * 1000 if seen else float('nan')
+        os.utime(path)  # touched, same content: stat changes, hash does not
+        time.sleep(0.2)
+        service.stop()
+        print(f"read apps ({n_apps} entries): parse per use {parse_us:.1f} us, snapshot {snapshot_us:.2f} us, "
+              f"unchanged-file check {check_us:.2f} us")
+        print(f"edit picked up after {reload_ms:.0f} ms (50 ms watch interval); {len(seen)} callback(s), "
+              f"{config.reloads} reloads incl. the first load (touch without change ignored)")
+        return {'parse_us': parse_us, 'snapshot_us': snapshot_us, 'check_us': check_us, 'reload_ms': reload_ms}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(names):
+    """Run the named benchmarks; return the JSON-ready results document."""
+    results = {}
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f'Unknown benchmark: {name} (available: {", ".join(BENCHMARKS)})')
+            continue
+        print(f'--- {name} ---')
+        results[name] = BENCHMARKS[name]() or {}
+    return {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(base, current, tolerance=0.10):
+    """Print metrics of two result documents side by side; return the number of timing regressions."""
+    print(f"--- compare {base.get('commit')} -> {current.get('commit')} ---")
+    print(f"{'metric':<44} {'base':>11} {'current':>11} {'ratio':>7}")
+    regressions = 0
+    for name, metrics in current['results'].items():
+        old = base.get('results', {}).get(name, {})
+        for key, value in metrics.items():
+            if key not in old or not old[key]:
+                continue
+            ratio = value / old[key]
+            # timings (_us/_ms) are lower-is-better; everything else is informational
+            slower = key.split('@')[0].endswith(('_us', '_ms')) and ratio > 1 + tolerance
+            regressions += slower
+            flag = '  slower' if slower else ''
+            print(f"{name + '.' + key:<44} {old[key]:>11.2f} {value:>11.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Assistant micro-benchmarks')
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--json', metavar='PATH', help='write the results (with commit id) to this JSON file')
+    parser.add_argument('--compare', metavar='BASE_JSON', help='compare this run against an earlier --json file')
+    args = parser.parse_args()
+    doc = run(args.names or list(BENCHMARKS))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(doc, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        if compare(base, doc):
+            sys.exit(1)
@@ -0,0 +1,249 @@
+"""Shared JSON config files: parsed once, validated, reloaded when they change.
+
+notification.notify() re-read notifications.json on every call, and
+apps.json was parsed by io.py, again by apps_plugin.load_config() and a
+third time for the plugin manifest keywords, then never looked at again.
+Each file is now registered once with the process-wide ConfigService:
+
+    APPS_CONFIG = config_service.apps()          # parsed and validated here
+    APPS_CONFIG.snapshot['apps']                 # read-only view, shared by every reader
+    APPS_CONFIG.subscribe(rebuild_indexes)       # called with the new snapshot after a change
+
+- snapshots are immutable (dicts become mappingproxy, lists tuples), so a
+  reader can keep one without copying and never sees a half-applied reload
+- the validator fills defaults and drops values of the wrong type (logged);
+  a file that is not valid JSON keeps the previous snapshot
+- a file is only read when its mtime or size moved, and only parsed (and
+  the subscribers called) when its sha256 differs from the loaded one
+- subscribers run on the thread that found the change. Files registered
+  with watch=True are checked by a watcher thread every `interval` seconds,
+  so their subscribers must be thread-safe. apps.json is registered with
+  watch=False: its subscribers rebuild the dispatch tables, so io.py calls
+  SERVICE.poll() from the dispatch thread, before each command
+- `version` increases with every applied change, for caches keyed on it
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Optional
+
+_logger = logging.getLogger('io.config')
+
+APPS_PATH = Path(__file__).resolve().parent.parent / 'config' / 'apps.json'
+
+
+def freeze(value):
+    """Read-only copy of parsed JSON: dicts -> mappingproxy, lists -> tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def validate(data, schema: dict) -> tuple:
+    """Check data against {key: (type or types, default)}; returns (clean dict, error messages).
+
+    Missing keys get their default, keys of the wrong type are replaced by it,
+    keys the schema does not know are kept as they are.
+    """
+    errors = []
+    if not isinstance(data, dict):
+        return {key: default for key, (_types, default) in schema.items()}, [f'expected an object, got {type(data).__name__}']
+    clean = dict(data)
+    for key, (types, default) in schema.items():
+        if key not in clean:
+            clean[key] = default
+        elif not isinstance(clean[key], types) or (isinstance(clean[key], bool) and bool not in _as_tuple(types)):
+            errors.append(f'{key}: expected {_type_names(types)}, got {type(clean[key]).__name__}')
+            clean[key] = default
+    return clean, errors
+
+
+def _as_tuple(types) -> tuple:
+    return types if isinstance(types, tuple) else (types,)
+
+
+def _type_names(types) -> str:
+    return ' or '.join('null' if t is type(None) else t.__name__ for t in _as_tuple(types))
+
+
+class ConfigFile:
+    def __init__(self, name: str, path, validator: Callable[[object], tuple]) -> None:
+        self.name = name
+        self.path = Path(path)
+        self.validator = validator
+        self.watched = False  # checked by the watcher thread (else only by poll()/check_all())
+        self.snapshot = freeze(validator({})[0])
+        self.errors: list = []
+        self.loaded = False  # the file was read and parsed at least once
+        self.version = 0
+        self.reloads = 0
+        self._stat: Optional[tuple] = None
+        self._digest: Optional[str] = None
+        self._subscribers: list = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'<ConfigFile {self.name} v{self.version} {self.path}>'
+
+    def subscribe(self, callback: Callable) -> Callable:
+        """Call callback(snapshot) after every applied change; returns a function that unsubscribes."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def check(self) -> bool:
+        """Reload if the file changed on disk; True when a new snapshot was applied."""
+        with self._lock:
+            try:
+                st = self.path.stat()
+                stat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stat = None
+            if stat == self._stat:
+                return False
+            self._stat = stat
+            if stat is None:
+                _logger.debug('Config %s not found at %s; using defaults', self.name, self.path)
+                return False
+            try:
+                raw = self.path.read_bytes()
+            except OSError as e:
+                _logger.warning('Could not read %s: %s', self.path, e)
+                return False
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest == self._digest:
+                return False
+            try:
+                data = json.loads(raw.decode('utf-8-sig'))
+            except ValueError as e:
+                _logger.error('Invalid JSON in %s (keeping the previous config): %s', self.path, e)
+                return False
+            clean, errors = self.validator(data)
+            for message in errors:
+                _logger.warning('%s: %s', self.path.name, message)
+            self._digest = digest
+            self.snapshot = freeze(clean)
+            self.errors = errors
+            self.loaded = True
+            self.version += 1
+            self.reloads += 1
+            snapshot, subscribers = self.snapshot, list(self._subscribers)
+        _logger.debug('Loaded %s (version %d)', self.path, self.version)
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception:
+                _logger.exception('Config subscriber %r failed for %s', callback, self.name)
+        return True
+
+
+class ConfigService:
+    def __init__(self, interval: float = 2.0) -> None:
+        self.interval = interval
+        self._files: dict[str, ConfigFile] = {}  # resolved path -> file
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._polled_at = 0.0
+
+    def register(self, name: str, path, validator: Callable[[object], tuple], watch: bool = True) -> ConfigFile:
+        """The ConfigFile for path, loaded now on first registration; later calls share it.
+
+        watch=False: changes are only picked up by poll()/check_all(), on the caller's thread.
+        """
+        key = str(Path(path).resolve())
+        with self._lock:
+            config = self._files.get(key)
+            if config is not None:
+                return config
+            config = ConfigFile(name, path, validator)
+            config.watched = watch
+            self._files[key] = config
+            # loaded under the registry lock, so a concurrent register() never sees it empty
+            config.check()
+        if watch:
+            self.start()
+        return config
+
+    def get(self, name: str) -> Optional[ConfigFile]:
+        """The first file registered under name."""
+        with self._lock:
+            return next((f for f in self._files.values() if f.name == name), None)
+
+    def find(self, path) -> Optional[ConfigFile]:
+        """The registered file at path, if any."""
+        with self._lock:
+            return self._files.get(str(Path(path).resolve()))
+
+    def check_all(self, watched: Optional[bool] = None) -> list:
+        """Check every file (or only the watched / unwatched ones) once; returns the names reloaded."""
+        with self._lock:
+            files = [f for f in self._files.values() if watched is None or f.watched == watched]
+        return [f.name for f in files if f.check()]
+
+    def poll(self) -> list:
+        """check_all(watched=False), at most once per `interval`; call it from the thread that owns their state."""
+        now = time.monotonic()
+        if now - self._polled_at < self.interval:
+            return []
+        self._polled_at = now
+        return self.check_all(watched=False)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name='io-config-watch', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_all(watched=True)
+            except Exception:
+                _logger.exception('Config watcher failed')
+
+
+SERVICE = ConfigService()
+
+
+def validate_apps(data) -> tuple:
+    """apps.json: {"apps": {key: path or [paths]}, "aliases": {alias: key}}; paths become lists."""
+    clean, errors = validate(data, {'apps': (dict, {}), 'aliases': (dict, {})})
+    apps = {}
+    for key, value in clean['apps'].items():
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            errors.append(f'apps.{key}: expected a path or a list of paths')
+            value = []
+        apps[str(key)] = value
+    aliases = {}
+    for alias, key in clean['aliases'].items():
+        if not isinstance(key, str):
+            errors.append(f'aliases.{alias}: expected an app key')
+            continue
+        aliases[str(alias)] = key
+    clean['apps'], clean['aliases'] = apps, aliases
+    return clean, errors
+
+
+def apps(path=APPS_PATH) -> ConfigFile:
+    """apps.json, shared by io.py, the apps plugin and plugin manifests; reloaded by SERVICE.poll()."""
+    return SERVICE.register('apps', path, validate_apps, watch=False)
@@ -22,8 +22,8 @@ print('VOICE_QUEUE:', notification._config.get('voice_queue'))
 print('_speak_callable set?:', getattr(notification, '_speak_callable') is not None)
 print('ACTION_REGISTRY keys:', list(notification._ACTION_REGISTRY.keys()))
 print('PENDING ids:', list(notification._PENDING.keys()))
-print('TTS worker thread alive?:', getattr(notification, '_tts_worker_thread') is not None)
-print('TTS queue size:', notification._tts_queue.qsize())
+print('TTS worker speaking?:', notification._tts_output.speaking)
+print('TTS output stats:', notification._tts_output.stats)
 
 # If there is a pending notification, show its content
 for nid, it in notification._PENDING.items():
@@ -0,0 +1,119 @@
+"""Indexed fuzzy lookup over the assistant's command vocabulary.
+
+Replaces the brute-force "difflib ratio of every query word against every
+phrase" scan. Entries are stored in a character inverted index. For a query
+word, one walk over the postings of its characters gives, for every entry
+sharing a character, the size of the multiset intersection, i.e. difflib's
+quick_ratio() upper bound 2*I/(len(a)+len(b)). Only entries whose bound
+reaches the threshold are verified with SequenceMatcher.ratio(), so results
+are identical to the old scan (same 0.78 threshold semantics) while almost
+every candidate is rejected without running the quadratic matcher.
+"""
+from __future__ import annotations
+import difflib
+from collections import Counter
+from typing import Optional
+
+from text_normalizer import normalize_query, normalize_text
+
+DEFAULT_THRESHOLD = 0.78
+
+
+class FuzzyIndex:
+    """Vocabulary of phrases (each tagged with one or more values) for fuzzy lookup."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, memo_size: int = 2048) -> None:
+        self.threshold = threshold
+        self._phrases: list[str] = []
+        self._values: list[list] = []
+        self._ids: dict[str, int] = {}
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._memo: dict[tuple[str, float], list] = {}
+        self._memo_size = memo_size
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def add(self, phrase: str, value) -> None:
+        p = normalize_text(phrase)
+        if not p:
+            return
+        eid = self._ids.get(p)
+        if eid is None:
+            eid = len(self._phrases)
+            self._ids[p] = eid
+            self._phrases.append(p)
+            self._values.append([])
+            for ch, count in Counter(p).items():
+                self._postings.setdefault(ch, []).append((eid, count))
+        if value not in self._values[eid]:
+            self._values[eid].append(value)
+        self._memo.clear()
+
+    def lookup(self, word: str, threshold: Optional[float] = None, limit: Optional[int] = None) -> list:
+        """Return [(score, phrase, values), ...] with score >= threshold, best first."""
+        t = self.threshold if threshold is None else threshold
+        w = normalize_text(word)
+        if not w:
+            return []
+        key = (w, t)
+        cached = self._memo.get(key)
+        if cached is None:
+            cached = self._lookup(w, t)
+            if len(self._memo) >= self._memo_size:
+                self._memo.clear()
+            self._memo[key] = cached
+        return cached[:limit] if limit else list(cached)
+
+    def _lookup(self, w: str, t: float) -> list:
+        shared: dict[int, int] = {}
+        for ch, qcount in Counter(w).items():
+            for eid, count in self._postings.get(ch, ()):
+                shared[eid] = shared.get(eid, 0) + min(qcount, count)
+        la = len(w)
+        results = []
+        matcher = difflib.SequenceMatcher(None, w, '')
+        for eid, inter in shared.items():
+            phrase = self._phrases[eid]
+            # quick_ratio() bound: ratio() can never exceed 2*I/(la+lb)
+            if 2.0 * inter / (la + len(phrase)) < t:
+                continue
+            matcher.set_seq2(phrase)
+            score = matcher.ratio()
+            if score >= t:
+                results.append((score, phrase, list(self._values[eid])))
+        results.sort(key=lambda r: (-r[0], r[1]))
+        return results
+
+    def best(self, word: str, threshold: Optional[float] = None):
+        found = self.lookup(word, threshold, limit=1)
+        return found[0] if found else None
+
+    def search(self, query: str, threshold: Optional[float] = None) -> dict:
+        """Fuzzy-match every word of query; return {value: (score, phrase, word)} keeping the best per value."""
+        best: dict = {}
+        for w in normalize_query(query).words:
+            for score, phrase, values in self.lookup(w, threshold):
+                for v in values:
+                    if v not in best or score > best[v][0]:
+                        best[v] = (score, phrase, w)
+        return best
+
+
+def build_fuzzy_index(synonyms: dict, sites: Optional[dict] = None, apps: Optional[dict] = None,
+                      aliases: Optional[dict] = None, threshold: float = DEFAULT_THRESHOLD) -> FuzzyIndex:
+    """Build a FuzzyIndex over the command tables, using the same intent names as intent_index."""
+    index = FuzzyIndex(threshold)
+    for intent, phrases in (synonyms or {}).items():
+        if isinstance(phrases, str):
+            phrases = [phrases]
+        for p in phrases:
+            index.add(p, intent)
+    for name in (sites or {}):
+        index.add(name, f'site:{name}')
+    for key in (apps or {}):
+        index.add(key, f'app:{key}')
+    for alias in (aliases or {}):
+        index.add(alias, f'alias:{alias}')
+    return index
+
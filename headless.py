@@ -0,0 +1,262 @@
+"""Headless driver: feed transcripts through the assistant without mic, TTS or side effects.
+
+    python io.py --text                      # one transcript per stdin line
+    python io.py --replay commands.jsonl     # {"text": "..."} (or a JSON string) per line
+    python io.py --replay commands.jsonl --report results.json
+
+Each transcript goes through io.process_command(), i.e. the same
+normalization, emotion check, plugin dispatch and built-in handlers as the
+voice loop. Inside dry_run() speak() only records the text, and every action
+that would touch the machine (volume, brightness, Wi-Fi, music, launching
+programs, opening sites, screenshots, shutdown, writing files) is recorded
+instead of performed. Plugins still decide whether they claim a query
+(can_handle), but their handle() is recorded rather than run, since plugins
+launch programs through their own imports. takecommand() reads the next
+transcript, so follow-up prompts such as "تغییر نام" consume the next line
+like a spoken answer would.
+
+At the end a per-command latency table and the throughput are printed. A
+handler that raises counts as an error even though dispatch carries on, and
+main() then exits with status 1.
+"""
+from __future__ import annotations
+import builtins
+import io as _stdio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+from speech_output import completed
+
+_logger = logging.getLogger('io.headless')
+
+
+class DryRun:
+    """Collects what the assistant said and the actions it would have taken."""
+
+    def __init__(self, echo: bool = True) -> None:
+        self.echo = echo
+        self.spoken: list[str] = []
+        self.actions: list[str] = []
+        self.errors: list[str] = []
+
+    def speak(self, audio, **voice_opts):
+        self.spoken.append(str(audio))
+        if self.echo:
+            print(f"[SPEAK] {audio}")
+        return completed(True)  # io.speak() hands back a Future
+
+    def record(self, action: str) -> None:
+        self.actions.append(action)
+        if self.echo:
+            print(f"[DRY-RUN] {action}")
+
+    def handler_failed(self, intent, exc: BaseException) -> None:
+        self.errors.append(f'{intent.name}: {type(exc).__name__}: {exc}')
+        if self.echo:
+            print(f"[ERROR] {self.errors[-1]}")
+
+    def run_plugin(self, mod, query):
+        self.record(f"{getattr(mod, '__name__', mod)}.handle({str(query)!r})")
+
+    def recorder(self, name: str):
+        """A callable that records `name(args)` and does nothing else."""
+        def call(*args, **kwargs):
+            self.record(_describe(name, args, kwargs))
+        return call
+
+
+def _describe(name, args, kwargs) -> str:
+    parts = [repr(a) for a in args] + [f'{k}={v!r}' for k, v in kwargs.items()]
+    return f"{name}({', '.join(parts)})"
+
+
+class _RecordingModule:
+    """Stands in for a module; any call along an attribute path is recorded and returns a placeholder."""
+
+    def __init__(self, dry: DryRun, path: str) -> None:
+        self._dry = dry
+        self._path = path
+
+    def __getattr__(self, attr):
+        return _RecordingModule(self._dry, f'{self._path}.{attr}')
+
+    def __call__(self, *args, **kwargs):
+        self._dry.record(_describe(self._path, args, kwargs))
+        return f'<dry-run {self._path}>'
+
+
+class _DryRunOS:
+    """The os module, except that commands and file launches are recorded."""
+
+    def __init__(self, dry: DryRun) -> None:
+        self.system = dry.recorder('os.system')
+        self.startfile = dry.recorder('os.startfile')
+
+    def __getattr__(self, attr):
+        return getattr(os, attr)
+
+
+def _dry_run_open(dry: DryRun):
+    def _open(file, mode='r', *args, **kwargs):
+        if any(m in mode for m in 'wax+'):
+            dry.record(f'write {file!s}')
+            return _stdio.BytesIO() if 'b' in mode else _stdio.StringIO()
+        return builtins.open(file, mode, *args, **kwargs)
+    return _open
+
+
+# io.py globals replaced by recorders: hardware control and screen capture
+_RECORDED_FUNCTIONS = ('set_volume', 'change_volume', 'mute_volume', 'change_brightness', 'set_wifi',
+                       'run_exe', 'screenshot')
+# lazily imported subsystems and launchers replaced by recording stand-ins
+_RECORDED_MODULES = {'AUDIO': 'audio', 'pyautogui': 'pyautogui', 'wb': 'webbrowser',
+                     'subprocess': 'subprocess', 'wikipedia': 'wikipedia'}
+
+
+@contextmanager
+def dry_run(io_module, transcripts: Optional[Iterator[str]] = None, echo: bool = True):
+    """Patch io_module so commands run without audio or side effects; restores everything on exit."""
+    dry = DryRun(echo)
+    _missing = object()
+    patches = {'speak': dry.speak, 'os': _DryRunOS(dry), 'open': _dry_run_open(dry), '_run_plugin': dry.run_plugin}
+    for name in _RECORDED_FUNCTIONS:
+        patches[name] = dry.recorder(name)
+    for name, label in _RECORDED_MODULES.items():
+        patches[name] = _RecordingModule(dry, label)
+    if transcripts is not None:
+        patches['takecommand'] = lambda: next(transcripts, '')
+    saved = {name: io_module.__dict__.get(name, _missing) for name in patches}
+    set_speak = getattr(io_module, 'set_speak_callable', None)
+    intents = getattr(io_module, 'INTENTS', None)
+    saved_on_error = getattr(intents, 'on_error', None)
+    for name, value in patches.items():
+        setattr(io_module, name, value)
+    if callable(set_speak):
+        set_speak(dry.speak)
+    if intents is not None:
+        intents.on_error = dry.handler_failed
+    try:
+        yield dry
+    finally:
+        if intents is not None:
+            intents.on_error = saved_on_error
+        for name, value in saved.items():
+            if value is _missing:
+                delattr(io_module, name)
+            else:
+                setattr(io_module, name, value)
+        if callable(set_speak) and saved['speak'] is not _missing:
+            set_speak(saved['speak'])
+
+
+def read_replay(path) -> Iterator[str]:
+    """Transcripts from a JSONL file: {"text": ...} / {"query": ...} objects or bare JSON strings."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                _logger.warning('%s:%d is not valid JSON; skipped', path, lineno)
+                continue
+            text = item.get('text', item.get('query')) if isinstance(item, dict) else item
+            if isinstance(text, str):
+                yield text
+            else:
+                _logger.warning('%s:%d has no "text"; skipped', path, lineno)
+
+
+def read_lines(stream) -> Iterator[str]:
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run(io_module, transcripts: Iterable[str], echo: bool = True) -> dict:
+    """Process every transcript (stopping at an exit command, like the voice loop); return the report."""
+    feed = iter(transcripts)
+    results = []
+    with dry_run(io_module, feed, echo) as dry:
+        started = time.perf_counter()
+        for text in feed:
+            spoken, actions, errors = len(dry.spoken), len(dry.actions), len(dry.errors)
+            t0 = time.perf_counter()
+            try:
+                intent = io_module.process_command(text)
+                error = '; '.join(dry.errors[errors:]) or None  # handlers that raised inside dispatch
+            except Exception as e:
+                _logger.exception('Error processing %r', text)
+                intent, error = None, f'{type(e).__name__}: {e}'
+            ms = (time.perf_counter() - t0) * 1000
+            results.append({
+                'text': text,
+                'intent': intent.name if intent is not None else None,
+                'ms': ms,
+                'spoken': dry.spoken[spoken:],
+                'actions': dry.actions[actions:],
+                'error': error,
+            })
+            if intent is not None and intent.exits:
+                break
+        elapsed = time.perf_counter() - started
+    latencies = sorted(r['ms'] for r in results)
+    cache = getattr(getattr(io_module, 'INTENTS', None), 'cache', None)
+    return {
+        'commands': len(results),
+        'handled': sum(r['intent'] is not None and r['error'] is None for r in results),
+        'errors': sum(r['error'] is not None for r in results),
+        'seconds': elapsed,
+        'throughput_per_s': (len(results) / elapsed) if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': statistics.fmean(latencies) if latencies else 0.0,
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'max': latencies[-1] if latencies else 0.0,
+        },
+        'intent_cache': cache.stats() if cache is not None else None,
+        'results': results,
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{'ms':>9}  {'intent':<22} transcript"]
+    for r in report['results']:
+        intent = r['intent'] or '-'
+        if r['error']:
+            intent = f'{intent} (ERROR)' if r['intent'] else 'ERROR'
+        lines.append(f"{r['ms']:>9.2f}  {intent:<22} {r['text']}")
+    lat = report['latency_ms']
+    lines.append(f"{report['commands']} commands ({report['handled']} handled, {report['errors']} errors) "
+                 f"in {report['seconds'] * 1000:.1f} ms: {report['throughput_per_s']:.1f} commands/s")
+    lines.append(f"latency ms: mean {lat['mean']:.2f}, p50 {lat['p50']:.2f}, p95 {lat['p95']:.2f}, max {lat['max']:.2f}")
+    cache = report.get('intent_cache')
+    if cache:
+        lines.append(f"intent cache: {cache['hits']} hits / {cache['misses']} misses "
+                     f"({cache['hit_rate']:.0%}), {cache['invalidations']} invalidations")
+    return '\n'.join(lines)
+
+
+def main(io_module, replay: Optional[str] = None, report_path: Optional[str] = None, echo: bool = True) -> int:
+    transcripts = read_replay(replay) if replay else read_lines(sys.stdin)
+    report = run(io_module, transcripts, echo)
+    print(format_report(report))
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report['errors'] else 0
@@ -0,0 +1,149 @@
+"""Precompiled phrase index for resolving command intents in a single pass.
+
+The assistant's static command tables (SYNONYMS, SITES, APPS, APP_ALIASES)
+are compiled once into an Aho-Corasick automaton. Matching a query then
+costs one scan over its characters, no matter how many phrases are known,
+instead of one regex search per phrase per intent.
+
+Intent names produced by build_intent_index():
+- synonym keys are used as-is (e.g. 'volume_down')
+- 'site:<name>' for every SITES key
+- 'app:<key>' for every APPS key
+- 'alias:<alias>' for every APP_ALIASES key
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+from text_normalizer import normalize_query, normalize_text
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over unicode strings.
+
+    Each added phrase carries a value; iter_matches() yields every
+    (start, end, value) whose phrase occurs in the text, overlaps included.
+    """
+
+    def __init__(self) -> None:
+        self._goto: list[dict] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list] = [[]]
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def add(self, phrase: str, value) -> None:
+        if not phrase:
+            return
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(phrase), value))
+        self._built = False
+
+    def build(self) -> None:
+        """Compute failure links (breadth first) and merge output sets."""
+        goto, fail, out = self._goto, self._fail, self._out
+        pending = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            pending.append(child)
+        while pending:
+            node = pending.popleft()
+            for ch, child in goto[node].items():
+                pending.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, object]]:
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for length, value in out[node]:
+                    yield i - length + 1, i + 1, value
+
+
+class IntentIndex:
+    """Maps phrases to intent names and finds all intents present in a query.
+
+    Phrases and queries are folded with text_normalizer, so match offsets refer
+    to the normalized text. The last matched query is memoized, so the many
+    per-intent checks made while dispatching one utterance share a single
+    automaton pass.
+    """
+
+    def __init__(self) -> None:
+        self._automaton = AhoCorasick()
+        self._phrases: dict[str, list[str]] = {}
+        self._memo: tuple[Optional[str], dict] = (None, {})
+
+    def add(self, intent: str, phrases: Iterable[str]) -> None:
+        if isinstance(phrases, str):
+            phrases = [phrases]
+        for phrase in phrases:
+            p = normalize_text(phrase)
+            if not p:
+                continue
+            self._automaton.add(p, intent)
+            self._phrases.setdefault(intent, []).append(p)
+        self._memo = (None, {})
+
+    def build(self) -> 'IntentIndex':
+        self._automaton.build()
+        return self
+
+    def intents(self) -> list[str]:
+        return list(self._phrases)
+
+    def phrases(self, intent: str) -> list[str]:
+        return list(self._phrases.get(intent, []))
+
+    def match(self, query: str) -> dict[str, list[tuple[int, int]]]:
+        """Return {intent: [(start, end), ...]} for every phrase found in query."""
+        q = normalize_query(query)
+        memo_q, memo_hits = self._memo
+        if memo_q == q:
+            return memo_hits
+        hits: dict[str, list[tuple[int, int]]] = {}
+        for start, end, intent in self._automaton.iter_matches(q):
+            hits.setdefault(intent, []).append((start, end))
+        self._memo = (q, hits)
+        return hits
+
+    def has(self, query: str, intent: str) -> bool:
+        return intent in self.match(query)
+
+
+def build_intent_index(synonyms: dict, sites: Optional[dict] = None,
+                       apps: Optional[dict] = None, aliases: Optional[dict] = None) -> IntentIndex:
+    """Compile the assistant's command tables into a ready-to-use IntentIndex."""
+    index = IntentIndex()
+    for intent, phrases in (synonyms or {}).items():
+        index.add(intent, phrases)
+    for name in (sites or {}):
+        index.add(f'site:{name}', name)
+    for key in (apps or {}):
+        index.add(f'app:{key}', key)
+    for alias in (aliases or {}):
+        index.add(f'alias:{alias}', alias)
+    return index.build()
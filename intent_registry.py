@@ -0,0 +1,357 @@
+"""Declarative command registry and dispatch table.
+
+Every command (built-in or plugin) registers once with its trigger phrases,
+a priority and an optional argument extractor:
+
+    INTENTS.register('tell_time', tell_time, triggers=['ساعت'], priority=30)
+
+    @INTENTS.intent('play_music', triggers=SYNONYMS['play_music'], fuzzy=True,
+                    extract=lambda q: {'song_name': ...})
+    def _play(song_name): ...
+
+Trigger phrases of all intents are compiled into one IntentIndex, so finding
+the candidates for a query is a single automaton pass (plus a memoized fuzzy
+lookup for intents registered with fuzzy=True) however many commands exist.
+
+A `predicate` has two roles. With triggers it is a confirmation gate that
+runs only after a trigger phrase hit (plugins: keywords pre-select, then
+can_handle decides). Without triggers it is the matcher itself; only those
+few intents are evaluated, in priority order, when no cheaper match wins.
+
+Lower priority values win; ties keep registration order. Handler results are
+read with is_handled(); a declined result lets dispatch fall through to the
+next candidate, like the old plugin loop did.
+
+The query is normalized once (text_normalizer.normalize_query) and that same
+NormalizedQuery, a str, is what predicates, extractors and plugins receive.
+
+dispatch() is fronted by a ResolutionCache: an LRU from normalized query text
+to the intent that handled it and its extracted arguments, so repeated
+commands skip matching, fuzzy lookup and plugin can_handle() calls. It is
+cleared whenever the registry changes (intents or plugins registered or
+removed) or any registered dependency fingerprint (e.g. apps.json mtime)
+changes.
+"""
+from __future__ import annotations
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from intent_index import IntentIndex
+from fuzzy_index import FuzzyIndex, DEFAULT_THRESHOLD
+from text_normalizer import normalize_query, normalize_text
+
+_logger = logging.getLogger('io.intents')
+
+
+class Intent:
+    """One registered command."""
+
+    __slots__ = ('name', 'handler', 'triggers', 'exact', 'priority', 'extract',
+                 'fuzzy', 'predicate', 'exits', 'source', 'seq')
+
+    def __init__(self, name, handler, triggers=(), exact=(), priority=100, extract=None,
+                 fuzzy=False, predicate=None, exits=False, source='builtin', seq=0):
+        self.name = name
+        self.handler = handler
+        self.triggers = list(triggers)
+        self.exact = list(exact)
+        self.priority = priority
+        self.extract = extract
+        self.fuzzy = fuzzy
+        self.predicate = predicate
+        self.exits = exits
+        self.source = source
+        self.seq = seq
+
+    @property
+    def order(self) -> tuple:
+        return (self.priority, self.seq)
+
+    def __repr__(self) -> str:
+        return f'<Intent {self.name} p={self.priority} src={self.source}>'
+
+
+def is_handled(result) -> bool:
+    """Plugin-loop semantics: True, None or dict(handled=True) are handled, else truthiness."""
+    if result is True or result is None or (isinstance(result, dict) and result.get('handled')):
+        return True
+    return bool(result)
+
+
+class ResolutionCache:
+    """Bounded LRU of normalized query -> (intent name, kwargs), or None for "no intent"."""
+
+    def __init__(self, maxsize: int = 256, check_interval: float = 1.0) -> None:
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self._data: OrderedDict = OrderedDict()
+        self._deps: list[Callable] = []
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def add_dependency(self, fn: Callable) -> None:
+        """Register a cheap fingerprint callable; when its value changes the cache is cleared."""
+        self._deps.append(fn)
+        self._checked_at = 0.0
+
+    def _current_fingerprint(self, generation) -> tuple:
+        values = []
+        for fn in self._deps:
+            try:
+                values.append(fn())
+            except Exception:
+                values.append(None)
+        return (generation, tuple(values))
+
+    def validate(self, generation) -> None:
+        """Clear the cache if the registry generation or a dependency changed (deps polled at most every check_interval s)."""
+        now = time.monotonic()
+        if (self._fingerprint is not None and self._fingerprint[0] == generation
+                and now - self._checked_at < self.check_interval):
+            return
+        self._checked_at = now
+        fingerprint = self._current_fingerprint(generation)
+        if fingerprint != self._fingerprint:
+            with self._lock:
+                if self._data:
+                    self.invalidations += 1
+                    _logger.debug('Intent cache invalidated (%d entries)', len(self._data))
+                self._data.clear()
+                self._fingerprint = fingerprint
+
+    def get(self, key: str):
+        """Return (found, value)."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return True, self._data[key]
+        return False, None
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def record(self, hit: bool, seconds: float) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'invalidations': self.invalidations,
+                'avg_hit_us': (self.hit_seconds / self.hits * 1e6) if self.hits else 0.0,
+                'avg_miss_us': (self.miss_seconds / self.misses * 1e6) if self.misses else 0.0,
+            }
+
+
+class IntentRegistry:
+    def __init__(self, fuzzy_threshold: float = DEFAULT_THRESHOLD, cache_size: int = 256) -> None:
+        self.fuzzy_threshold = fuzzy_threshold
+        self.cache = ResolutionCache(cache_size)
+        self._intents: dict[str, Intent] = {}
+        self._seq = 0
+        self._generation = 0
+        self._dirty = True
+        self._index = IntentIndex()
+        self._fuzzy = FuzzyIndex(fuzzy_threshold)
+        self._exact: dict[str, list[str]] = {}
+        self._dynamic: list[Intent] = []
+        # on_error(intent, exc) is called for every handler that raises (dispatch logs and carries on)
+        self.on_error: Optional[Callable[[Intent, BaseException], None]] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._intents
+
+    def __len__(self) -> int:
+        return len(self._intents)
+
+    def get(self, name: str) -> Optional[Intent]:
+        return self._intents.get(name)
+
+    def intents(self) -> list[Intent]:
+        return sorted(self._intents.values(), key=lambda i: i.order)
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every register/unregister; lets derived indexes know when to rebuild."""
+        return self._generation
+
+    def phrases(self) -> list[str]:
+        """Every trigger and exact phrase of every intent (the command vocabulary)."""
+        # list(): read from the recognition workers (rescoring) while dispatch may register
+        return [p for intent in list(self._intents.values()) for p in (*intent.triggers, *intent.exact)]
+
+    def register(self, name: str, handler: Callable, triggers: Iterable[str] = (), exact: Iterable[str] = (),
+                 priority: int = 100, extract: Optional[Callable] = None, fuzzy: bool = False,
+                 predicate: Optional[Callable] = None, exits: bool = False, source: str = 'builtin') -> Intent:
+        """Register (or replace) an intent. See the module docstring for the fields."""
+        if not callable(handler):
+            raise TypeError('handler must be callable')
+        if isinstance(triggers, str):
+            triggers = [triggers]
+        if isinstance(exact, str):
+            exact = [exact]
+        self._seq += 1
+        intent = Intent(name, handler, triggers, exact, priority, extract, fuzzy, predicate, exits, source, self._seq)
+        self._intents[name] = intent
+        self._dirty = True
+        self._generation += 1
+        _logger.debug('Registered intent %r', intent)
+        return intent
+
+    def intent(self, name: str, **kwargs) -> Callable:
+        """Decorator form of register()."""
+        def deco(fn):
+            self.register(name, fn, **kwargs)
+            return fn
+        return deco
+
+    def unregister(self, name: str) -> None:
+        if self._intents.pop(name, None) is not None:
+            self._dirty = True
+            self._generation += 1
+
+    def build(self) -> None:
+        """Compile the dispatch table (done lazily on the first resolve after a change)."""
+        index = IntentIndex()
+        fuzzy = FuzzyIndex(self.fuzzy_threshold)
+        exact: dict[str, list[str]] = {}
+        dynamic = []
+        for intent in self._intents.values():
+            index.add(intent.name, intent.triggers)
+            for phrase in intent.exact:
+                exact.setdefault(normalize_text(phrase), []).append(intent.name)
+            if intent.fuzzy:
+                for phrase in intent.triggers:
+                    fuzzy.add(phrase, intent.name)
+            if intent.fuzzy or (intent.predicate is not None and not intent.triggers):
+                dynamic.append(intent)
+        index.build()
+        dynamic.sort(key=lambda i: i.order)
+        self._index, self._fuzzy, self._exact, self._dynamic = index, fuzzy, exact, dynamic
+        self._dirty = False
+
+    def candidates(self, query: str):
+        """Yield (intent, kwargs) for every intent that applies to query, best first."""
+        if self._dirty:
+            self.build()
+        q = normalize_query(query)
+        names = set(self._index.match(q))
+        names.update(self._exact.get(q, ()))
+        static = sorted((self._intents[n] for n in names if n in self._intents), key=lambda i: i.order)
+        fuzzy_hits = None
+        seen = set()
+        for intent in heapq.merge(static, self._dynamic, key=lambda i: i.order):
+            if intent.name in seen:
+                continue
+            seen.add(intent.name)
+            if intent.name in names:
+                matched = True
+            elif intent.fuzzy:
+                if fuzzy_hits is None:
+                    fuzzy_hits = self._fuzzy.search(q)
+                matched = intent.name in fuzzy_hits
+            else:
+                matched = not intent.triggers
+            if matched and intent.predicate is not None and not self._check(intent, q):
+                matched = False
+            if not matched:
+                continue
+            kwargs = {}
+            if intent.extract is not None:
+                try:
+                    kwargs = intent.extract(q)
+                except Exception:
+                    _logger.exception('Intent %s argument extraction failed', intent.name)
+                    continue
+                if kwargs is None:
+                    continue
+            yield intent, kwargs
+
+    @staticmethod
+    def _check(intent: Intent, query: str) -> bool:
+        try:
+            return bool(intent.predicate(query))
+        except Exception:
+            _logger.exception('Intent %s predicate failed', intent.name)
+            return False
+
+    def resolve(self, query: str):
+        """Return the best (intent, kwargs) for query, or None."""
+        for found in self.candidates(query):
+            return found
+        return None
+
+    def _run(self, intent: Intent, kwargs: dict) -> bool:
+        """Call the handler; True if it handled the query."""
+        try:
+            result = intent.handler(**kwargs)
+        except Exception as e:
+            _logger.exception('Intent %s handler failed', intent.name)
+            if self.on_error is not None:
+                self.on_error(intent, e)
+            # a crashing plugin lets the built-ins try; a crashing built-in ends dispatch
+            return intent.source != 'plugin'
+        return is_handled(result)
+
+    def dispatch(self, query: str) -> Optional[Intent]:
+        """Run the best applicable handler; fall through while handlers decline. Returns the intent that handled."""
+        q = normalize_query(query)
+        start = time.perf_counter()
+        handler_seconds = 0.0
+        self.cache.validate(self._generation)
+        found, cached = self.cache.get(q)
+        skip = None
+        if found:
+            intent = self._intents.get(cached[0]) if cached else None
+            if cached is None or intent is not None:
+                self.cache.record(True, time.perf_counter() - start)
+                if cached is None or self._run(intent, dict(cached[1])):
+                    return intent
+                # the cached handler declined this time: resolve again without it
+                skip = intent.name
+                start = time.perf_counter()
+        handled = None
+        for intent, kwargs in self.candidates(q):
+            if intent.name == skip:
+                continue
+            t0 = time.perf_counter()
+            ok = self._run(intent, kwargs)
+            handler_seconds += time.perf_counter() - t0
+            if ok:
+                _logger.debug('Query handled by intent %s', intent.name)
+                handled = intent
+                self.cache.put(q, (intent.name, dict(kwargs)))
+                break
+        else:
+            self.cache.put(q, None)
+        self.cache.record(False, time.perf_counter() - start - handler_seconds)
+        return handled
@@ -1,5 +1,4 @@
 import traceback
-import difflib
 import re
 import sys
 import io
@@ -7,6 +6,8 @@ import logging
 from logging.handlers import RotatingFileHandler
 import os
 import subprocess
+import threading
+import contextlib
 from pathlib import Path
 
 # Avoid replacing sys.stdout during pytest collection/run which breaks capture.
@@ -31,6 +32,32 @@ if not logger.handlers:
     formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
     handler.setFormatter(formatter)
     logger.addHandler(handler)
+# Helper modules (intent_index, ...) live next to this file; make them importable
+# when io.py is loaded by path (benchmarks.py, the test and diag scripts).
+_IO_DIR = str(Path(__file__).resolve().parent)
+if _IO_DIR not in sys.path:
+    sys.path.append(_IO_DIR)
+from lazy_imports import PROFILE, lazy_import, load_all as _load_lazy_modules
+from text_normalizer import normalize_query, normalize_text
+from intent_index import build_intent_index
+from fuzzy_index import build_fuzzy_index
+from intent_registry import IntentRegistry
+from listener import BackgroundListener
+from audio_devices import DeviceManager
+import recognizers
+from pipeline import SpeechPipeline
+import wake_word
+from audio_preprocess import Preprocessor
+from rescoring import VocabularyRescorer
+import speech_output
+from speech_output import SpeechOutput
+from tts_voices import VoiceRegistry
+import tts_cache
+import audio_output
+from speech_playback import ChannelPlayer, SpeechBuffer
+import speech_chunks
+import plugin_loader
+import config_service
 # اجرای برنامه ویندوزی با نمایش خطا و دیباگ
 def run_exe(path, app_name="برنامه"):
     try:
@@ -48,24 +75,22 @@ def run_exe(path, app_name="برنامه"):
         # Log exception to file but do not vocalize (speak handles suppression for errors)
         logger.exception(f"خطا در اجرای {app_name}: {e}")
 # تشخیص احساسات ساده بر اساس کلمات کلیدی
+# (checked in this order; words folded like queries, see text_normalizer)
+EMOTION_WORDS = [
+    ("sad", ["غمگین", "ناراحت", "افسرده", "دلگیر", "خسته", "بی‌حوصله", "گریه", "اشک"]),
+    ("happy", ["خوشحال", "شاد", "خنده", "لبخند", "سرحال", "موفق", "عالی"]),
+    ("angry", ["عصبانی", "خشمگین", "حرص", "داد", "فریاد", "ناراضی"]),
+    ("worried", ["نگران", "استرس", "اضطراب", "دلواپس"]),
+]
+_EMOTION_WORDS = [(emotion, [normalize_text(w) for w in words]) for emotion, words in EMOTION_WORDS]
+
+
 def detect_emotion(text):
-    text = text.lower()
-    sad_words = ["غمگین", "ناراحت", "افسرده", "دلگیر", "خسته", "بی‌حوصله", "گریه", "اشک"]
-    happy_words = ["خوشحال", "شاد", "خنده", "لبخند", "سرحال", "موفق", "عالی"]
-    angry_words = ["عصبانی", "خشمگین", "حرص", "داد", "فریاد", "ناراضی"]
-    worried_words = ["نگران", "استرس", "اضطراب", "دلواپس"]
-    for w in sad_words:
-        if w in text:
-            return "sad"
-    for w in happy_words:
-        if w in text:
-            return "happy"
-    for w in angry_words:
-        if w in text:
-            return "angry"
-    for w in worried_words:
-        if w in text:
-            return "worried"
+    text = normalize_query(text)
+    for emotion, words in _EMOTION_WORDS:
+        for w in words:
+            if w in text:
+                return emotion
     return None
 
 # واکنش به احساس کاربر
@@ -79,16 +104,18 @@ def react_to_emotion(emotion):
     elif emotion == "worried":
         speak("نگرانی طبیعی است. اگر دوست دارید می‌توانم چند جمله انگیزشی یا موزیک آرام پخش کنم.")
 from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-import screen_brightness_control as sbc
-import pywifi
+# Heavy / platform subsystems load on first use (see lazy_imports, --profile-startup)
+comtypes = lazy_import('comtypes')
+pycaw = lazy_import('pycaw.pycaw')
+sbc = lazy_import('screen_brightness_control')
+pywifi = lazy_import('pywifi')
+jdatetime = lazy_import('jdatetime')
 import time
 import typing
 def set_volume(level):
-    devices = AudioUtilities.GetSpeakers()
-    interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-    volume = cast(interface, POINTER(IAudioEndpointVolume))
+    devices = pycaw.AudioUtilities.GetSpeakers()
+    interface = devices.Activate(pycaw.IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+    volume = cast(interface, POINTER(pycaw.IAudioEndpointVolume))
     # appease static type checkers: treat the COM pointer as Any
     volume = typing.cast(typing.Any, volume)
     # سطح صدا بین 0.0 تا 1.0
@@ -100,9 +127,9 @@ def set_volume(level):
         max_vol = volume.GetVolumeRange()[1]
         db_level = min_vol + (max_vol - min_vol) * float(level)
 def change_volume(delta):
-    devices = AudioUtilities.GetSpeakers()
-    interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-    volume = cast(interface, POINTER(IAudioEndpointVolume))
+    devices = pycaw.AudioUtilities.GetSpeakers()
+    interface = devices.Activate(pycaw.IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+    volume = cast(interface, POINTER(pycaw.IAudioEndpointVolume))
     # appease static type checkers: treat the COM pointer as Any
     volume = typing.cast(typing.Any, volume)
     current = volume.GetMasterVolumeLevelScalar()
@@ -122,9 +149,9 @@ def change_volume(delta):
         # if setting fails, log but don't crash
         logger.exception("Failed to change volume")
 def mute_volume(mute=True):
-    devices = AudioUtilities.GetSpeakers()
-    interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-    volume = cast(interface, POINTER(IAudioEndpointVolume))
+    devices = pycaw.AudioUtilities.GetSpeakers()
+    interface = devices.Activate(pycaw.IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+    volume = cast(interface, POINTER(pycaw.IAudioEndpointVolume))
     # appease static type checkers: treat the COM pointer as Any
     volume = typing.cast(typing.Any, volume)
     try:
@@ -185,7 +212,6 @@ def set_wifi(enable=True):
         print(f"[DEBUG] WiFi error: {e}")
 def get_today_events():
     """Return a list of Iranian events for today's Jalali date."""
-    import jdatetime
     today = jdatetime.date.today()
     # نمونه مناسبت‌ها (می‌توانید کامل‌تر کنید)
     events = {
@@ -198,7 +224,6 @@ def get_today_events():
         # ... مناسبت‌های بیشتر را اضافه کنید ...
     }
     return events.get((today.month, today.day), [])
-import jdatetime
 
 # Removed duplicate speak function and misplaced joke logic
 # تابع نمایش shortcutهای دسکتاپ
@@ -216,27 +241,53 @@ def list_desktop_shortcuts():
 import json
 import pathlib
 
-# Load APPS and APP_ALIASES from external config if available
-config_path = pathlib.Path(__file__).resolve().parent.parent / 'config' / 'apps.json'
-try:
-    with open(config_path, 'r', encoding='utf-8') as cf:
-        cfg = json.load(cf)
-        APPS = cfg.get('apps', {})
-        APP_ALIASES = cfg.get('aliases', {})
-        # Normalize string entries to lists
-        for k, v in list(APPS.items()):
-            if isinstance(v, str):
-                APPS[k] = [v]
-except Exception as e:
-    print(f"[DEBUG] Failed to load config/apps.json: {e}")
-    APPS = {"notepad": [r"C:\\Windows\\System32\\notepad.exe"]}
-    APP_ALIASES = {}
+# APPS and APP_ALIASES come from config/apps.json, shared with the apps plugin and
+# reloaded between commands when the file changes (see config_service and _on_apps_changed)
+APPS_CONFIG = config_service.apps()
+
+
+def _apps_tables(snapshot):
+    if not APPS_CONFIG.loaded:
+        print(f"[DEBUG] Failed to load config/apps.json: {APPS_CONFIG.path}")
+        return {"notepad": [r"C:\\Windows\\System32\\notepad.exe"]}, {}
+    return snapshot['apps'], snapshot['aliases']
+
+
+APPS, APP_ALIASES = _apps_tables(APPS_CONFIG.snapshot)
 
 # --- Plugin loader ---------------------------------------------------------
 import importlib
-import pkgutil
 
 PLUGINS = []
+# Dispatch table shared by plugins and built-in commands
+INTENTS = IntentRegistry()
+PLUGIN_PRIORITY = 0
+
+
+def register_plugin(mod):
+    """Add a plugin module to the dispatch table, ahead of every built-in command.
+
+    A plugin may export a static `KEYWORDS` collection; its can_handle() is then
+    only called for queries containing one of them. Plugins without KEYWORDS
+    are asked on every query, as before.
+    """
+    keywords = getattr(mod, 'KEYWORDS', None) or ()
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    INTENTS.register(
+        f"plugin:{getattr(mod, '__name__', str(mod))}",
+        lambda query, _mod=mod: _run_plugin(_mod, query),
+        triggers=list(keywords),
+        predicate=mod.can_handle,
+        extract=lambda q: {'query': q},
+        priority=PLUGIN_PRIORITY,
+        source='plugin')
+
+
+def _run_plugin(mod, query):
+    # looked up at call time, so headless.dry_run() can record plugin actions instead
+    return mod.handle(query)
+
 
 def load_plugins():
     plugins_pkg = 'plugins'
@@ -255,17 +306,18 @@ def load_plugins():
         except Exception as e:
             logger.exception('Failed to import plugins package after adding project root: %s', e)
             return
-    for finder, name, ispkg in pkgutil.iter_modules(pkg.__path__, prefix=plugins_pkg + '.'):
+    # Only the plugins' MANIFESTs are read here; each module is imported on the
+    # first query that reaches its can_handle() (see plugin_loader).
+    for plugin in plugin_loader.discover(pkg):
         try:
-            mod = importlib.import_module(name)
-            # plugin should expose can_handle() and handle()
-            if hasattr(mod, 'can_handle') and hasattr(mod, 'handle'):
-                PLUGINS.append(mod)
-                logger.debug(f"Loaded plugin: {name}")
+            PLUGINS.append(plugin)
+            register_plugin(plugin)
+            logger.debug(f"Registered plugin: {plugin.__name__} (keywords: {len(plugin.KEYWORDS)})")
         except Exception as e:
-            logger.exception(f"Error loading plugin {name}: {e}")
+            logger.exception(f"Error registering plugin {plugin.__name__}: {e}")
 
-load_plugins()
+with PROFILE.measure('init', 'plugins (manifests)'):
+    load_plugins()
 # لیست سایت‌ها و کلیدواژه‌های مربوطه
 SITES = {
     "google": "https://www.google.com",
@@ -299,80 +351,122 @@ SITES = {
     "digikala": "https://digikala.com",
     "دیجی کالا": "https://digikala.com"
 }
+
+# Trigger phrases of the built-in commands (registered on INTENTS below)
+SYNONYMS = {
+    'volume_down': ['کم کن صدا', 'کاهش صدا', 'volume down', 'صدای کمتر', 'کمش کن'],
+    'volume_up': ['زیاد کن صدا', 'افزایش صدا', 'volume up', 'صدای بیشتر', 'زیادش کن'],
+    'volume_small_up': ['صدا زیاد', 'یکم زیاد کن صدا', '۵ درصد زیاد'],
+    'volume_small_down': ['صدا کم', 'یکم کم کن صدا', '۵ درصد کم'],
+    'mute': ['قطع صدا', 'mute', 'بی‌صدا', 'قطع کن صدا'],
+    'unmute': ['وصل صدا', 'unmute', 'صدا وصل'],
+    'brightness_down': ['کم کن نور', 'کاهش نور', 'brightness down', 'نور کم کن'],
+    'brightness_up': ['زیاد کن نور', 'افزایش نور', 'brightness up', 'نور زیاد کن'],
+    'wifi_on': ['وای فای روشن', 'wifi on', 'وایفای روشن', 'اتصال وای فای'],
+    'wifi_off': ['وای فای خاموش', 'wifi off', 'قطع وای فای', 'وایفای خاموش'],
+    'play_music': ['پخش موزیک', 'پخش آهنگ', 'play music', 'پخش کن موزیک'],
+    'pause_music': ['توقف موزیک', 'توقف آهنگ', 'pause music', 'توقف'],
+    'resume_music': ['ادامه موزیک', 'ادامه آهنگ', 'resume music', 'دوباره پخش کن'],
+    'next': ['بعدی', 'بعدی آهنگ', 'next'],
+    'previous': ['قبلی', 'آهنگ قبلی', 'previous'],
+    'stop_music': ['قطع موزیک', 'قطع آهنگ', 'stop music']
+}
+
+# Built once at startup: one automaton pass per query finds every synonym,
+# site, app and alias phrase instead of re-scanning the tables per intent.
+with PROFILE.measure('init', 'intent/fuzzy index'):
+    INTENT_INDEX = build_intent_index(SYNONYMS, SITES, APPS, APP_ALIASES)
+    # Same vocabulary for the misheard-word fallback (bounded by the 0.78 ratio threshold)
+    FUZZY_INDEX = build_fuzzy_index(SYNONYMS, SITES, APPS, APP_ALIASES)
+# Preference order for app matches (APPS order first, then aliases), as in the old scan
+_APP_RANK = {f'app:{k}': i for i, k in enumerate(APPS)}
+_ALIAS_RANK = {f'alias:{a}': i for i, a in enumerate(APP_ALIASES)}
+
+
+def find_app_key(query: str):
+    """Return the canonical APPS key mentioned in query (by key, then alias), or None."""
+    hits = INTENT_INDEX.match(query)
+    keys = [i for i in hits if i in _APP_RANK]
+    if keys:
+        return min(keys, key=_APP_RANK.__getitem__)[len('app:'):]
+    aliases = [i for i in hits if i in _ALIAS_RANK]
+    if aliases:
+        return APP_ALIASES.get(min(aliases, key=_ALIAS_RANK.__getitem__)[len('alias:'):])
+    return None
+
+
+_SITE_KEYS = {normalize_text(k): k for k in SITES}
+
+
+def find_site(query: str):
+    """Return the SITES key named by the whole query (exact, then fuzzy), or None."""
+    q = normalize_query(query)
+    if q in _SITE_KEYS:
+        return _SITE_KEYS[q]
+    for score, phrase, values in FUZZY_INDEX.lookup(q):
+        for v in values:
+            if v.startswith('site:'):
+                return v[len('site:'):]
+    return None
+
+
 def stop_music():
     if music_state["playing"]:
-        pygame.mixer.music.stop()
+        AUDIO.stop(audio_output.MUSIC)
         music_state["playing"] = False
         speak("Music stopped.")
         print("Music stopped.")
     else:
         speak("No music is playing.")
-import pyttsx3
+pyttsx3 = lazy_import('pyttsx3')
 import datetime
-import speech_recognition as sr  # Make sure SpeechRecognition is installed: pip install SpeechRecognition
-import wikipedia
+sr = lazy_import('speech_recognition')  # Make sure SpeechRecognition is installed: pip install SpeechRecognition
+wikipedia = lazy_import('wikipedia')
 import webbrowser as wb
 import os
 import random
-# Suppress the pygame support prompt which prints on import
+# Suppress the pygame support prompt (audio_output may import pygame)
 os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
-import pygame
-import pyautogui
-import pyjokes
+pyautogui = lazy_import('pyautogui')
+pyjokes = lazy_import('pyjokes')
 import subprocess
 
-engine = pyttsx3.init()
-# دیباگ نوع خروجی voices
-voices = engine.getProperty('voices')
-logger.debug(f"voices type: {type(voices)}")
-# انتخاب صدای فارسی اگر موجود باشد
-found_voice = False
-try:
-    from collections.abc import Iterable
-    # Normalize voices into a list safely for static type checkers and non-iterable returns
-    if isinstance(voices, Iterable) and not isinstance(voices, (str, bytes)):
-        voices_list = list(voices)
-    elif voices is None:
-        voices_list = []
-    else:
-        voices_list = [voices]
-
-    for v in voices_list:
-        # Safely obtain id and name without assuming attribute types and coerce to strings
-        v_id = getattr(v, 'id', None)
-        v_name = getattr(v, 'name', '')
-        try:
-            if isinstance(v_id, bytes):
-                id_str = v_id.decode(errors='ignore')
-            else:
-                id_str = str(v_id) if v_id is not None else ''
-        except Exception:
-            id_str = str(v_id) if v_id is not None else ''
-        name_str = str(v_name).lower() if v_name is not None else ''
-        if ('fa' in id_str) or ('persian' in name_str):
-            engine.setProperty('voice', id_str)
-            found_voice = True
-            break
-
-    if not found_voice and voices_list:
-        first_id = getattr(voices_list[0], 'id', None)
+# The TTS engine is created on first speak() (see _get_engine)
+engine = None
+# Languages of the engine's installed voices (see tts_voices.VoiceRegistry)
+VOICES = VoiceRegistry()
+
+
+def _get_engine():
+    """Create and configure the pyttsx3 engine on first use."""
+    global engine
+    if engine is not None:
+        return engine
+    with PROFILE.measure('init', 'pyttsx3 engine + voices'):
+        engine = _init_engine()
+    return engine
+
+
+def _init_engine():
+    engine = pyttsx3.init()
+    # probe the installed voices once per engine; speak() routes with VOICES lookups
+    VOICES.probe(engine)
+    # انتخاب صدای فارسی اگر موجود باشد
+    voice_id = VOICES.preferred('fa') or VOICES.default
+    if voice_id:
         try:
-            if isinstance(first_id, bytes):
-                first_id_str = first_id.decode(errors='ignore')
-            else:
-                first_id_str = str(first_id) if first_id is not None else ''
+            engine.setProperty('voice', voice_id)
         except Exception:
-            first_id_str = str(first_id) if first_id is not None else ''
-        engine.setProperty('voice', first_id_str)
-except Exception:
-    pass
-engine.setProperty('rate', 150)
-engine.setProperty('volume', 1)
+            logger.debug(f"Could not select voice {voice_id}")
+    engine.setProperty('rate', 150)
+    engine.setProperty('volume', 1)
+    return engine
 
 
 # Import NotificationManager robustly: prefer package import, fallback to loading by file path
 notify = None
 set_speak_callable = None
+_t_notification = time.perf_counter()
 try:
     from io.notification import notify, set_speak_callable  # type: ignore
 except Exception:
@@ -394,30 +488,32 @@ except Exception:
                 set_speak_callable = getattr(mod, 'set_speak_callable', None)
     except Exception:
         logger.exception('Failed to import notification module')
+PROFILE.record('import', 'notification', time.perf_counter() - _t_notification)
 
 
-def speak(audio, **voice_opts) -> None:
-    # Do not speak or show notifications for error-like messages.
-    def is_error_text(text: str) -> bool:
-        t = str(text).lower()
-        # Persian and English error indicators
-        error_indicators = ['خطا', 'خطا در', 'exception', 'traceback', 'error']
-        return any(ind in t for ind in error_indicators)
+# the one audio output: music, speech and alert channels mixed on one thread (see audio_output)
+AUDIO = audio_output.default()
+# plays online TTS from memory on the speech channel; music is ducked, not stopped
+PLAYER = ChannelPlayer(AUDIO, audio_output.SPEECH)
+# online TTS renders, kept across runs (../cache/tts)
+TTS_CACHE = tts_cache.TTSCache()
 
-    if is_error_text(audio):
-        # Print to terminal for debugging, log, but do not vocalize or notify
-        try:
-            print(f"[ERROR] {audio}")
-        except Exception:
-            pass
-        logger.error(str(audio))
-        return
 
-    # For non-error text: speak and optionally notify (skip certain messages)
-    # voice_opts may contain: lang, rate, volume
+def _gtts_bytes(text, lang) -> bytes:
+    """Synthesize text with gTTS into memory (mp3 bytes)."""
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=str(text), lang=lang).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def _render_speech(audio, voice_opts, cancelled) -> None:
+    """Synthesize and play one utterance; runs on the speech output worker (see OUTPUT)."""
+    # voice_opts may contain: lang, rate, volume, prefer_online
     # Ensure these are always defined so the finally block can safely reference them.
     old_rate = None
     old_volume = None
+    engine = _get_engine()
     try:
         # apply temporary properties if engine supports them
         if voice_opts:
@@ -454,61 +550,39 @@ def speak(audio, **voice_opts) -> None:
         if prefer_online:
             use_online = True
         elif lang.startswith('fa'):
-            # check if a persian voice exists locally
-            try:
-                vs = engine.getProperty('voices')
-                from collections.abc import Iterable
-                has_fa = False
-                if isinstance(vs, Iterable):
-                    for v in vs:
-                        v_id = getattr(v, 'id', '') or ''
-                        v_name = getattr(v, 'name', '') or ''
-                        s = f"{v_id} {v_name}".lower()
-                        if 'fa' in s or 'farsi' in s or 'persian' in s:
-                            has_fa = True
-                            break
-                if not has_fa:
-                    use_online = True
-            except Exception:
-                use_online = True
+            # no local Persian voice: use online TTS
+            use_online = not VOICES.has('fa')
 
+        chunks = speech_chunks.split_sentences(audio) or [str(audio)]
+        chunks_done = 0
         if use_online:
             try:
-                from gtts import gTTS
-                import tempfile
-                import time as _t
-                fd, path = tempfile.mkstemp(suffix='.mp3')
-                os.close(fd)
-                tts = gTTS(text=str(audio), lang=(lang or 'fa'))
-                tts.save(path)
-                try:
-                    if not pygame.mixer.get_init():
-                        pygame.mixer.init()
-                except Exception:
-                    try:
-                        pygame.mixer.init()
-                    except Exception:
-                        logger.exception('Failed to init pygame.mixer for online TTS')
-                try:
-                    pygame.mixer.music.load(path)
-                    pygame.mixer.music.play()
-                    # wait until done playing (non-blocking to other threads)
-                    while pygame.mixer.music.get_busy():
-                        _t.sleep(0.1)
-                except Exception:
-                    logger.exception('Online TTS playback failed')
-                finally:
+                # each sentence is rendered once per (text, lang, rate, backend) and played from
+                # memory; the next one renders on a worker while this one plays
+                started = time.perf_counter()
+
+                def render(chunk):
+                    key = tts_cache.cache_key(chunk, lang or 'fa', voice_opts.get('rate'), 'gtts')
+                    return TTS_CACHE.fetch_bytes(key, lambda: _gtts_bytes(chunk, lang or 'fa'))
+
+                for chunk, data in speech_chunks.prefetched(chunks, render, cancelled):
                     try:
-                        os.remove(path)
+                        PLAYER.play(SpeechBuffer(data, 'mp3'), cancelled, started)
                     except Exception:
-                        pass
+                        logger.exception('Online TTS playback failed')
+                    started = None
+                    chunks_done += 1
                 did_online = True
             except Exception:
                 logger.exception('Online TTS failed; falling back to local pyttsx3')
 
-        if not did_online:
-            engine.say(audio)
-            engine.runAndWait()
+        # local voice: sentence by sentence, so a cancel takes effect at the next sentence
+        for chunk in ([] if did_online else chunks[chunks_done:]):
+            if cancelled.is_set():
+                break
+            engine.say(chunk)
+            with AUDIO.ducked():
+                engine.runAndWait()
     finally:
         # restore previous properties
         try:
@@ -540,6 +614,77 @@ def speak(audio, **voice_opts) -> None:
                         logger.debug(f"Could not restore volume property from {old_volume}")
         except Exception:
             pass
+
+
+def _interrupt_speech() -> None:
+    """Cut off the utterance being played (called from the thread that cancels it)."""
+    if PLAYER.playing:
+        PLAYER.stop()
+    elif engine is not None:
+        engine.stop()
+
+
+# The one thread that speaks; voice notifications are queued here too (see speech_output)
+OUTPUT = SpeechOutput(_render_speech, _interrupt_speech)
+
+
+def _is_error_text(text) -> bool:
+    t = str(text).lower()
+    # Persian and English error indicators
+    error_indicators = ['خطا', 'خطا در', 'exception', 'traceback', 'error']
+    return any(ind in t for ind in error_indicators)
+
+
+def speak(audio, priority=speech_output.NORMAL, notify_desktop=True, **voice_opts):
+    """Queue audio on the speech output worker and return at once.
+
+    Returns a Future that resolves to True once spoken (False if interrupted); call
+    .result() to wait. voice_opts: lang, rate, volume, prefer_online.
+    """
+    # Do not speak or show notifications for error-like messages.
+    if _is_error_text(audio):
+        # Print to terminal for debugging, log, but do not vocalize or notify
+        try:
+            print(f"[ERROR] {audio}")
+        except Exception:
+            pass
+        logger.error(str(audio))
+        return speech_output.completed(False)
+
+    future = OUTPUT.say(audio, priority, **voice_opts)
+    if notify_desktop:
+        batched = getattr(_SPEECH_BATCH, 'texts', None)
+        if batched is not None:
+            batched.append(audio)
+        else:
+            _notify_spoken(audio)
+    return future
+
+
+# notification.py hands voice notifications straight to speak() instead of queueing them itself
+speak.nonblocking = True
+
+# desktop-notification texts collected inside speech_batch(), per thread
+_SPEECH_BATCH = threading.local()
+
+
+@contextlib.contextmanager
+def speech_batch():
+    """Merge the speak() calls made inside into one utterance and one desktop notification."""
+    if getattr(_SPEECH_BATCH, 'texts', None) is not None:
+        yield  # nested: the outer batch flushes
+        return
+    _SPEECH_BATCH.texts = []
+    try:
+        with OUTPUT.batch():
+            yield
+    finally:
+        texts, _SPEECH_BATCH.texts = _SPEECH_BATCH.texts, None
+        if texts:
+            _notify_spoken(texts[0] if len(texts) == 1 else speech_output.join_texts(texts))
+
+
+def _notify_spoken(audio) -> None:
     skip_notify = [
         "متاسفم، متوجه نشدم.",
         "زمان دریافت فرمان به پایان رسید. لطفا دوباره تلاش کنید.",
@@ -589,8 +734,9 @@ def show_ip():
     except Exception:
         public_ip = 'نامشخص'
     ip_text = f"آیپی داخلی: {local_ip}\nآیپی عمومی: {public_ip}"
-    speak("آیپی سیستم:")
-    speak(f"آیپی داخلی {local_ip} و آیپی عمومی {public_ip}")
+    with speech_batch():
+        speak("آیپی سیستم:")
+        speak(f"آیپی داخلی {local_ip} و آیپی عمومی {public_ip}")
     print(ip_text)
 
 def system_status():
@@ -615,8 +761,9 @@ def system_status():
     disk_used = round(disk.used / (1024**3), 2)
     disk_percent = disk.percent
     status_text = f"درصد باتری: {battery_percent} درصد\nرم: {ram_used} از {ram_total} گیگابایت ({ram_percent}%)\nپردازنده: {cpu_percent}% از {cpu_count} هسته\nهارد: {disk_used} از {disk_total} گیگابایت ({disk_percent}%)"
-    speak("وضعیت سیستم:")
-    speak(f"باتری {battery_percent} درصد، رم {ram_percent} درصد، پردازنده {cpu_percent} درصد، هارد {disk_percent} درصد.")
+    with speech_batch():
+        speak("وضعیت سیستم:")
+        speak(f"باتری {battery_percent} درصد، رم {ram_percent} درصد، پردازنده {cpu_percent} درصد، هارد {disk_percent} درصد.")
     print(status_text)
 
 def tell_joke_fa():
@@ -636,8 +783,9 @@ def tell_joke_fa():
 def tell_time() -> None:
     """Tells the current time."""
     current_time = datetime.datetime.now().strftime("%H:%M:%S")
-    speak("ساعت فعلی:")
-    speak(current_time)
+    with speech_batch():
+        speak("ساعت فعلی:")
+        speak(current_time)
     print("ساعت فعلی:", current_time)
 
 
@@ -649,9 +797,10 @@ def date() -> None:
     # تاریخ شمسی
     shamsi = jdatetime.date.fromgregorian(date=now.date())
     shamsi_str = f"{shamsi.day} {shamsi.strftime('%B')} {shamsi.year}"
-    speak("تاریخ امروز:")
-    speak(f"میلادی: {miladi_str}")
-    speak(f"شمسی: {shamsi_str}")
+    with speech_batch():
+        speak("تاریخ امروز:")
+        speak(f"میلادی: {miladi_str}")
+        speak(f"شمسی: {shamsi_str}")
     print(f"تاریخ امروز (میلادی): {miladi_str}")
     print(f"تاریخ امروز (شمسی): {shamsi_str}")
 
@@ -671,7 +820,7 @@ def wishme() -> None:
     else:
         speak("شب بخیر، فردا می‌بینمتون.")
     assistant_name = load_name()
-    speak(f"{assistant_name} در خدمت شماست. لطفا بفرمایید چه کمکی می‌توانم بکنم؟")
+    ask(f"{assistant_name} در خدمت شماست. لطفا بفرمایید چه کمکی می‌توانم بکنم؟")
     print(f"{assistant_name} در خدمت شماست. لطفا بفرمایید چه کمکی می‌توانم بکنم؟")
 
 
@@ -685,74 +834,143 @@ def screenshot() -> None:
     speak(f"عکس صفحه ذخیره شد در {img_path}.")
     print(f"عکس صفحه ذخیره شد در {img_path}.")
 
+# One capture thread for the whole session (see listener.BackgroundListener);
+# the microphone choice and its energy threshold persist in config/audio_device.json
+AUDIO_DEVICES = DeviceManager()
+_LISTENER = None
+# seconds of audio still discarded after each utterance (room echo, output latency)
+ECHO_TAIL_SECONDS = 0.5
+# a phrase captured up to this long after a reply ended may still be that reply (see _is_echo)
+ECHO_WINDOW_SECONDS = 2.0
+# Speech-to-text backends (config/speech.json; default: offline Vosk, then Google)
+RECOGNIZERS = None
+# n-best hypotheses are rescored against every phrase the assistant understands (see rescoring)
+RESCORER = VocabularyRescorer(lambda: INTENTS.phrases() + list(SITES),
+                              version=lambda: (INTENTS.generation, _apps_version()))
+# capture -> recognition workers -> dispatch (see pipeline.SpeechPipeline)
+PIPELINE = None
+# only phrases starting with the assistant's name reach recognition (see wake_word.WakeWordGate)
+WAKE_GATE = None
+# trim / gate / normalize / resample to 16 kHz before recognition (see audio_preprocess.Preprocessor)
+PREPROCESS = None
+
+
+def _get_listener() -> BackgroundListener:
+    """Start the background listener on first use; it keeps the microphone open from then on."""
+    global _LISTENER
+    if _LISTENER is None:
+        _LISTENER = BackgroundListener(AUDIO_DEVICES.open, energy_threshold=AUDIO_DEVICES.energy_threshold,
+                                       pause_threshold=0.8, phrase_time_limit=10,
+                                       on_threshold=AUDIO_DEVICES.save_threshold,
+                                       on_error=lambda e: AUDIO_DEVICES.invalidate())
+        # the microphone hears the speakers: capture pauses while an utterance plays
+        listener = _LISTENER
+        OUTPUT.observe(lambda item: listener.pause(), lambda item: listener.resume(ECHO_TAIL_SECONDS))
+        _LISTENER.start()
+    return _LISTENER
+
+
+def _get_pipeline() -> SpeechPipeline:
+    """Start capture and background recognition on first use."""
+    global PIPELINE, RECOGNIZERS, WAKE_GATE, PREPROCESS
+    if PIPELINE is None:
+        config = recognizers.load_config()
+        if RECOGNIZERS is None:
+            RECOGNIZERS = recognizers.chain_from_config(rescorer=RESCORER)
+        listener = _get_listener()
+        capture = listener.get_phrase
+        if config.get('wake_word', True):
+            WAKE_GATE = wake_word.gate_for(load_name(), config.get('vosk_model'),
+                                           awake_seconds=float(config.get('awake_seconds', 8.0)),
+                                           on_wake=lambda: print("بله؟"))
+            capture = WAKE_GATE.wrap(capture)
+        recognize = RECOGNIZERS.recognize
+        if config.get('preprocess', True):
+            # runs on the recognition workers, so capture is never held up by it
+            PREPROCESS = Preprocessor()
+            recognize = PREPROCESS.wrap(recognize)
+        PIPELINE = SpeechPipeline(capture, recognize, workers=2,
+                                  busy=lambda: listener.in_speech).start()
+    return PIPELINE
+
+
+def _is_echo(item) -> bool:
+    """True if a transcript is the assistant's own reply picked up by the microphone."""
+    if item.error is not None or not item.value:
+        return False
+    return OUTPUT.is_echo(item.value[0], item.captured_at, ECHO_WINDOW_SECONDS)
+
+
+# longest wait for a question to be spoken before listening for the answer anyway
+PROMPT_TIMEOUT_SECONDS = 15.0
+
+
+def ask(question) -> None:
+    """Say a question, wait until it has been spoken and forget everything heard until then.
+
+    The next takecommand() then returns the answer, not the prompt or what was said before it.
+    """
+    try:
+        speak(question).result(timeout=PROMPT_TIMEOUT_SECONDS)
+    except Exception:
+        # interrupted, timed out or failed to play: listen for the answer regardless
+        logger.debug('Prompt was not fully spoken: %s', question)
+    if _LISTENER is not None:
+        _LISTENER.drain()
+    if PIPELINE is not None:
+        PIPELINE.drain()
+
+
 def takecommand() -> str:
-    """Takes microphone input from the user and returns it as text."""
-    # Improved recognizer settings with retries and microphone selection.
-    r = sr.Recognizer()
-    # Keep dynamic energy to adapt to environment; tune pause threshold for natural speech
-    r.dynamic_energy_threshold = True
-    r.pause_threshold = 0.8
+    """Takes the next recognized phrase, in the order spoken, and returns it as text."""
+    pipeline = _get_pipeline()
+    listener = _get_listener()
 
     # Timeouts and limits
     listen_timeout = 7
-    phrase_time_limit = 10
-    ambient_duration = 1.5
     retries = 2
 
-    # Try to pick a reasonable microphone index (avoid loopback/stereo-mix if possible)
-    mic_index = None
-    try:
-        mic_names = sr.Microphone.list_microphone_names()
-        for i, name in enumerate(mic_names):
-            n = (name or '').lower()
-            if 'loopback' in n or 'stereo mix' in n:
-                continue
-            if 'microphone' in n or 'mic' in n or len(mic_names) == 1:
-                mic_index = i
-                break
-    except Exception:
-        mic_index = None
-
     for attempt in range(retries):
-        try:
-            with sr.Microphone(device_index=mic_index) as source:
-                print("Listening...")
-                # Calibrate to ambient noise; a slightly longer duration helps in noisy envs
-                try:
-                    # adjust_for_ambient_noise type stubs may require an int; cast to int to satisfy static checkers
-                    r.adjust_for_ambient_noise(source, duration=int(ambient_duration))
-                except Exception:
-                    pass
-                try:
-                    audio = r.listen(source, timeout=listen_timeout, phrase_time_limit=phrase_time_limit)
-                except sr.WaitTimeoutError:
-                    speak("زمان دریافت فرمان به پایان رسید. لطفا دوباره تلاش کنید.")
-                    # return empty string to indicate no command (consistent with `if not query` checks)
-                    return ""
-
-            try:
-                print("در حال تشخیص...")
-                query = typing.cast(typing.Any, r).recognize_google(audio, language="fa-IR")
-                print(query)
-                return query.lower()
-            except sr.UnknownValueError:
-                # If recognition failed, give a polite prompt and retry a limited number of times
-                if attempt < retries - 1:
-                    speak("متاسفم، متوجه نشدم. لطفا دوباره بگویید.")
-                    continue
-                speak("متاسفم، متوجه نشدم.")
-                return ""
-            except sr.RequestError:
-                speak("سرویس تشخیص گفتار در دسترس نیست.")
+        print("Listening...")
+        item = pipeline.get(timeout=listen_timeout)
+        while item is not None and _is_echo(item):
+            # replies are not commands: "صدا کم شد" would turn the volume down again
+            logger.debug('Ignoring echo of recent speech: %s', item.value[0])
+            item = pipeline.get(timeout=listen_timeout)
+        if item is None:
+            if listener.last_error is not None:
+                # Opening the microphone failed; report and abort (the listener keeps retrying)
+                logger.error('Microphone handling failed: %s', listener.last_error)
+                speak("خطا در دسترسی به میکروفون. لطفا تنظیمات سخت‌افزاری را بررسی کنید.")
                 return ""
-            except Exception as e:
-                speak(f"خطا رخ داد: {e}")
-                print(f"خطا: {e}")
+            if WAKE_GATE is not None and WAKE_GATE.active and not WAKE_GATE.awake:
+                # waiting for the wake word is not a timeout worth announcing
                 return ""
+            speak("زمان دریافت فرمان به پایان رسید. لطفا دوباره تلاش کنید.")
+            # return empty string to indicate no command (consistent with `if not query` checks)
+            return ""
+
+        # recognition already ran on a pipeline worker; re-raise its outcome here
+        try:
+            if item.error is not None:
+                raise item.error
+            query, backend = item.value
+            logger.debug('Recognized by %s: %s', backend, query)
+            print(query)
+            return query.lower()
+        except recognizers.NoSpeech:
+            # If recognition failed, give a polite prompt and retry a limited number of times
+            if attempt < retries - 1:
+                ask("متاسفم، متوجه نشدم. لطفا دوباره بگویید.")
+                continue
+            speak("متاسفم، متوجه نشدم.")
+            return ""
+        except recognizers.BackendError:
+            speak("سرویس تشخیص گفتار در دسترس نیست.")
+            return ""
         except Exception as e:
-            # Opening the microphone failed; report and abort
-            logger.exception('Microphone handling failed: %s', e)
-            speak("خطا در دسترسی به میکروفون. لطفا تنظیمات سخت‌افزاری را بررسی کنید.")
+            speak(f"خطا رخ داد: {e}")
+            print(f"خطا: {e}")
             return ""
     # If loop completes without returning, return empty string to satisfy -> str annotation
     return ""
@@ -774,10 +992,6 @@ def init_music():
     logger.debug(f"لیست آهنگ‌ها: {songs}")
     music_state["songs"] = songs
     music_state["current"] = 0
-    try:
-        pygame.mixer.init()
-    except Exception as e:
-        logger.exception(f"خطا در init میکسر: {e}")
     return song_dir
 
 def play_music(song_name=None):
@@ -790,7 +1004,8 @@ def play_music(song_name=None):
     songs = music_state["songs"]
     logger.debug(f"songs: {songs}")
     if song_name:
-        matches = [i for i, song in enumerate(songs) if song_name.lower() in song.lower()]
+        wanted = normalize_text(song_name)
+        matches = [i for i, song in enumerate(songs) if wanted in normalize_text(song)]
         logger.debug(f"matches: {matches}")
         if matches:
             music_state["current"] = matches[0]
@@ -802,8 +1017,7 @@ def play_music(song_name=None):
         song_path = os.path.join(song_dir, songs[music_state["current"]])
         logger.debug(f"song_path: {song_path}")
         try:
-            pygame.mixer.music.load(song_path)
-            pygame.mixer.music.play()
+            AUDIO.play(audio_output.MUSIC, song_path)
             music_state["playing"] = True
             speak(f"در حال پخش {songs[music_state['current']]}")
             logger.info(f"در حال پخش {songs[music_state['current']]}" )
@@ -816,7 +1030,7 @@ def play_music(song_name=None):
 
 def pause_music():
     if music_state["playing"]:
-        pygame.mixer.music.pause()
+        AUDIO.pause(audio_output.MUSIC)
         music_state["playing"] = False
         speak("موزیک متوقف شد.")
         logger.info("موزیک متوقف شد.")
@@ -825,7 +1039,7 @@ def pause_music():
 
 def resume_music():
     if not music_state["playing"]:
-        pygame.mixer.music.unpause()
+        AUDIO.resume(audio_output.MUSIC)
         music_state["playing"] = True
         speak("موزیک ادامه یافت.")
         logger.info("موزیک ادامه یافت.")
@@ -834,7 +1048,7 @@ def resume_music():
 
 def next_music():
     if music_state["songs"]:
-        pygame.mixer.music.stop()
+        AUDIO.stop(audio_output.MUSIC)
         music_state["current"] = (music_state["current"] + 1) % len(music_state["songs"])
         play_music()
     else:
@@ -842,7 +1056,7 @@ def next_music():
 
 def previous_music():
     if music_state["songs"]:
-        pygame.mixer.music.stop()
+        AUDIO.stop(audio_output.MUSIC)
         music_state["current"] = (music_state["current"] - 1) % len(music_state["songs"])
         play_music()
     else:
@@ -850,11 +1064,15 @@ def previous_music():
 
 def set_name() -> None:
     """Sets a new name for the assistant."""
-    speak("چه اسمی برای من انتخاب می‌کنید؟")
-    name = takecommand()
+    with RESCORER.suspended():
+        # a name is free text: no rescoring towards commands
+        ask("چه اسمی برای من انتخاب می‌کنید؟")
+        name = takecommand()
     if name:
         with open("assistant_name.txt", "w") as file:
             file.write(name)
+        if WAKE_GATE is not None:
+            WAKE_GATE.configure(name)
         speak(f"از این به بعد اسم من {name} است.")
     else:
         speak("متاسفم، متوجه نشدم.")
@@ -881,9 +1099,310 @@ def search_wikipedia(query):
         speak("چیزی در ویکی‌پدیا پیدا نشد.")
 
 
+def open_app(found_key):
+    """Launch the APPS entry `found_key`, trying each configured candidate path."""
+    username = os.getlogin()
+    candidates = APPS.get(found_key, [])
+    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+    found = False
+    for candidate in candidates:
+        candidate_path = candidate.replace("{username}", username)
+        # Check .lnk explicitly and also the path itself
+        print(f"[DEBUG] بررسی نامزد: {candidate_path}")
+        if os.path.exists(candidate_path):
+            print(f"[DEBUG] پیدا شد: {candidate_path}")
+            # Prefer os.startfile on Windows for better integration
+            try:
+                if sys.platform == 'win32':
+                    try:
+                        os.startfile(candidate_path)
+                    except OSError as oe:
+                        # Common case: WinError 1223 (operation canceled by user) or other OS-level cancels
+                        print(f"[DEBUG] os.startfile failed with OSError: {oe}")
+                        # Fallback: use cmd start which uses the shell
+                        try:
+                            subprocess.Popen(["cmd", "/c", "start", "", f'"{candidate_path}"'], shell=False)
+                        except Exception as e2:
+                            print(f"[DEBUG] fallback start failed: {e2}")
+                            raise
+                else:
+                    subprocess.Popen([candidate_path], shell=False)
+                speak(f"{found_key} اجرا شد.")
+            except Exception as e:
+                print(f"[DEBUG] خطا در اجرای {candidate_path}: {e}")
+                traceback.print_exc()
+                speak(f"خطا در اجرای {found_key}: {e}")
+            found = True
+            break
+        # try candidate + .lnk if not found and no extension provided
+        if not os.path.splitext(candidate_path)[1] and os.path.exists(candidate_path + ".lnk"):
+            lnk = candidate_path + ".lnk"
+            try:
+                print(f"[DEBUG] پیدا شد: {lnk}")
+                if sys.platform == 'win32':
+                    os.startfile(lnk)
+                else:
+                    subprocess.Popen([lnk], shell=False)
+                speak(f"{found_key} اجرا شد.")
+            except Exception as e:
+                print(f"[DEBUG] خطا در اجرای {lnk}: {e}")
+                traceback.print_exc()
+                speak(f"خطا در اجرای {found_key}: {e}")
+            found = True
+            break
+    if not found:
+        speak(f"{found_key} نصب نیست یا مسیر اشتباه است.")
+        print(f"[DEBUG] {found_key} هیچ یک از مسیرهای پیشنهادی پیدا نشد: {candidates}")
+
+
+# --- Command registry ------------------------------------------------------
+# Built-in commands declare their triggers once; priorities keep the order of
+# the former if/elif chain (plugins, priority 0, are consulted first).
+
+_HARDWARE_INTENTS = [
+    ('volume_down', lambda: change_volume(-0.1), "صدا کم شد."),
+    ('volume_up', lambda: change_volume(0.1), "صدا زیاد شد."),
+    ('volume_small_up', lambda: change_volume(0.05), "صدا ۵ درصد زیاد شد."),
+    ('volume_small_down', lambda: change_volume(-0.05), "صدا ۵ درصد کم شد."),
+    ('mute', lambda: mute_volume(True), "صدا قطع شد."),
+    ('unmute', lambda: mute_volume(False), "صدا وصل شد."),
+    ('brightness_down', lambda: change_brightness(-10), None),
+    ('brightness_up', lambda: change_brightness(10), None),
+    ('wifi_on', lambda: set_wifi(True), None),
+    ('wifi_off', lambda: set_wifi(False), None),
+]
+
+
+def _hardware_handler(action, reply):
+    def handler():
+        action()
+        if reply:
+            speak(reply)
+    return handler
+
+
+for _prio, (_name, _action, _reply) in enumerate(_HARDWARE_INTENTS, start=10):
+    INTENTS.register(_name, _hardware_handler(_action, _reply), triggers=SYNONYMS[_name], priority=_prio, fuzzy=True)
+
+
+def _list_shortcuts():
+    list_desktop_shortcuts()
+    speak("Desktop shortcuts listed in terminal.")
+
+
+def _song_name(query):
+    # extract song name by removing known verbs
+    song_name = str(normalize_query(query))
+    for v in SYNONYMS.get('play_music', []):
+        song_name = song_name.replace(normalize_text(v), '')
+    song_name = song_name.replace('پخش', '').replace('موزیک', '').replace('آهنگ', '').strip()
+    return {'song_name': song_name}
+
+
+def _today_events():
+    with speech_batch():
+        today_events = get_today_events()
+        if today_events:
+            speak("مناسبت‌های امروز:")
+            for event in today_events:
+                speak(event)
+                print(event)
+        else:
+            speak("امروز مناسبت خاصی ثبت نشده است.")
+            print("امروز مناسبت خاصی ثبت نشده است.")
+
+
+def _open_site(site):
+    url = SITES[site]
+    wb.open(url)
+    speak(f"سایت {site} باز شد.")
+    print(f"سایت {site} باز شد: {url}")
+
+
+def _screenshot():
+    screenshot()
+    speak("اسکرین‌شات گرفته شد، لطفا بررسی کنید.")
+
+
+def _shutdown():
+    speak("سیستم خاموش می‌شود، خداحافظ!")
+    OUTPUT.wait(10)
+    os.system("C:\\Windows\\System32\\shutdown.exe /s /f /t 1")
+
+
+def _restart():
+    speak("سیستم ریستارت می‌شود، لطفا صبر کنید!")
+    OUTPUT.wait(10)
+    os.system("shutdown /r /f /t 1")
+
+
+def _go_offline():
+    speak("دستیار آفلاین شد. روز خوبی داشته باشید!")
+
+
+def _stop_speaking():
+    OUTPUT.cancel()
+
+
+def _register_open_app():
+    INTENTS.register('open_app', open_app, triggers=list(APPS) + list(APP_ALIASES), priority=42,
+                     extract=lambda q: {'found_key': find_app_key(q)} if find_app_key(q) else None)
+
+
+INTENTS.register('stop_speaking', _stop_speaking, triggers=["بس کن", "ساکت شو", "stop talking"], priority=1)
+INTENTS.register('list_shortcuts', _list_shortcuts, triggers=["list shortcuts", "show shortcuts", "لیست شورتکات"], priority=5)
+INTENTS.register('tell_time', tell_time, triggers=["ساعت"], priority=30)
+INTENTS.register('date', date, triggers=["تاریخ"], priority=31)
+INTENTS.register('system_status', system_status, triggers=["وضعیت"], priority=32)
+INTENTS.register('show_ip', show_ip, triggers=["آیپی", "آی پی", "ip"], priority=33)
+INTENTS.register('wikipedia', search_wikipedia, triggers=["ویکی پدیا"], priority=34,
+                 extract=lambda q: {'query': q.replace("ویکی پدیا", "").strip()})
+INTENTS.register('play_music', play_music, triggers=SYNONYMS['play_music'], priority=35, fuzzy=True, extract=_song_name)
+INTENTS.register('pause_music', pause_music, triggers=["توقف موزیک", "توقف آهنگ"], exact=["توقف"], priority=36)
+INTENTS.register('resume_music', resume_music, triggers=["ادامه موزیک", "ادامه آهنگ", "دوباره پخش کن"], priority=37)
+INTENTS.register('next', next_music, triggers=["بعدی"], priority=38)
+INTENTS.register('previous', previous_music, triggers=["قبلی"], priority=39)
+INTENTS.register('stop_music', stop_music, triggers=["قطع موزیک", "قطع آهنگ"], priority=40)
+INTENTS.register('today_events', _today_events, triggers=["مناسبت"], priority=41)
+# باز کردن نرم‌افزارها فقط با گفتن نام برنامه (پشتیبانی از معادل‌های فارسی)
+_register_open_app()
+# باز کردن سایت‌ها فقط با گفتن نام سایت
+INTENTS.register('open_site', _open_site, predicate=find_site, priority=43, extract=lambda q: {'site': find_site(q)})
+INTENTS.register('set_name', set_name, triggers=["تغییر نام"], priority=44)
+INTENTS.register('screenshot', _screenshot, triggers=["اسکرین شات"], priority=45)
+INTENTS.register('joke', tell_joke_fa, triggers=["جوک"], priority=46)
+INTENTS.register('shutdown', _shutdown, triggers=["خاموش"], priority=47, exits=True)
+INTENTS.register('restart', _restart, triggers=["ریستارت"], priority=48, exits=True)
+INTENTS.register('exit', _go_offline, triggers=["خروج", "آفلاین"], priority=49, exits=True)
+
+
+def _on_apps_changed(snapshot):
+    """apps.json changed on disk: rebuild everything derived from APPS and APP_ALIASES."""
+    global APPS, APP_ALIASES, INTENT_INDEX, FUZZY_INDEX, _APP_RANK, _ALIAS_RANK
+    apps, aliases = _apps_tables(snapshot)
+    intent_index = build_intent_index(SYNONYMS, SITES, apps, aliases)
+    fuzzy_index = build_fuzzy_index(SYNONYMS, SITES, apps, aliases)
+    APPS, APP_ALIASES = apps, aliases
+    INTENT_INDEX, FUZZY_INDEX = intent_index, fuzzy_index
+    _APP_RANK = {f'app:{k}': i for i, k in enumerate(apps)}
+    _ALIAS_RANK = {f'alias:{a}': i for i, a in enumerate(aliases)}
+    _register_open_app()
+    # plugins whose manifest keywords come from apps.json
+    for plugin in PLUGINS:
+        if getattr(plugin, 'manifest', None) and getattr(plugin, 'path', None):
+            plugin.KEYWORDS = plugin_loader.manifest_keywords(plugin.manifest, pathlib.Path(plugin.path).parent)
+            register_plugin(plugin)
+    logger.info('apps.json reloaded: %d apps, %d aliases', len(apps), len(aliases))
+
+
+APPS_CONFIG.subscribe(_on_apps_changed)
+
+
+def _apps_version():
+    return APPS_CONFIG.version
+
+
+# Resolved intents are cached per normalized query; registering or removing an
+# intent/plugin clears the cache, and so does a change to these fingerprints.
+INTENTS.cache.add_dependency(_apps_version)
+INTENTS.cache.add_dependency(lambda: hash(tuple((k, tuple(v)) for k, v in SYNONYMS.items())))
+
+PROFILE.mark_ready()
+
+
+def process_command(query):
+    """Handle one transcript: normalize, react to emotion, dispatch. Returns the intent that handled it, or None."""
+    # normalized once; emotion check, plugins and built-ins all reuse it
+    query = normalize_query(query)
+    # apply config edits (apps.json) here, between commands, not on a watcher thread mid-dispatch
+    config_service.SERVICE.poll()
+
+    # تشخیص احساسات و واکنش
+    emotion = detect_emotion(query)
+    if emotion:
+        react_to_emotion(emotion)
+        # ادامه اجرای دستیار بعد از واکنش
+
+    # Plugins and built-in commands share one dispatch table (see INTENTS)
+    return INTENTS.dispatch(query)
+
+
+def profile_startup(budget_ms=None) -> int:
+    """Load every deferred subsystem, print the startup breakdown; non-zero if over budget."""
+    for name, error in _load_lazy_modules():
+        if error:
+            print(f"[profile] {name} not importable: {error}")
+    try:
+        _get_engine()
+    except Exception as e:
+        print(f"[profile] TTS engine init failed: {e}")
+    print(PROFILE.report())
+    if budget_ms is not None and PROFILE.ready_at is not None and PROFILE.ready_at * 1000 > budget_ms:
+        print(f"[profile] startup budget exceeded: {PROFILE.ready_at * 1000:.1f} ms > {budget_ms} ms")
+        return 1
+    return 0
+
+
+def static_phrases() -> list:
+    """Every literal string passed to speak() in this file: the fixed replies worth pre-rendering."""
+    import ast
+    tree = ast.parse(Path(__file__).read_text(encoding='utf-8'))
+    phrases = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'speak'
+                and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            text = node.args[0].value
+            if text.strip() and not _is_error_text(text) and text not in phrases:
+                phrases.append(text)
+    return phrases
+
+
+def warm_tts_cache(lang='fa', workers=4, background=True):
+    """Pre-render the static replies into TTS_CACHE on a thread pool (in a background thread by default)."""
+    items = [(tts_cache.cache_key(text, lang, None, 'gtts'), text) for text in static_phrases()]
+
+    def run():
+        counts = TTS_CACHE.warm(items, lambda text: _gtts_bytes(text, lang), workers=workers)
+        logger.info('TTS cache warm-up: %s', counts)
+        return counts
+    if not background:
+        return run()
+    t = threading.Thread(target=run, name='io-tts-warmup', daemon=True)
+    t.start()
+    return t
+
+
 if __name__ == "__main__":
         # کنترل سخت‌افزار
     import sys
+    import argparse
+    parser = argparse.ArgumentParser(description="iO voice assistant")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print per-module import and init times, then exit")
+    parser.add_argument('--startup-budget-ms', type=float, default=None,
+                        help="with --profile-startup: exit 1 if startup exceeds this many ms")
+    parser.add_argument('--text', action='store_true',
+                        help="headless: read transcripts from stdin instead of the microphone (dry run)")
+    parser.add_argument('--replay', metavar='COMMANDS_JSONL',
+                        help="headless: replay transcripts from a JSONL file (dry run)")
+    parser.add_argument('--report', metavar='JSON',
+                        help="with --text/--replay: also write the latency report to this file")
+    parser.add_argument('--quiet', action='store_true',
+                        help="with --text/--replay: do not echo stubbed speech and actions")
+    parser.add_argument('--warm-tts', action='store_true',
+                        help="pre-render the fixed spoken replies into the online TTS cache, then exit")
+    args = parser.parse_args()
+    if args.profile_startup:
+        sys.exit(profile_startup(args.startup_budget_ms))
+    if args.warm_tts:
+        counts = warm_tts_cache(background=False)
+        print(f"TTS cache: {counts['rendered']} rendered, {counts['cached']} already cached, "
+              f"{counts['failed']} failed ({TTS_CACHE.directory})")
+        sys.exit(1 if counts['failed'] else 0)
+    if args.text or args.replay:
+        import headless
+        sys.exit(headless.main(sys.modules[__name__], replay=args.replay, report_path=args.report,
+                               echo=not args.quiet))
     if sys.platform == "win32":
         import os
         import subprocess
@@ -909,293 +1428,25 @@ if __name__ == "__main__":
                 pass
     wishme()
 
-    query = ""
     while True:
+        query = takecommand()
         # دیباگ مقدار فرمان صوتی
         print(f"[DEBUG] query: {query}")
-        if "list shortcuts" in query or "show shortcuts" in query or "لیست شورتکات" in query:
-            list_desktop_shortcuts()
-            speak("Desktop shortcuts listed in terminal.")
-            continue
-        query = takecommand()
         if not query:
             continue
-
-        # تشخیص احساسات و واکنش
-        emotion = detect_emotion(query)
-        if emotion:
-            react_to_emotion(emotion)
-            # ادامه اجرای دستیار بعد از واکنش
-
-        # Plugin dispatch: give plugins first chance to handle the query.
+        if OUTPUT.speaking:
+            # barge-in: a new command cuts off whatever is being said (echoes never get
+            # here: capture pauses while speaking and takecommand() drops transcripts of replies)
+            OUTPUT.cancel()
+        started = time.perf_counter()
         try:
-            plugin_handled = False
-            for mod in PLUGINS:
-                try:
-                    if hasattr(mod, 'can_handle') and mod.can_handle(query):
-                        try:
-                            result = mod.handle(query)
-                            # Treat True, None, or dict with handled=True as handled
-                            if result is True or result is None or (isinstance(result, dict) and result.get('handled')):
-                                plugin_handled = True
-                            else:
-                                # If plugin returns a truthy value treat as handled
-                                plugin_handled = bool(result)
-                        except Exception as pe:
-                            logger.exception(f"Plugin {getattr(mod, '__name__', str(mod))} error in handle: {pe}")
-                        if plugin_handled:
-                            logger.debug(f"Query handled by plugin {getattr(mod, '__name__', str(mod))}")
-                            break
-                except Exception:
-                    logger.exception(f"Plugin {getattr(mod, '__name__', str(mod))} error in can_handle")
-            if plugin_handled:
-                # Skip built-in handlers when a plugin handled the query
-                continue
+            intent = process_command(query)
         except Exception:
-            logger.exception("Error during plugin dispatch")
-
-        # Synonyms map for common commands (used by keyword_in_query)
-        SYNONYMS = {
-            'volume_down': ['کم کن صدا', 'کاهش صدا', 'volume down', 'صدای کمتر', 'کمش کن'],
-            'volume_up': ['زیاد کن صدا', 'افزایش صدا', 'volume up', 'صدای بیشتر', 'زیادش کن'],
-            'volume_small_up': ['صدا زیاد', 'یکم زیاد کن صدا', '۵ درصد زیاد'],
-            'volume_small_down': ['صدا کم', 'یکم کم کن صدا', '۵ درصد کم'],
-            'mute': ['قطع صدا', 'mute', 'بی‌صدا', 'قطع کن صدا'],
-            'unmute': ['وصل صدا', 'unmute', 'صدا وصل'],
-            'brightness_down': ['کم کن نور', 'کاهش نور', 'brightness down', 'نور کم کن'],
-            'brightness_up': ['زیاد کن نور', 'افزایش نور', 'brightness up', 'نور زیاد کن'],
-            'wifi_on': ['وای فای روشن', 'wifi on', 'وایفای روشن', 'اتصال وای فای'],
-            'wifi_off': ['وای فای خاموش', 'wifi off', 'قطع وای فای', 'وایفای خاموش'],
-            'play_music': ['پخش موزیک', 'پخش آهنگ', 'play music', 'پخش کن موزیک'],
-            'pause_music': ['توقف موزیک', 'توقف آهنگ', 'pause music', 'توقف'],
-            'resume_music': ['ادامه موزیک', 'ادامه آهنگ', 'resume music', 'دوباره پخش کن'],
-            'next': ['بعدی', 'بعدی آهنگ', 'next'],
-            'previous': ['قبلی', 'آهنگ قبلی', 'previous'],
-            'stop_music': ['قطع موزیک', 'قطع آهنگ', 'stop music']
-        }
-
-        def keyword_in_query(q: str, keys, fuzzy_thresh: float = 0.78) -> bool:
-            """Return True if any keyword or its synonym appears in q.
-
-            keys may be a single string or an iterable of strings.
-            Uses exact word-boundary match and a lightweight fuzzy compare on words.
-            """
-            if not q:
-                return False
-            qq = q.lower()
-            if isinstance(keys, str):
-                keys = [keys]
-            for key in keys:
-                # if key maps to synonyms list in SYNONYMS, expand
-                candidates = []
-                if isinstance(key, str) and key in SYNONYMS:
-                    candidates = SYNONYMS[key]
-                elif isinstance(key, (list, tuple)):
-                    candidates = list(key)
-                else:
-                    candidates = [str(key)]
-
-                for cand in candidates:
-                    c = cand.lower()
-                    # word-boundary regex
-                    try:
-                        if re.search(r'\b' + re.escape(c) + r'\b', qq):
-                            return True
-                    except re.error:
-                        # fallback to substring if regex fails on unicode
-                        if c in qq:
-                            return True
-                    if c in qq:
-                        return True
-                    # fuzzy compare by words (unicode-aware)
-                    words = re.findall(r"\w+", qq, flags=re.UNICODE)
-                    for w in words:
-                        if difflib.SequenceMatcher(None, w, c).ratio() >= fuzzy_thresh:
-                            return True
-            return False
-
-        # کنترل سخت‌افزار با پشتیبانی از هم‌معنی‌ها
-        if keyword_in_query(query, 'volume_down'):
-            change_volume(-0.1)
-            speak("صدا کم شد.")
-            continue
-        if keyword_in_query(query, 'volume_up'):
-            change_volume(0.1)
-            speak("صدا زیاد شد.")
-            continue
-        if keyword_in_query(query, 'volume_small_up'):
-            change_volume(0.05)
-            speak("صدا ۵ درصد زیاد شد.")
-            continue
-        if keyword_in_query(query, 'volume_small_down'):
-            change_volume(-0.05)
-            speak("صدا ۵ درصد کم شد.")
-            continue
-        if keyword_in_query(query, 'mute'):
-            mute_volume(True)
-            speak("صدا قطع شد.")
+            logger.exception("Error during command dispatch")
             continue
-        if keyword_in_query(query, 'unmute'):
-            mute_volume(False)
-            speak("صدا وصل شد.")
-            continue
-        if keyword_in_query(query, 'brightness_down'):
-            change_brightness(-10)
-            continue
-        if keyword_in_query(query, 'brightness_up'):
-            change_brightness(10)
-            continue
-        if keyword_in_query(query, 'wifi_on'):
-            set_wifi(True)
-            continue
-        if keyword_in_query(query, 'wifi_off'):
-            set_wifi(False)
-            continue
-
-        if "ساعت" in query:
-            tell_time()
-
-        elif "تاریخ" in query:
-            date()
-
-        elif "وضعیت" in query:
-            system_status()
-
-        elif "آیپی" in query or "آی پی" in query or "ip" in query:
-            show_ip()
-
-        elif "ویکی پدیا" in query:
-            query = query.replace("ویکی پدیا", "").strip()
-            search_wikipedia(query)
-
-        elif keyword_in_query(query, 'play_music'):
-            # extract song name by removing known verbs
-            song_name = query
-            for v in SYNONYMS.get('play_music', []):
-                song_name = song_name.replace(v, '')
-            song_name = song_name.replace('پخش', '').replace('موزیک', '').replace('آهنگ', '').strip()
-            play_music(song_name)
-
-        elif "توقف موزیک" in query or "توقف آهنگ" in query or query.strip() == "توقف":
-            pause_music()
-
-        elif "ادامه موزیک" in query or "ادامه آهنگ" in query or "دوباره پخش کن" in query:
-            resume_music()
-
-        elif "بعدی" in query:
-            next_music()
-
-        elif "قبلی" in query:
-            previous_music()
-
-        elif "قطع موزیک" in query or "قطع آهنگ" in query:
-            stop_music()
-
-        elif "مناسبت" in query:
-            today_events = get_today_events()
-            if today_events:
-                speak("مناسبت‌های امروز:")
-                for event in today_events:
-                    speak(event)
-                    print(event)
-            else:
-                speak("امروز مناسبت خاصی ثبت نشده است.")
-                print("امروز مناسبت خاصی ثبت نشده است.")
-        # باز کردن نرم‌افزارها فقط با گفتن نام برنامه (پشتیبانی از معادل‌های فارسی)
-        elif any(app in query for app in APPS) or any(alias in query for alias in APP_ALIASES):
-            # پیدا کردن کلید canonical از روی query با بررسی کلیدهای APPS و معادل‌ها
-            found_key = None
-            for app_key in APPS.keys():
-                if app_key in query:
-                    found_key = app_key
-                    break
-            if not found_key:
-                for alias, canonical in APP_ALIASES.items():
-                    if alias in query:
-                        found_key = canonical
-                        break
-
-            if found_key:
-                username = os.getlogin()
-                candidates = APPS.get(found_key, [])
-                desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-                found = False
-                for candidate in candidates:
-                    candidate_path = candidate.replace("{username}", username)
-                    # Check .lnk explicitly and also the path itself
-                    print(f"[DEBUG] بررسی نامزد: {candidate_path}")
-                    if os.path.exists(candidate_path):
-                        print(f"[DEBUG] پیدا شد: {candidate_path}")
-                        # Prefer os.startfile on Windows for better integration
-                        try:
-                            if sys.platform == 'win32':
-                                try:
-                                    os.startfile(candidate_path)
-                                except OSError as oe:
-                                    # Common case: WinError 1223 (operation canceled by user) or other OS-level cancels
-                                    print(f"[DEBUG] os.startfile failed with OSError: {oe}")
-                                    # Fallback: use cmd start which uses the shell
-                                    try:
-                                        subprocess.Popen(["cmd", "/c", "start", "", f'"{candidate_path}"'], shell=False)
-                                    except Exception as e2:
-                                        print(f"[DEBUG] fallback start failed: {e2}")
-                                        raise
-                            else:
-                                subprocess.Popen([candidate_path], shell=False)
-                            speak(f"{found_key} اجرا شد.")
-                        except Exception as e:
-                            print(f"[DEBUG] خطا در اجرای {candidate_path}: {e}")
-                            traceback.print_exc()
-                            speak(f"خطا در اجرای {found_key}: {e}")
-                        found = True
-                        break
-                    # try candidate + .lnk if not found and no extension provided
-                    if not os.path.splitext(candidate_path)[1] and os.path.exists(candidate_path + ".lnk"):
-                        lnk = candidate_path + ".lnk"
-                        try:
-                            print(f"[DEBUG] پیدا شد: {lnk}")
-                            if sys.platform == 'win32':
-                                os.startfile(lnk)
-                            else:
-                                subprocess.Popen([lnk], shell=False)
-                            speak(f"{found_key} اجرا شد.")
-                        except Exception as e:
-                            print(f"[DEBUG] خطا در اجرای {lnk}: {e}")
-                            traceback.print_exc()
-                            speak(f"خطا در اجرای {found_key}: {e}")
-                        found = True
-                        break
-                if not found:
-                    speak(f"{found_key} نصب نیست یا مسیر اشتباه است.")
-                    print(f"[DEBUG] {found_key} هیچ یک از مسیرهای پیشنهادی پیدا نشد: {candidates}")
-
-        # باز کردن سایت‌ها فقط با گفتن نام سایت (تطابق دقیق)
-        elif query.strip() in SITES:
-            url = SITES[query.strip()]
-            wb.open(url)
-            speak(f"سایت {query.strip()} باز شد.")
-            print(f"سایت {query.strip()} باز شد: {url}")
-
-        elif "تغییر نام" in query:
-            set_name()
-
-        elif "اسکرین شات" in query:
-            screenshot()
-            speak("اسکرین‌شات گرفته شد، لطفا بررسی کنید.")
-
-        elif "جوک" in query:
-            tell_joke_fa()
-
-        elif "خاموش" in query:
-            speak("سیستم خاموش می‌شود، خداحافظ!")
-            os.system("C:\\Windows\\System32\\shutdown.exe /s /f /t 1")
-            break
-
-        elif "ریستارت" in query:
-            speak("سیستم ریستارت می‌شود، لطفا صبر کنید!")
-            os.system("shutdown /r /f /t 1")
-            break
-
-        elif "خروج" in query or "آفلاین" in query:
-            speak("دستیار آفلاین شد. روز خوبی داشته باشید!")
+        finally:
+            if PIPELINE is not None:
+                PIPELINE.record_dispatch(time.perf_counter() - started)
+        if intent is not None and intent.exits:
+            OUTPUT.wait(10)
             break
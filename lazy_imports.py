@@ -0,0 +1,149 @@
+"""Lazy module proxies and the startup profile.
+
+    pygame = lazy_import('pygame')     # nothing imported yet
+    pygame.mixer.init()                # imported here, on first attribute access
+
+Every import made through a proxy, and every block wrapped in
+PROFILE.measure(), is recorded in PROFILE so `python io.py --profile-startup`
+can print where startup time goes. There is one proxy per module name, however
+many modules ask for it; loads that happen after mark_ready() (first use, or
+load_all() in --profile-startup) are reported separately as deferred.
+"""
+from __future__ import annotations
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+_logger = logging.getLogger('io.startup')
+
+
+class StartupProfile:
+    """Collects (kind, name, seconds) records; kind is 'import' or 'init'.
+
+    Records made after mark_ready() go to `deferred` instead: they did not delay startup.
+    """
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.records: list[tuple[str, str, float]] = []
+        self.deferred: list[tuple[str, str, float]] = []
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float) -> None:
+        with self._lock:
+            (self.records if self.ready_at is None else self.deferred).append((kind, name, seconds))
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start)
+
+    def mark_ready(self) -> None:
+        """Note the moment the assistant could start listening."""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter() - self.t0
+
+    @staticmethod
+    def _table(records) -> list[str]:
+        lines = [f"{'kind':<7} {'name':<32} {'ms':>9}"]
+        for kind, name, seconds in sorted(records, key=lambda r: -r[2]):
+            lines.append(f"{kind:<7} {name:<32} {seconds * 1000:>9.1f}")
+        return lines
+
+    def report(self) -> str:
+        with self._lock:
+            records, deferred = list(self.records), list(self.deferred)
+        lines = self._table(records)
+        if self.ready_at is not None:
+            lines.append(f"ready to listen after {self.ready_at * 1000:.1f} ms")
+        if deferred:
+            lines.append('')
+            lines.append('deferred (loaded after ready, on first use):')
+            lines += self._table(deferred)
+        return '\n'.join(lines)
+
+
+PROFILE = StartupProfile()
+
+# module name -> its one proxy, so --profile-startup can load and time each module once
+LAZY_MODULES: dict[str, 'LazyModule'] = {}
+_registry_lock = threading.Lock()
+
+
+class LazyModule:
+    """Module stand-in that performs the real import on first attribute access."""
+
+    def __init__(self, name: str, on_load: Optional[Callable] = None) -> None:
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_on_load'] = [on_load] if on_load is not None else []
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        mod = self.__dict__['_module']
+        if mod is None:
+            with self.__dict__['_lock']:
+                mod = self.__dict__['_module']
+                if mod is None:
+                    name = self.__dict__['_name']
+                    start = time.perf_counter()
+                    mod = importlib.import_module(name)
+                    PROFILE.record('import', name, time.perf_counter() - start)
+                    _logger.debug('Lazily imported %s', name)
+                    self.__dict__['_module'] = mod
+                    for on_load in self.__dict__['_on_load']:
+                        on_load(mod)
+        return mod
+
+    def _add_on_load(self, on_load: Callable) -> None:
+        with self.__dict__['_lock']:
+            mod = self.__dict__['_module']
+            if mod is None:
+                self.__dict__['_on_load'].append(on_load)
+        if mod is not None:
+            on_load(mod)
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name: str, on_load: Optional[Callable] = None) -> LazyModule:
+    """The proxy for `name`, shared by every module that asks for it; on_load(mod) runs once it is imported."""
+    with _registry_lock:
+        proxy = LAZY_MODULES.get(name)
+        if proxy is None:
+            LAZY_MODULES[name] = proxy = LazyModule(name, on_load)
+            return proxy
+    if on_load is not None:
+        proxy._add_on_load(on_load)
+    return proxy
+
+
+def load_all() -> list[tuple[str, Optional[str]]]:
+    """Import every registered lazy module; return [(name, error or None)]."""
+    results = []
+    for name, proxy in list(LAZY_MODULES.items()):
+        try:
+            proxy._load()
+            results.append((name, None))
+        except Exception as e:
+            results.append((name, f'{type(e).__name__}: {e}'))
+    return results
@@ -0,0 +1,292 @@
+"""Long-lived microphone capture with voice-activity segmentation.
+
+takecommand() used to build a Recognizer, open the microphone and spend 1.5 s
+in adjust_for_ambient_noise() for every command, and nothing said while the
+assistant was speaking was heard. BackgroundListener instead keeps one input
+stream open on a daemon thread:
+
+- audio is read in CHUNK-sized buffers; while waiting for speech the last
+  `pre_roll` seconds are kept in a ring buffer so the start of a word is not
+  clipped when the energy threshold is crossed
+- a phrase ends after `pause_threshold` seconds below the threshold (or at
+  `phrase_time_limit`) and is pushed, as an sr.AudioData, onto a bounded queue
+- the energy threshold is calibrated once on the capture thread and then
+  follows the ambient level with speech_recognition's damping formula,
+  without ever blocking the caller
+- pause()/resume(tail) discard the audio in between (and `tail` seconds of
+  it after resume) so the assistant's own voice never becomes a phrase;
+  SpeechOutput calls them around every utterance (see io._get_listener)
+
+Any object shaped like sr.Microphone / sr.AudioFile works as the source
+(context manager with .stream.read(), CHUNK, SAMPLE_RATE, SAMPLE_WIDTH), so a
+WAV file can be replayed through the same segmentation.
+"""
+from __future__ import annotations
+import logging
+import math
+import queue
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Callable, Optional
+
+from lazy_imports import lazy_import
+
+try:
+    import audioop  # deprecated in 3.11, removed in 3.13; speech_recognition uses it too
+except ImportError:
+    audioop = None
+
+sr = lazy_import('speech_recognition')
+
+_logger = logging.getLogger('io.listener')
+
+
+def rms(data: bytes, width: int) -> float:
+    """Root-mean-square energy of little-endian PCM samples."""
+    if audioop is not None:
+        return audioop.rms(data, width)
+    if width != 2 or not data:
+        return 0.0
+    samples = array('h', data[:len(data) - len(data) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class BackgroundListener:
+    """Capture thread that turns a continuous input stream into a queue of phrases."""
+
+    def __init__(self, source_factory: Callable, energy_threshold: Optional[float] = None,
+                 dynamic_energy: bool = True, pause_threshold: float = 0.8, phrase_time_limit: float = 10.0,
+                 min_phrase: float = 0.3, pre_roll: float = 0.5, calibration: float = 1.0,
+                 max_phrases: int = 8, audio_factory: Optional[Callable] = None,
+                 on_threshold: Optional[Callable] = None, on_error: Optional[Callable] = None) -> None:
+        self.source_factory = source_factory
+        self.energy_threshold = energy_threshold
+        self.dynamic_energy = dynamic_energy
+        # same defaults as speech_recognition.Recognizer
+        self.dynamic_damping = 0.15
+        self.dynamic_ratio = 1.5
+        self.min_energy = 50.0
+        self.pause_threshold = pause_threshold
+        self.phrase_time_limit = phrase_time_limit
+        self.min_phrase = min_phrase
+        self.pre_roll = pre_roll
+        self.calibration = calibration
+        self.audio_factory = audio_factory
+        # on_threshold(value): after calibration and every threshold_report_interval s of adaptation
+        self.on_threshold = on_threshold
+        self.threshold_report_interval = 30.0
+        # on_error(exc): the source failed to open or stopped delivering audio
+        self.on_error = on_error
+        self._since_report = 0.0
+        self.phrases: queue.Queue = queue.Queue(maxsize=max_phrases)
+        self.in_speech = False
+        self.last_error: Optional[BaseException] = None
+        self.exhausted = False  # the source ended (files); microphones never do
+        self.stats = {'phrases': 0, 'dropped': 0, 'discarded_short': 0, 'discarded_paused': 0, 'errors': 0,
+                      'buffers': 0}
+        # set by pause(); _skip is audio (not wall-clock) seconds still to discard after resume()
+        self._paused = False
+        self._skip = 0.0
+        self._pause_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- control -------------------------------------------------------------
+
+    def start(self) -> 'BackgroundListener':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self.exhausted = False
+            self._thread = threading.Thread(target=self._run, name='io-listener', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_phrase(self, timeout: Optional[float] = None):
+        """Next complete phrase (AudioData), or None if none started within timeout.
+
+        A phrase that is still being spoken when the timeout expires is waited for.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.phrases.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if self.exhausted and self.phrases.empty():
+                return None
+            if deadline is not None and time.monotonic() >= deadline and not self.in_speech:
+                return None
+
+    def pause(self) -> None:
+        """Discard captured audio until resume(); a phrase in progress is dropped as well."""
+        with self._pause_lock:
+            self._paused = True
+
+    def resume(self, tail: float = 0.0) -> None:
+        """Segment audio again once another `tail` seconds have been discarded (echo, output latency)."""
+        with self._pause_lock:
+            self._paused = False
+            self._skip = max(self._skip, tail)
+
+    @property
+    def paused(self) -> bool:
+        with self._pause_lock:
+            return self._paused or self._skip > 0
+
+    def _discarding(self, seconds: float) -> bool:
+        """True if a buffer of `seconds` read now falls in a pause (or its tail)."""
+        with self._pause_lock:
+            if self._paused:
+                return True
+            if self._skip > 0:
+                self._skip -= seconds
+                return True
+            return False
+
+    def drain(self) -> int:
+        """Discard queued phrases; return how many were dropped."""
+        n = 0
+        while True:
+            try:
+                self.phrases.get_nowait()
+                n += 1
+            except queue.Empty:
+                return n
+
+    # --- capture thread ------------------------------------------------------
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                with self.source_factory() as source:
+                    self.last_error = None
+                    backoff = 0.5
+                    self._capture(source)
+            except Exception as e:
+                self.last_error = e
+                self.stats['errors'] += 1
+                _logger.exception('Audio capture failed; retrying in %.1f s', backoff)
+                if self.on_error is not None:
+                    try:
+                        self.on_error(e)
+                    except Exception:
+                        _logger.exception('Listener error callback failed')
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 10.0)
+                continue
+            if self.exhausted:
+                break
+
+    def _calibrate(self, source, seconds_per_buffer: float) -> None:
+        energies = []
+        elapsed = 0.0
+        while elapsed < self.calibration and not self._stop.is_set():
+            buf = source.stream.read(source.CHUNK)
+            if not buf:
+                break
+            if self._discarding(seconds_per_buffer):
+                continue  # calibrating on the assistant's own voice would deafen the listener
+            energies.append(rms(buf, source.SAMPLE_WIDTH))
+            elapsed += seconds_per_buffer
+        ambient = sum(energies) / len(energies) if energies else 0.0
+        self.energy_threshold = max(ambient * self.dynamic_ratio, self.min_energy)
+        _logger.debug('Calibrated energy threshold %.0f from %.1f s of audio', self.energy_threshold, elapsed)
+        self._report_threshold()
+
+    def _report_threshold(self) -> None:
+        self._since_report = 0.0
+        if self.on_threshold is not None:
+            try:
+                self.on_threshold(self.energy_threshold)
+            except Exception:
+                _logger.exception('Listener threshold callback failed')
+
+    def _adapt(self, energy: float, seconds_per_buffer: float) -> None:
+        # speech_recognition.Recognizer.listen(): exponential moving average towards energy * ratio
+        damping = self.dynamic_damping ** seconds_per_buffer
+        target = energy * self.dynamic_ratio
+        self.energy_threshold = max(self.energy_threshold * damping + target * (1 - damping), self.min_energy)
+        self._since_report += seconds_per_buffer
+        if self._since_report >= self.threshold_report_interval:
+            self._report_threshold()
+
+    def _capture(self, source) -> None:
+        seconds_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        if self.energy_threshold is None:
+            self._calibrate(source, seconds_per_buffer)
+        ring: deque = deque(maxlen=max(1, int(math.ceil(self.pre_roll / seconds_per_buffer))))
+        frames: list = []
+        silence = voiced = duration = 0.0
+        while not self._stop.is_set():
+            buf = source.stream.read(source.CHUNK)
+            if not buf:
+                self.exhausted = True
+                break
+            self.stats['buffers'] += 1
+            if self._discarding(seconds_per_buffer):
+                if self.in_speech:
+                    self.in_speech = False
+                    self.stats['discarded_paused'] += 1
+                frames = []
+                ring.clear()
+                continue
+            energy = rms(buf, source.SAMPLE_WIDTH)
+            if not self.in_speech:
+                if energy > self.energy_threshold:
+                    self.in_speech = True
+                    frames = list(ring)
+                    frames.append(buf)
+                    ring.clear()
+                    silence, voiced, duration = 0.0, seconds_per_buffer, seconds_per_buffer * len(frames)
+                else:
+                    ring.append(buf)
+                    if self.dynamic_energy:
+                        self._adapt(energy, seconds_per_buffer)
+                continue
+            frames.append(buf)
+            duration += seconds_per_buffer
+            if energy > self.energy_threshold:
+                silence = 0.0
+                voiced += seconds_per_buffer
+            else:
+                silence += seconds_per_buffer
+            if silence >= self.pause_threshold or duration >= self.phrase_time_limit:
+                self._emit(frames, voiced, source)
+                frames = []
+        if self.in_speech and frames:
+            self._emit(frames, voiced, source)
+
+    def _emit(self, frames: list, voiced: float, source) -> None:
+        self.in_speech = False
+        if voiced < self.min_phrase:
+            self.stats['discarded_short'] += 1
+            return
+        factory = self.audio_factory or sr.AudioData
+        audio = factory(b''.join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        while True:
+            try:
+                self.phrases.put_nowait(audio)
+                break
+            except queue.Full:
+                # nobody is consuming: keep the newest speech, drop the oldest
+                try:
+                    self.phrases.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+        self.stats['phrases'] += 1
@@ -1,7 +1,7 @@
 """NotificationManager: centralizes notifications for desktop, voice and logging.
 
 Simple MVP implementation:
-- loads config from ../config/notifications.json
+- loads config from ../config/notifications.json (via config_service: validated, reloaded on change)
 - notify(payload) will: check quiet hours, log, optionally show desktop notification (plyer) and optionally call speak callback
 - supports setting speak callback via set_speak_callable(fn)
 
@@ -16,23 +16,17 @@ Payload example:
 }
 """
 from __future__ import annotations
-import json
 import logging
 from pathlib import Path
 from datetime import datetime, time
 from typing import Optional, Callable
 import threading
 import uuid
-import queue
-import platform
+import os
 
-try:
-    if platform.system() == 'Windows':
-        import winsound
-    else:
-        winsound = None
-except Exception:
-    winsound = None
+import audio_output
+import config_service
+from speech_output import NOTIFICATION, SpeechOutput
 
 try:
     from plyer import notification as plyer_notify
@@ -43,15 +37,25 @@ CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config' / 'notifications
 
 _logger = logging.getLogger('io.notifications')
 _speak_callable: Optional[Callable[..., None]] = None
-_config = {
-    'desktop': True,
-    'voice': False,
-    'voice_queue': True,
-    'quiet_hours': {'start': '22:00', 'end': '07:00'},
-    'group_window_seconds': 300,
-    'levels': {'info': True, 'warning': True, 'error': True, 'reminder': True},
-    'allow_remote': False
+# notifications.json schema: key -> (accepted types, default); other keys pass through
+SCHEMA = {
+    'desktop': (bool, True),
+    'voice': (bool, False),
+    'voice_queue': (bool, True),
+    'quiet_hours': (dict, {'start': '22:00', 'end': '07:00'}),
+    'group_window_seconds': ((int, float), 300),
+    'levels': (dict, {'info': True, 'warning': True, 'error': True, 'reminder': True}),
+    'allow_remote': (bool, False),
+    'voice_options': (dict, {}),
+    'sounds': (dict, {}),
+    'sound_pack': ((str, type(None)), None),
 }
+# read-only snapshot served by the config service; replaced (never mutated) on reload
+_config = config_service.freeze(config_service.validate({}, SCHEMA)[0])
+_config_file: Optional[config_service.ConfigFile] = None
+# snapshot whose sounds were handed to the preloader (see _preload_sounds)
+_preloaded_config = None
+_preload_lock = threading.Lock()
 
 # Messages that should never produce a visible/sound notification
 _SUPPRESSED_MESSAGES = {
@@ -83,53 +87,58 @@ _PENDING: dict = {}
 # mapping: name -> callable
 _ACTION_REGISTRY: dict = {}
 
-# TTS queue and worker
-_tts_queue: 'queue.Queue[tuple[str, Optional[dict]]]' = queue.Queue()
-_tts_worker_thread: threading.Thread | None = None
-
-def _tts_worker() -> None:
-    """Worker thread that consumes TTS queue and calls the speak callable serially."""
-    while True:
-        try:
-            msg, opts = _tts_queue.get()
-        except Exception:
-            continue
+# Voice notifications. A speak callable marked `nonblocking` (io.speak) already queues on the
+# assistant's speech output worker, so messages go straight to it at NOTIFICATION priority and
+# there is one TTS consumer. A plain blocking callable is run on this module's own worker.
+def _render_voice(msg: str, opts: dict, cancelled) -> None:
+    if _speak_callable:
         try:
-            if _speak_callable:
-                try:
-                    _speak_callable(msg, **(opts or {}))
-                except TypeError:
-                    _speak_callable(msg)
-            else:
-                _logger.debug('No speak callable registered; dropping TTS message')
-        except Exception:
-            _logger.exception('Error in TTS worker while speaking')
-        finally:
-            try:
-                _tts_queue.task_done()
-            except Exception:
-                pass
+            _speak_callable(msg, **(opts or {}))
+        except TypeError:
+            _speak_callable(msg)
+    else:
+        _logger.debug('No speak callable registered; dropping TTS message')
 
-def _ensure_tts_worker_started():
-    global _tts_worker_thread
-    if _tts_worker_thread is None:
-        t = threading.Thread(target=_tts_worker, daemon=True)
-        t.start()
-        _tts_worker_thread = t
 
+_tts_output = SpeechOutput(_render_voice, name='io-notify-speech')
 
 
-def load_config():
+def _speak_voice(msg: str, opts: Optional[dict]) -> None:
+    fn = _speak_callable
+    if fn is not None and getattr(fn, 'nonblocking', False):
+        # the desktop notification for this message is shown by notify() itself
+        fn(msg, priority=NOTIFICATION, notify_desktop=False, **(opts or {}))
+    else:
+        _tts_output.say(msg, NOTIFICATION, **(opts or {}))
+
+
+
+def _validate(data) -> tuple:
+    return config_service.validate(data, SCHEMA)
+
+
+def _apply_config(snapshot) -> None:
     global _config
-    try:
-        if CONFIG_PATH.exists():
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                cfg = json.load(f)
-                # merge defaults
-                _config.update(cfg)
-                _logger.debug('Notifications config loaded: %s', _config)
-    except Exception as e:
-        _logger.exception('Failed to load notifications config: %s', e)
+    _config = snapshot
+    _logger.debug('Notifications config loaded: %s', dict(snapshot))
+
+
+def load_config():
+    """Register CONFIG_PATH with the config service (parsed once, then watched) and apply it.
+
+    notify() no longer calls this: the service's watcher reloads the file when it changes.
+    """
+    global _config_file
+    if _config_file is None or _config_file.path != Path(CONFIG_PATH):
+        _config_file = config_service.SERVICE.register('notifications', CONFIG_PATH, _validate)
+        _config_file.subscribe(_on_config_changed)
+    else:
+        _config_file.check()
+    _apply_config(_config_file.snapshot)
+
+
+def _on_config_changed(snapshot) -> None:
+    _apply_config(snapshot)
 
 
 def set_speak_callable(fn: Callable[[str], None]):
@@ -178,7 +187,6 @@ def _in_quiet_hours() -> bool:
 def notify(payload: dict) -> None:
     """Show or log a notification based on payload and config."""
     try:
-        load_config()
         title = payload.get('title', 'iO')
         message = payload.get('message', '')
         level = payload.get('level', 'info')
@@ -223,6 +231,7 @@ def notify(payload: dict) -> None:
 
         # play sound file if configured or provided
         try:
+            _preload_sounds()
             sounds_cfg = _config.get('sounds', {}) or {}
             pack = _config.get('sound_pack')
             pack_path = None
@@ -268,8 +277,7 @@ def notify(payload: dict) -> None:
             try:
                 # if queueing is enabled, enqueue; otherwise spawn a background speak
                 if _config.get('voice_queue', True):
-                    _ensure_tts_worker_started()
-                    _tts_queue.put((message, voice_opts))
+                    _speak_voice(message, voice_opts)
                 else:
                     # fallback: start a background thread for immediate speak
                     def _do_speak(msg, opts):
@@ -301,20 +309,38 @@ def notify(payload: dict) -> None:
 load_config()
 
 
-def _play_sound_async(path: str) -> None:
-    """Play a sound file asynchronously. Windows-only (winsound)."""
-    def _play(p: str):
-        try:
-            if winsound is not None:
-                # SND_FILENAME: p is filename. SND_ASYNC plays asynchronously.
-                winsound.PlaySound(p, winsound.SND_FILENAME | winsound.SND_ASYNC)
-            else:
-                _logger.debug('winsound not available; cannot play sound: %s', p)
-        except Exception:
-            _logger.exception('Exception in sound playback for %s', p)
+def _sound_paths() -> list:
+    """Configured notification sounds that exist: the pack's <level>.wav files and config 'sounds'."""
+    paths = []
+    pack = _config.get('sound_pack')
+    if pack:
+        pack_dir = Path(__file__).resolve().parent.parent / 'assets' / 'sounds' / 'packs' / str(pack)
+        paths.extend(str(pack_dir / f'{level}.wav') for level in (_config.get('levels') or {}))
+    paths.extend(str(p) for p in (_config.get('sounds') or {}).values() if p)
+    return [p for p in paths if os.path.exists(p)]
+
+
+def _preload_sounds() -> None:
+    """Decode the configured sounds in the background, once per config snapshot.
+
+    Called by notify(), not at import: the audio backend (pygame) is only
+    loaded once the assistant actually shows a notification.
+    """
+    global _preloaded_config
+    with _preload_lock:
+        if _preloaded_config is _config:
+            return
+        _preloaded_config = _config
+
+    def _load():
+        n = audio_output.default().preload(_sound_paths())
+        _logger.debug('Preloaded %d notification sounds', n)
+    threading.Thread(target=_load, name='io-sound-preload', daemon=True).start()
 
-    t = threading.Thread(target=_play, args=(path,), daemon=True)
-    t.start()
+
+def _play_sound_async(path: str) -> None:
+    """Play a sound file on the shared output's alerts channel (returns at once)."""
+    audio_output.default().play(audio_output.ALERTS, path)
 
 
 def register_action(name: str, cb: Callable) -> None:
@@ -0,0 +1,208 @@
+"""Staged speech pipeline: capture -> recognition workers -> dispatch.
+
+The voice loop used to listen, then block on recognition, then run the
+command, and only then listen again. SpeechPipeline overlaps the stages:
+
+    capture thread  --audio queue (bounded)-->  recognition worker pool
+        --reorder buffer-->  get() in the dispatching thread
+
+- phrases are numbered as they are captured and get() hands them out in
+  exactly that order, even when a later phrase is recognized first
+- the audio queue is bounded; when recognition falls behind, the capture
+  stage blocks and the listener's own queue drops its oldest phrase
+- every stage records counts, latency (mean/max) and the depth of the queue
+  in front of it; see metrics()
+- drain() forgets everything captured so far, e.g. after asking a question,
+  so the next get() is the answer
+
+The stages are plain callables (capture(timeout) -> audio or None,
+recognize(audio) -> value), so the pipeline runs the same with a microphone,
+WAV files or fakes.
+"""
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+_logger = logging.getLogger('io.pipeline')
+
+
+class Transcript:
+    """One captured phrase after recognition: `value` is what recognize() returned, or `error` what it raised."""
+
+    __slots__ = ('seq', 'value', 'error', 'captured_at', 'recognized_at')
+
+    def __init__(self, seq, value=None, error=None, captured_at=0.0, recognized_at=0.0):
+        self.seq = seq
+        self.value = value
+        self.error = error
+        self.captured_at = captured_at
+        self.recognized_at = recognized_at
+
+    def __repr__(self) -> str:
+        return f'<Transcript #{self.seq} {self.value!r} error={self.error!r}>'
+
+
+class StageStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.max_depth = 0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def depth(self, depth: int) -> None:
+        self.max_depth = max(self.max_depth, depth)
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'mean_ms': (self.total / self.count * 1000) if self.count else 0.0,
+                'max_ms': self.max * 1000, 'max_queue_depth': self.max_depth}
+
+
+class SpeechPipeline:
+    def __init__(self, capture: Callable, recognize: Callable, workers: int = 2, max_pending: int = 4,
+                 busy: Optional[Callable] = None) -> None:
+        self.capture = capture
+        self.recognize = recognize
+        self.workers = workers
+        # busy() -> True while the capture source is in the middle of a phrase
+        self.busy = busy or (lambda: False)
+        self._audio: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._done: dict = {}
+        self._cond = threading.Condition()
+        self._next_capture = 0
+        self._next_deliver = 0
+        self._stop = threading.Event()
+        self._threads: list = []
+        self.stats = {name: StageStats() for name in ('capture', 'queue_wait', 'recognize', 'reorder', 'dispatch',
+                                                      'end_to_end')}
+
+    # --- control -------------------------------------------------------------
+
+    def start(self) -> 'SpeechPipeline':
+        if self._threads:
+            return self
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._capture_loop, name='io-capture', daemon=True)]
+        self._threads += [threading.Thread(target=self._recognize_loop, name=f'io-recognize-{i}', daemon=True)
+                          for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    @property
+    def in_flight(self) -> int:
+        """Phrases captured but not yet handed out by get()."""
+        with self._cond:
+            return self._next_capture - self._next_deliver
+
+    # --- stages ----------------------------------------------------------------
+
+    def _capture_loop(self) -> None:
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                audio = self.capture(0.5)
+            except Exception:
+                _logger.exception('Capture stage failed')
+                self._stop.wait(0.5)
+                continue
+            if audio is None:
+                if time.monotonic() - start < 0.01:
+                    self._stop.wait(0.1)  # source exhausted or failing fast: do not spin
+                continue
+            now = time.perf_counter()
+            self.stats['capture'].count += 1
+            with self._cond:
+                seq = self._next_capture
+                self._next_capture += 1
+            item = (seq, now, audio)
+            while not self._stop.is_set():
+                try:
+                    self._audio.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue  # back-pressure: recognition is behind
+            self.stats['capture'].depth(self._audio.qsize())
+
+    def _recognize_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                seq, captured_at, audio = self._audio.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._cond:
+                stale = seq < self._next_deliver  # dropped by drain() while queued
+            if stale:
+                continue
+            start = time.perf_counter()
+            self.stats['queue_wait'].add(start - captured_at)
+            value = error = None
+            try:
+                value = self.recognize(audio)
+            except Exception as e:
+                error = e
+            done = time.perf_counter()
+            self.stats['recognize'].add(done - start)
+            with self._cond:
+                if seq < self._next_deliver:
+                    continue
+                self._done[seq] = Transcript(seq, value, error, captured_at, done)
+                self.stats['reorder'].depth(len(self._done))
+                self._cond.notify_all()
+
+    # --- dispatch side ---------------------------------------------------------
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Transcript]:
+        """Next transcript in capture order; None if nothing was said (or in flight) within timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                item = self._done.pop(self._next_deliver, None)
+                if item is not None:
+                    self._next_deliver += 1
+                    now = time.perf_counter()
+                    self.stats['reorder'].add(now - item.recognized_at)
+                    self.stats['end_to_end'].add(now - item.captured_at)
+                    return item
+                if self._stop.is_set():
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    # keep waiting for a phrase that is being spoken or recognized
+                    if self._next_capture == self._next_deliver and not self.busy():
+                        return None
+                    remaining = 0.1
+                self._cond.wait(min(remaining, 0.5) if remaining is not None else 0.5)
+
+    def drain(self) -> int:
+        """Forget every phrase captured so far (queued, being recognized or waiting for order); returns how many."""
+        with self._cond:
+            dropped = self._next_capture - self._next_deliver
+            self._next_deliver = self._next_capture
+            self._done.clear()
+            self._cond.notify_all()
+        return dropped
+
+    def record_dispatch(self, seconds: float) -> None:
+        self.stats['dispatch'].add(seconds)
+
+    def metrics(self) -> dict:
+        out = {name: s.summary() for name, s in self.stats.items()}
+        out['audio_queue_depth'] = self._audio.qsize()
+        out['in_flight'] = self.in_flight
+        return out
@@ -0,0 +1,141 @@
+"""Manifest-driven, lazy plugin discovery.
+
+A plugin declares static metadata as a literal dict at module level:
+
+    MANIFEST = {
+        'name': 'apps',
+        'version': '1.0',
+        'keywords': ['open', 'باز کن'],
+        # optional: take more keywords from the keys of JSON config sections
+        'keyword_files': [{'path': '../config/apps.json', 'sections': ['apps', 'aliases']}],
+    }
+
+discover() reads that dict from the source with `ast` (the module is not
+executed), so startup cost no longer includes every plugin's imports and
+config parsing. Each plugin is represented by a LazyPlugin proxy; the real
+import happens on the first query that reaches its can_handle(), and the
+time it took is recorded. Plugins without a MANIFEST still work: they have
+no keywords, so they are consulted (and therefore imported) on the first query.
+"""
+from __future__ import annotations
+import ast
+import importlib
+import json
+import logging
+import pkgutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import config_service
+
+_logger = logging.getLogger('io.plugins')
+
+
+def read_manifest(path) -> Optional[dict]:
+    """Return the MANIFEST literal of a plugin source file, or None if it has none."""
+    try:
+        source = Path(path).read_text(encoding='utf-8')
+        tree = ast.parse(source, filename=str(path))
+    except Exception:
+        _logger.exception('Could not parse plugin source %s', path)
+        return None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'MANIFEST' for t in node.targets):
+            try:
+                manifest = ast.literal_eval(node.value)
+            except ValueError:
+                _logger.warning('MANIFEST in %s is not a literal; ignoring it', path)
+                return None
+            return manifest if isinstance(manifest, dict) else None
+    return None
+
+
+def manifest_keywords(manifest: dict, base_dir) -> list:
+    """Static keywords plus the keys of any referenced JSON config sections."""
+    keywords = [str(k) for k in manifest.get('keywords', []) or []]
+    for ref in manifest.get('keyword_files', []) or []:
+        cfg_path = (Path(base_dir) / ref.get('path', '')).resolve()
+        shared = config_service.SERVICE.find(cfg_path)
+        if shared is not None:
+            data = shared.snapshot  # already parsed (and kept current) by the config service
+        else:
+            try:
+                with open(cfg_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                _logger.debug('Manifest keyword file %s not readable: %s', cfg_path, e)
+                continue
+        for section in ref.get('sections', []) or []:
+            value = data.get(section) or {}
+            if hasattr(value, 'keys'):
+                keywords.extend(str(k) for k in value.keys())
+    return keywords
+
+
+class LazyPlugin:
+    """Stands in for a plugin module until it is first needed."""
+
+    def __init__(self, name: str, path: Optional[str] = None, manifest: Optional[dict] = None) -> None:
+        self.__name__ = name
+        self.path = path
+        self.manifest = manifest
+        self.KEYWORDS = manifest_keywords(manifest, Path(path).parent) if (manifest and path) else []
+        self.import_seconds: Optional[float] = None
+        self._module = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else ('failed' if self._failed else 'pending')
+        return f'<LazyPlugin {self.__name__} {state}>'
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    @property
+    def module(self):
+        """Import the real module on first access (thread-safe, attempted once)."""
+        if self._module is None and not self._failed:
+            with self._lock:
+                if self._module is None and not self._failed:
+                    start = time.perf_counter()
+                    try:
+                        mod = importlib.import_module(self.__name__)
+                        if not (hasattr(mod, 'can_handle') and hasattr(mod, 'handle')):
+                            raise AttributeError('plugin must expose can_handle() and handle()')
+                        self._module = mod
+                    except Exception as e:
+                        self._failed = True
+                        _logger.exception('Error loading plugin %s: %s', self.__name__, e)
+                    self.import_seconds = time.perf_counter() - start
+                    _logger.debug('Imported plugin %s in %.1f ms', self.__name__, self.import_seconds * 1000)
+        return self._module
+
+    def can_handle(self, query: str) -> bool:
+        mod = self.module
+        return bool(mod is not None and mod.can_handle(query))
+
+    def handle(self, query: str):
+        mod = self.module
+        return mod.handle(query) if mod is not None else False
+
+
+def discover(pkg) -> list:
+    """Return a LazyPlugin for every module of the plugins package, without importing them."""
+    found = []
+    prefix = pkg.__name__ + '.'
+    for info in pkgutil.iter_modules(pkg.__path__, prefix=prefix):
+        path = None
+        try:
+            spec = info.module_finder.find_spec(info.name)  # type: ignore[call-arg]
+            path = spec.origin if spec is not None else None
+        except Exception:
+            path = None
+        manifest = read_manifest(path) if path and path.endswith('.py') else None
+        if manifest is None:
+            _logger.debug('Plugin %s has no MANIFEST; it will be imported on first query', info.name)
+        found.append(LazyPlugin(info.name, path, manifest))
+    return found
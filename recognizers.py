@@ -0,0 +1,329 @@
+"""Speech-to-text backends tried in order, each with a timeout and latency stats.
+
+takecommand() was hard-wired to recognize_google(): one network round-trip
+per command, and no recognition at all when the service is unreachable.
+RecognizerChain runs a configurable list of backends instead, for example a
+local Vosk model first and Google as the fallback:
+
+    chain = build_chain(['vosk', 'google'], language='fa-IR', vosk_model='models/vosk-model-small-fa')
+    text, backend = chain.recognize(audio)      # audio: sr.AudioData
+
+With a `rescorer` (rescoring.VocabularyRescorer) the chain asks each
+backend for its n-best list (recognize_all) and returns the alternative the
+rescorer picks instead of the top one.
+
+A backend that reports no speech, fails, or exceeds its timeout hands the
+audio to the next one. NoSpeech is raised when every backend heard nothing
+and BackendError when none could run. FakeBackend returns scripted
+transcripts (by audio content or in order), so the chain can be exercised
+with WAV fixtures read through sr.AudioFile and no network.
+
+The chain is configured by ../config/speech.json when present:
+    {"backends": ["vosk", "google"], "language": "fa-IR",
+     "vosk_model": "../models/vosk-model-small-fa", "timeouts": {"google": 8},
+     "wake_word": true, "awake_seconds": 8, "preprocess": true, "n_best": 5}
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Iterable, Optional
+
+from lazy_imports import lazy_import
+
+sr = lazy_import('speech_recognition')
+vosk = lazy_import('vosk')
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config' / 'speech.json'
+DEFAULT_CONFIG = {
+    'backends': ['vosk', 'google'],
+    'language': 'fa-IR',
+    'vosk_model': str(Path(__file__).resolve().parent.parent / 'models' / 'vosk-model-small-fa'),
+    'timeouts': {},
+    # wake_word.WakeWordGate in front of the chain; inactive until a spotter supports the name
+    'wake_word': True,
+    'awake_seconds': 8.0,
+    # audio_preprocess.Preprocessor between capture and the chain (needs numpy)
+    'preprocess': True,
+    # alternatives requested for rescoring (0 = top hypothesis only)
+    'n_best': 5,
+}
+
+_logger = logging.getLogger('io.speech')
+
+
+class NoSpeech(Exception):
+    """The backend(s) heard nothing intelligible (sr.UnknownValueError)."""
+
+
+class BackendError(Exception):
+    """The backend could not run: unreachable service, missing model, timeout (sr.RequestError)."""
+
+
+def audio_key(audio) -> str:
+    """Content hash of an AudioData, used to script FakeBackend answers per fixture."""
+    return hashlib.sha1(audio.get_raw_data()).hexdigest()
+
+
+class RecognizerBackend:
+    name = 'base'
+    timeout = 5.0
+
+    def available(self) -> bool:
+        return True
+
+    def recognize(self, audio) -> str:
+        raise NotImplementedError
+
+    def recognize_all(self, audio) -> list:
+        """N-best hypotheses as [(text, confidence or None), ...], best first."""
+        return [(self.recognize(audio), None)]
+
+
+class GoogleBackend(RecognizerBackend):
+    name = 'google'
+    timeout = 8.0
+
+    def __init__(self, language: str = 'fa-IR') -> None:
+        self.language = language
+        self._recognizer = None
+
+    def _recognize(self, audio, show_all: bool):
+        if self._recognizer is None:
+            self._recognizer = sr.Recognizer()
+            self._recognizer.operation_timeout = self.timeout
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language, show_all=show_all)
+        except sr.UnknownValueError as e:
+            raise NoSpeech(str(e)) from e
+        except sr.RequestError as e:
+            raise BackendError(str(e)) from e
+
+    def recognize(self, audio) -> str:
+        return self._recognize(audio, show_all=False)
+
+    def recognize_all(self, audio) -> list:
+        # show_all: the raw response, {'alternative': [{'transcript', 'confidence'?}, ...]} or [] for silence
+        result = self._recognize(audio, show_all=True)
+        alternatives = result.get('alternative', []) if isinstance(result, dict) else []
+        out = [(a['transcript'], a.get('confidence')) for a in alternatives if a.get('transcript')]
+        if not out:
+            raise NoSpeech('google heard nothing')
+        return out
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline recognition with a local Vosk model (pip install vosk, plus a model directory)."""
+
+    name = 'vosk'
+    timeout = 5.0
+    sample_rate = 16000
+
+    def __init__(self, model_path, max_alternatives: int = 5) -> None:
+        self.model_path = Path(model_path) if model_path else None
+        self.max_alternatives = max_alternatives
+        self._model = None
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Model directory present and the vosk package importable (checked once)."""
+        if self._available is None:
+            self._available = False
+            if self.model_path is not None and self.model_path.is_dir():
+                try:
+                    vosk.Model  # noqa: B018 - triggers the lazy import
+                    self._available = True
+                except ImportError:
+                    _logger.info('vosk is not installed; offline recognition disabled')
+        return self._available
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = vosk.Model(str(self.model_path))
+                    _logger.info('Loaded Vosk model %s in %.0f ms', self.model_path,
+                                 (time.perf_counter() - start) * 1000)
+        return self._model
+
+    def _decode(self, audio, alternatives: int) -> dict:
+        try:
+            recognizer = vosk.KaldiRecognizer(self._get_model(), self.sample_rate)
+            if alternatives:
+                recognizer.SetMaxAlternatives(alternatives)
+            recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+            return json.loads(recognizer.FinalResult())
+        except Exception as e:
+            raise BackendError(f'vosk: {e}') from e
+
+    def recognize(self, audio) -> str:
+        text = self._decode(audio, 0).get('text', '')
+        if not text.strip():
+            raise NoSpeech('vosk heard nothing')
+        return text
+
+    def recognize_all(self, audio) -> list:
+        if self.max_alternatives <= 1:
+            return [(self.recognize(audio), None)]
+        # Vosk's alternative confidences are unnormalized lattice scores; only their order is used
+        result = self._decode(audio, self.max_alternatives)
+        out = [(a.get('text', ''), None) for a in result.get('alternatives', []) if a.get('text', '').strip()]
+        if not out:
+            raise NoSpeech('vosk heard nothing')
+        return out
+
+
+class FakeBackend(RecognizerBackend):
+    """Deterministic backend for tests and benchmarks.
+
+    `responses` is either a dict {audio_key(audio): text} or a sequence of texts
+    returned in order. A None text means "no speech"; an Exception instance is raised.
+    A text may also be an n-best list: [text, ...] or [(text, confidence), ...].
+    """
+
+    def __init__(self, responses=(), name: str = 'fake', latency: float = 0.0, timeout: float = 5.0) -> None:
+        self.name = name
+        self.latency = latency
+        self.timeout = timeout
+        self._by_key = dict(responses) if isinstance(responses, dict) else None
+        self._script = None if isinstance(responses, dict) else deque(responses)
+        self._lock = threading.Lock()
+
+    def recognize_all(self, audio) -> list:
+        if self.latency:
+            time.sleep(self.latency)
+        if self._by_key is not None:
+            text = self._by_key.get(audio_key(audio))
+        else:
+            with self._lock:
+                text = self._script.popleft() if self._script else None
+        if isinstance(text, Exception):
+            raise text
+        if not text:
+            raise NoSpeech(f'{self.name}: no scripted transcript')
+        if isinstance(text, str):
+            return [(text, None)]
+        return [a if isinstance(a, tuple) else (a, None) for a in text]
+
+    def recognize(self, audio) -> str:
+        return self.recognize_all(audio)[0][0]
+
+
+class BackendStats:
+    """Outcome counters and recent latencies of one backend."""
+
+    def __init__(self, window: int = 200) -> None:
+        self.calls = self.ok = self.no_speech = self.errors = self.timeouts = 0
+        self.rescored = 0  # times the rescorer picked an alternative other than the first
+        self.latencies: deque = deque(maxlen=window)
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(p):
+            return lat[min(len(lat) - 1, int(round(p / 100.0 * (len(lat) - 1))))] * 1000 if lat else 0.0
+        return {
+            'calls': self.calls, 'ok': self.ok, 'no_speech': self.no_speech,
+            'errors': self.errors, 'timeouts': self.timeouts, 'rescored': self.rescored,
+            'mean_ms': (sum(lat) / len(lat) * 1000) if lat else 0.0,
+            'p50_ms': pct(50), 'p95_ms': pct(95), 'max_ms': lat[-1] * 1000 if lat else 0.0,
+        }
+
+
+class RecognizerChain:
+    def __init__(self, backends: Iterable[RecognizerBackend], rescorer=None) -> None:
+        self.backends = list(backends)
+        self.rescorer = rescorer
+        self.stats = {b.name: BackendStats() for b in self.backends}
+        # spare workers so a backend stuck past its timeout does not block the next call
+        self._pool = ThreadPoolExecutor(max_workers=2 * max(1, len(self.backends)), thread_name_prefix='io-stt')
+
+    def recognize(self, audio) -> tuple:
+        """Return (text, backend name) from the first backend that understood the audio."""
+        heard_nothing = False
+        errors = []
+        for backend in self.backends:
+            if not backend.available():
+                continue
+            stats = self.stats[backend.name]
+            stats.calls += 1
+            start = time.perf_counter()
+            call = backend.recognize if self.rescorer is None else backend.recognize_all
+            future = self._pool.submit(call, audio)
+            try:
+                text = future.result(timeout=backend.timeout)
+            except FutureTimeout:
+                # the worker cannot be interrupted; its late result is ignored
+                stats.timeouts += 1
+                errors.append(f'{backend.name}: timed out after {backend.timeout:.1f} s')
+                continue
+            except NoSpeech:
+                stats.no_speech += 1
+                heard_nothing = True
+                continue
+            except Exception as e:
+                stats.errors += 1
+                errors.append(f'{backend.name}: {e}')
+                _logger.debug('Recognizer backend %s failed: %s', backend.name, e)
+                continue
+            finally:
+                stats.latencies.append(time.perf_counter() - start)
+            stats.ok += 1
+            if self.rescorer is not None:
+                alternatives = text
+                text = self.rescorer.pick(alternatives)
+                if text != alternatives[0][0]:
+                    stats.rescored += 1
+            return text, backend.name
+        if heard_nothing:
+            raise NoSpeech('no backend understood the audio')
+        raise BackendError('; '.join(errors) or 'no recognizer backend available')
+
+    def summary(self) -> dict:
+        return {name: s.summary() for name, s in self.stats.items()}
+
+
+def build_chain(names, language: str = 'fa-IR', vosk_model=None, timeouts: Optional[dict] = None,
+                rescorer=None, n_best: int = 5) -> RecognizerChain:
+    backends = []
+    for name in names:
+        if name == 'google':
+            backend = GoogleBackend(language)
+        elif name == 'vosk':
+            backend = VoskBackend(vosk_model, max_alternatives=n_best)
+        else:
+            _logger.warning('Unknown recognizer backend %r ignored', name)
+            continue
+        if timeouts and name in timeouts:
+            backend.timeout = float(timeouts[name])
+        backends.append(backend)
+    return RecognizerChain(backends, rescorer if n_best else None)
+
+
+def load_config(path=CONFIG_PATH) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        _logger.exception('Failed to load speech config %s', path)
+    model = config.get('vosk_model')
+    if model and not Path(model).is_absolute():
+        # relative paths are relative to the config file, like plugin keyword_files
+        config['vosk_model'] = str((Path(path).parent / model).resolve())
+    return config
+
+
+def chain_from_config(path=CONFIG_PATH, rescorer=None) -> RecognizerChain:
+    config = load_config(path)
+    return build_chain(config.get('backends') or ['google'], config.get('language', 'fa-IR'),
+                       config.get('vosk_model'), config.get('timeouts'), rescorer, int(config.get('n_best') or 0))
@@ -0,0 +1,149 @@
+"""N-best rescoring of recognizer hypotheses against the command vocabulary.
+
+A transcript that is slightly off ("ساعد چنده") used to reach dispatch as
+is, match nothing, and cost the user a full listen + recognition round to
+repeat it, although the recognizer's second or third guess was often the
+right command. Backends now return their n-best list (Google show_all=True,
+Vosk alternatives) and VocabularyRescorer picks the hypothesis that best
+fits what the assistant understands:
+
+    score = 0.8 * command  +  0.2 * recognizer prior
+
+- command: 1.0 when a vocabulary phrase occurs in the hypothesis, else 0.8
+  times the best fuzzy score of one of its words against a vocabulary word
+  (0 below the fuzzy threshold); a lone word is weaker evidence than a phrase
+- prior: the recognizer's confidence; alternatives without one (Google only
+  scores its first) get the first one's confidence, decayed by rank
+
+Words outside the command phrase are not scored: they are usually the
+argument (a song name, a search query), and rewarding vocabulary coverage
+made a shorter all-vocabulary alternative beat the full command.
+
+The top hypothesis is kept whenever a command phrase occurs in it verbatim:
+its other words may be a free-text argument (a song name, a Wikipedia query)
+that a shorter all-vocabulary alternative would drop or change. Alternatives
+are only scored when the top one has no command phrase, and when none of
+them is in vocabulary the top one is kept as well, so free text is never
+replaced by a command. Prompts that expect free text (the set_name answer)
+bypass rescoring with `with RESCORER.suspended(): ...`. The vocabulary
+(SYNONYMS, APPS and aliases, SITES, plugin keywords) is read through a
+callable and recompiled whenever `version()` changes.
+"""
+from __future__ import annotations
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+from fuzzy_index import DEFAULT_THRESHOLD, FuzzyIndex
+from intent_index import IntentIndex
+from text_normalizer import normalize_query
+
+_logger = logging.getLogger('io.rescoring')
+
+_WORD = re.compile(r'\S+')
+
+WEIGHTS = (0.8, 0.2)  # command, recognizer prior
+WORD_MATCH = 0.8  # a single vocabulary word vs. a whole phrase
+
+
+class VocabularyRescorer:
+    def __init__(self, vocabulary: Callable[[], Iterable[str]], version: Optional[Callable] = None,
+                 fuzzy_threshold: float = DEFAULT_THRESHOLD, min_fuzzy_word: int = 3) -> None:
+        self.vocabulary = vocabulary
+        self.version = version or (lambda: None)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.min_fuzzy_word = min_fuzzy_word
+        self._built_for = object()
+        self._phrases: Optional[IntentIndex] = None
+        self._words: Optional[FuzzyIndex] = None
+        self._lock = threading.Lock()
+        self._suspended = 0
+        self.stats = {'picks': 0, 'rescued': 0, 'out_of_vocabulary': 0, 'alternatives': 0, 'bypassed': 0}
+
+    @contextmanager
+    def suspended(self):
+        """While inside, pick() returns the recognizer's top hypothesis (free-text answers)."""
+        with self._lock:
+            self._suspended += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._suspended -= 1
+
+    def _indexes(self) -> tuple:
+        version = self.version()
+        with self._lock:
+            if self._phrases is None or version != self._built_for:
+                phrases = IntentIndex()
+                words = FuzzyIndex(self.fuzzy_threshold)
+                n = 0
+                for phrase in self.vocabulary():
+                    phrases.add('vocab', phrase)
+                    for w in normalize_query(phrase).words:
+                        if len(w) >= self.min_fuzzy_word:
+                            words.add(w, 'vocab')
+                    n += 1
+                self._phrases, self._words = phrases.build(), words
+                self._built_for = version
+                _logger.debug('Rescoring vocabulary compiled: %d phrases', n)
+            return self._phrases, self._words
+
+    def score(self, text: str, prior: float = 1.0) -> tuple:
+        """Return (total score, command score) of one hypothesis."""
+        phrases, words = self._indexes()
+        q = normalize_query(text)
+        if phrases.match(q).get('vocab'):
+            command = 1.0
+        else:
+            command = 0.0
+            for m in _WORD.finditer(q):
+                if len(m.group()) < self.min_fuzzy_word:
+                    continue
+                best = words.best(m.group())
+                if best is not None:
+                    command = max(command, WORD_MATCH * best[0])
+        w_command, w_prior = WEIGHTS
+        return w_command * command + w_prior * prior, command
+
+    def pick(self, alternatives) -> str:
+        """Text to dispatch among [(text, confidence or None), ...] (recognizer order).
+
+        The first one if a command phrase occurs in it verbatim; otherwise the best
+        scoring in-vocabulary alternative, falling back to the first.
+        """
+        alternatives = [(t, c) for t, c in alternatives if t and t.strip()]
+        if not alternatives:
+            return ''
+        with self._lock:
+            bypass = self._suspended > 0
+            if bypass:
+                self.stats['bypassed'] += 1
+        if bypass:
+            return alternatives[0][0]
+        best = None
+        top = alternatives[0][1] if alternatives[0][1] is not None else 1.0
+        for rank, (text, confidence) in enumerate(alternatives):
+            prior = confidence if confidence is not None else top * max(0.0, 1.0 - 0.15 * rank)
+            total, command = self.score(text, prior)
+            if rank == 0 and command >= 1.0:  # a command phrase occurs in it verbatim
+                best = (total, rank, text)
+                break
+            if command <= 0.0:
+                continue
+            if best is None or total > best[0]:
+                best = (total, rank, text)
+        with self._lock:
+            self.stats['picks'] += 1
+            self.stats['alternatives'] += len(alternatives)
+            if best is None:
+                self.stats['out_of_vocabulary'] += 1
+            elif best[1] > 0:
+                self.stats['rescued'] += 1
+        if best is None:
+            return alternatives[0][0]
+        if best[1] > 0:
+            _logger.debug('Rescored %r -> %r (alternative %d)', alternatives[0][0], best[2], best[1])
+        return best[2]
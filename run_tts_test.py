@@ -36,18 +36,21 @@ if spec2.loader is None:
     raise ImportError(f"Could not create loader for {notif_path!r}")
 spec2.loader.exec_module(notif)  # type: ignore
 
-notif._config['voice'] = True
+notif._config = {**notif._config, 'voice': True}  # snapshots are read-only
 
 print('Calling speak directly (with voice options)...')
 try:
-    io_module.speak('این یک تست صدای فارسی است', rate=140, volume=0.9)
-    print('speak() completed')
+    # speak() only queues the utterance; wait for the speech worker before reporting success
+    spoken = io_module.speak('این یک تست صدای فارسی است', rate=140, volume=0.9).result(timeout=30)
+    print('speak() completed' if spoken else 'speak() was interrupted')
 except Exception as e:
     print('speak() error:', e)
 
 print('Calling notify with voice: True...')
 try:
     notif.notify({'title':'TTS Test','message':'این اعلان با TTS خوانده می‌شود','level':'info','voice':True})
+    # voice notifications are queued on the same worker
+    io_module.OUTPUT.wait(30)
     print('notify completed')
 except Exception as e:
     print('notify error:', e)
@@ -72,19 +72,13 @@ def handle(q):
 mod.can_handle = can_handle
 mod.handle = handle
 
-original_plugins = list(getattr(io_module, 'PLUGINS', []))
-io_module.PLUGINS.insert(0, mod)
+io_module.register_plugin(mod)
 try:
     q = 'please simme now'
-    handled = False
-    for m in io_module.PLUGINS:
-        if hasattr(m, 'can_handle') and m.can_handle(q):
-            r = m.handle(q)
-            handled = bool(r)
-            break
-    print('Plugin handled:', handled)
+    intent = io_module.INTENTS.dispatch(q)
+    print('Plugin handled:', intent is not None and intent.source == 'plugin')
 finally:
-    io_module.PLUGINS[:] = original_plugins
+    io_module.INTENTS.unregister('plugin:' + mod.__name__)
 
 print('\n--- simulate: list_desktop_shortcuts ---')
 try:
@@ -0,0 +1,123 @@
+"""Sentence chunking and prefetching for long spoken replies.
+
+search_wikipedia() handed the whole summary to speak() and the online path
+rendered it with one gTTS request, so the user heard nothing until the whole
+paragraph had been synthesized. Long text is now split into sentences (and
+over-long sentences into clauses), and the next chunk is synthesized on a
+worker while the current one plays:
+
+    chunks = split_sentences(text)                   # Persian and Latin punctuation
+    for chunk, data in prefetched(chunks, synthesize, cancelled):
+        play(data)                                   # chunk N plays while N+1 renders
+
+- sentence ends: . ! ? ؟ … and ؛ ; followed by a space (so "۳.۵" and
+  "www.x.ir" stay whole); line breaks end a sentence too
+- a sentence longer than `max_chars` is split after ، , : and, failing that,
+  at the last space before the limit
+- fragments shorter than `min_chars` are merged into their neighbour, so
+  "بله." does not cost a request of its own
+- once `cancelled` is set no further chunk is submitted, queued renders are
+  dropped and the generator stops; a render already in flight finishes on
+  the worker but is never played
+"""
+from __future__ import annotations
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Iterator, Optional, Sequence
+
+_logger = logging.getLogger('io.speech_chunks')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?؟…؛;])\s+|\s*\n+\s*')
+_CLAUSE_END = re.compile(r'(?<=[،,:])\s+')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='io-tts-synth')
+        return _executor
+
+
+def _wrap(text: str, max_chars: int) -> list:
+    parts = []
+    while len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        parts.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def _pack(pieces, max_chars: int, min_chars: int) -> list:
+    """Merge short pieces into the previous one while the result stays within max_chars."""
+    out = []
+    for piece in pieces:
+        if out and (len(out[-1]) < min_chars or len(piece) < min_chars) and len(out[-1]) + 1 + len(piece) <= max_chars:
+            out[-1] = f'{out[-1]} {piece}'
+        else:
+            out.append(piece)
+    return out
+
+
+def split_sentences(text, max_chars: int = 200, min_chars: int = 20) -> list:
+    """Split text into speakable chunks of at most max_chars (words longer than that are cut)."""
+    text = str(text or '').strip()
+    if not text:
+        return []
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _pack([c for c in _CLAUSE_END.split(sentence) if c.strip()], max_chars, max_chars):
+            pieces.extend(_wrap(clause.strip(), max_chars))
+    return _pack(pieces, max_chars, min_chars)
+
+
+def prefetched(chunks: Sequence[str], synthesize: Callable, cancelled: Optional[threading.Event] = None,
+               lookahead: int = 1, executor: Optional[ThreadPoolExecutor] = None,
+               poll: float = 0.02) -> Iterator[tuple]:
+    """Yield (chunk, synthesize(chunk)) in order, keeping `lookahead` renders ahead on a worker."""
+    cancelled = cancelled or threading.Event()
+    chunks = list(chunks)
+    if len(chunks) <= 1:
+        # nothing to overlap: render on the caller's thread
+        for chunk in chunks:
+            if cancelled.is_set():
+                return
+            yield chunk, synthesize(chunk)
+        return
+    executor = executor or _shared_executor()
+    pending = []
+    submitted = 0
+    try:
+        for chunk in chunks:
+            # the chunk about to play plus `lookahead` more are rendering or queued
+            while submitted < len(chunks) and len(pending) <= lookahead:
+                pending.append(executor.submit(synthesize, chunks[submitted]))
+                submitted += 1
+            future = pending.pop(0)
+            while not cancelled.is_set():
+                done, _ = wait([future], timeout=poll)
+                if done:
+                    break
+            if cancelled.is_set():
+                future.cancel()
+                return
+            yield chunk, future.result()
+    finally:
+        dropped = sum(1 for f in pending if f.cancel())
+        if dropped:
+            _logger.debug('Dropped %d queued speech renders', dropped)
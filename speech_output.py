@@ -0,0 +1,323 @@
+"""Speech output worker: one thread renders every utterance, in priority order.
+
+speak() used to synthesize and play on the caller's thread (runAndWait, or a
+get_busy() poll for online TTS), so nothing else happened while the
+assistant talked, and notification.py ran a second TTS consumer of its own.
+SpeechOutput owns the only speaking thread:
+
+    out = SpeechOutput(render, interrupt)
+    future = out.say('سلام', priority=NORMAL, lang='fa')   # returns at once
+    future.result()          # optional: wait; True = spoken, False = interrupted
+    out.cancel()             # barge-in: stop the current utterance, drop the queue
+
+- `render(text, opts, cancelled)` does the synthesis and playback on the
+  worker; it should return early once the `cancelled` event is set
+- `interrupt()` is called from the cancelling thread to cut off audio that is
+  already playing (engine.stop(), mixer stop)
+- lower priority values are spoken first; equal priorities keep call order
+
+Handlers that say several things in a row can merge them into one job (one
+synthesis, one playback start) instead of paying the per-utterance cost
+each time:
+
+    with out.batch():
+        out.say('تاریخ امروز:')
+        out.say('میلادی: ...')     # both futures resolve with the merged utterance
+
+Consecutive calls with the same priority and options are joined with
+join_texts(); the batch is queued when the outermost `with` exits.
+
+observe(on_start, on_end) links other components to the voice: the
+microphone listener pauses while an utterance plays, so the assistant does
+not record (and then obey) itself. What was said stays in a short log with
+its start/end times; is_echo() tells whether a transcript is the assistant
+hearing one of its own recent replies.
+
+stats counts queued/spoken/interrupted/dropped utterances, calls merged into
+a batch (`coalesced`) and the wait between say() and the start of rendering.
+"""
+from __future__ import annotations
+import contextlib
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from text_normalizer import normalize_query
+
+_logger = logging.getLogger('io.speech_output')
+
+URGENT = 0         # alerts, errors the user must hear now
+NORMAL = 10        # replies to the command being handled
+NOTIFICATION = 20  # voice notifications
+
+
+_SENTENCE_END = '.!?؟…:;؛،,'
+
+
+def join_texts(texts) -> str:
+    """Join utterances into one text, ending unpunctuated parts with a full stop so the voice pauses."""
+    out = ''
+    for text in texts:
+        text = str(text).strip()
+        if not text:
+            continue
+        if out:
+            out += ' ' if out[-1] in _SENTENCE_END else '. '
+        out += text
+    return out
+
+
+def _chain(source: Future, targets) -> None:
+    """Resolve every target future like source."""
+    def copy(done: Future) -> None:
+        for target in targets:
+            if done.cancelled():
+                target.cancel()
+            elif not target.done():
+                error = done.exception()
+                if error is not None:
+                    target.set_exception(error)
+                else:
+                    target.set_result(done.result())
+    source.add_done_callback(copy)
+
+
+def completed(result=False) -> Future:
+    """An already-resolved Future, for speech that was filtered out instead of queued."""
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+class Utterance:
+    __slots__ = ('text', 'opts', 'priority', 'future', 'cancelled', 'queued_at')
+
+    def __init__(self, text, opts, priority) -> None:
+        self.text = text
+        self.opts = opts
+        self.priority = priority
+        self.future: Future = Future()
+        self.cancelled = threading.Event()
+        self.queued_at = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return f'<Utterance p={self.priority} {str(self.text)[:30]!r}>'
+
+
+class SpeechOutput:
+    def __init__(self, render: Callable, interrupt: Optional[Callable] = None, name: str = 'io-speech') -> None:
+        self.render = render
+        self.interrupt = interrupt
+        self.name = name
+        # (priority, seq, utterance) heap; popping it and setting _current happen under
+        # _lock, so cancel() always sees an utterance either queued or current
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._current: Optional[Utterance] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._ready = threading.Condition(self._lock)
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._batch = threading.local()
+        self._observers: list = []
+        # [text, started, ended] of the last utterances rendered (time.perf_counter(); ended None while speaking)
+        self._recent: deque = deque(maxlen=16)
+        self.stats = {'queued': 0, 'spoken': 0, 'interrupted': 0, 'dropped': 0, 'failed': 0,
+                      'coalesced': 0, 'max_queue_depth': 0, 'wait_seconds': 0.0}
+
+    # --- producer side ---------------------------------------------------------
+
+    def start(self) -> 'SpeechOutput':
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def say(self, text, priority: int = NORMAL, **opts) -> Future:
+        """Queue text for speaking; returns a Future resolved when it has been spoken (or interrupted)."""
+        pending = getattr(self._batch, 'items', None)
+        if pending is not None:
+            future: Future = Future()
+            pending.append((text, priority, opts, future))
+            return future
+        item = Utterance(text, opts, priority)
+        with self._lock:
+            self._pending += 1
+            self.stats['queued'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._pending)
+            heapq.heappush(self._queue, (priority, next(self._seq), item))
+            self._ready.notify()
+        self.start()
+        return item.future
+
+    @property
+    def batching(self) -> bool:
+        """True inside batch() on the calling thread."""
+        return getattr(self._batch, 'items', None) is not None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Collect this thread's say() calls and queue consecutive compatible ones as one utterance."""
+        outer = not self.batching
+        if outer:
+            self._batch.items = []
+        try:
+            yield self
+        finally:
+            if outer:
+                items, self._batch.items = self._batch.items, None
+                self._flush(items)
+
+    def _flush(self, items) -> None:
+        groups: list = []
+        for text, priority, opts, future in items:
+            if future.cancelled():
+                continue
+            if groups and groups[-1][0] == priority and groups[-1][1] == opts:
+                groups[-1][2].append(text)
+                groups[-1][3].append(future)
+            else:
+                groups.append((priority, opts, [text], [future]))
+        for priority, opts, texts, futures in groups:
+            with self._lock:
+                self.stats['coalesced'] += len(texts) - 1
+            text = texts[0] if len(texts) == 1 else join_texts(texts)
+            _chain(self.say(text, priority, **opts), futures)
+
+    def cancel(self, pending: bool = True) -> int:
+        """Interrupt the current utterance and, with pending=True, drop everything queued. Returns the count stopped."""
+        with self._lock:
+            queued = [item for _prio, _seq, item in self._queue] if pending else []
+            if pending:
+                self._queue.clear()
+                self._pending -= len(queued)
+                self.stats['dropped'] += len(queued)
+                self._idle.notify_all()
+            current = self._current
+        for item in queued:
+            item.future.cancel()
+        dropped = len(queued)
+        if current is not None and not current.cancelled.is_set():
+            current.cancelled.set()
+            dropped += 1
+            if self.interrupt is not None:
+                try:
+                    self.interrupt()
+                except Exception:
+                    _logger.exception('Interrupting speech failed')
+        return dropped
+
+    def observe(self, on_start: Callable, on_end: Callable) -> None:
+        """Call on_start(utterance) / on_end(utterance) around every utterance the worker takes.
+
+        on_start runs at once if something is being spoken already. Both run under the
+        output lock: keep them short and do not call back into this SpeechOutput.
+        """
+        with self._lock:
+            self._observers.append((on_start, on_end))
+            if self._current is not None:
+                self._notify(0, self._current)
+
+    def _notify(self, which: int, item: Utterance) -> None:
+        # called with _lock held
+        for hooks in self._observers:
+            try:
+                hooks[which](item)
+            except Exception:
+                _logger.exception('Speech output observer failed')
+
+    def is_echo(self, text, heard_at: float, window: float = 2.0, overlap: float = 0.75) -> bool:
+        """True if text, captured at perf_counter() time heard_at, repeats an utterance spoken around then.
+
+        Candidates started before heard_at and were still playing at most `window` seconds
+        earlier. text is an echo of one when at least `overlap` of its words were said, or
+        when it holds `overlap` of the words said (numbers aside: recognizers spell them out).
+        """
+        words = normalize_query(text).words
+        if not words:
+            return False
+        heard = set(words)
+        with self._lock:
+            candidates = [spoken for spoken, started, ended in self._recent
+                          if started <= heard_at and (ended is None or ended >= heard_at - window)]
+        for spoken in candidates:
+            said = normalize_query(spoken).words
+            vocabulary = set(said)
+            required = [w for w in said if not w.isdigit()]
+            if sum(w in vocabulary for w in words) >= overlap * len(words):
+                return True
+            if required and sum(w in heard for w in required) >= overlap * len(required):
+                return True
+        return False
+
+    @property
+    def speaking(self) -> bool:
+        with self._lock:
+            return self._current is not None
+
+    @property
+    def current_text(self) -> Optional[str]:
+        with self._lock:
+            return None if self._current is None else str(self._current.text)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has been spoken; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    # --- worker ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                _prio, _seq, item = heapq.heappop(self._queue)
+                self._current = item
+                self._notify(0, item)
+                self.stats['wait_seconds'] += time.perf_counter() - item.queued_at
+            if not item.future.set_running_or_notify_cancel():
+                # the caller cancelled the future while it was queued
+                with self._lock:
+                    self._current = None
+                    self._notify(1, item)
+                    self._pending -= 1
+                    self.stats['dropped'] += 1
+                    self._idle.notify_all()
+                continue
+            spoken = [str(item.text), time.perf_counter(), None]
+            with self._lock:
+                self._recent.append(spoken)
+            try:
+                if not item.cancelled.is_set():  # cancel() may have landed since the pop
+                    self.render(item.text, item.opts, item.cancelled)
+            except Exception as e:
+                _logger.exception('Speech output failed for %r', item)
+                with self._lock:
+                    self.stats['failed'] += 1
+                item.future.set_exception(e)
+            else:
+                interrupted = item.cancelled.is_set()
+                with self._lock:
+                    self.stats['interrupted' if interrupted else 'spoken'] += 1
+                item.future.set_result(not interrupted)
+            finally:
+                with self._lock:
+                    spoken[2] = time.perf_counter()
+                    self._current = None
+                    self._notify(1, item)
+                    self._pending -= 1
+                    self._idle.notify_all()
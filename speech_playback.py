@@ -0,0 +1,203 @@
+"""In-memory playback of synthesized speech.
+
+Online TTS wrote every render to a temp mp3 (tempfile.mkstemp), loaded the
+file into pygame.mixer.music, slept in 50 ms steps until get_busy() turned
+false and then deleted it: a disk write and read before the first sound and
+up to a poll tick of dead air after the last one. The synthesizer now hands
+its buffer straight to the mixer:
+
+    buf = SpeechBuffer(mp3_bytes, 'mp3')           # or SpeechBuffer.pcm(frames, 22050)
+    PLAYER.play(buf, cancelled)                     # returns when done or cancelled
+    PLAYER.stop()                                   # from another thread (barge-in)
+
+- encoded audio (mp3/ogg/wav) is given to mixer.music.load() as a BytesIO
+  over the same bytes object (CPython shares the buffer until it is written)
+- pre-decoded PCM becomes a mixer.Sound over a memoryview of the frames and
+  plays on its own channel, so nothing is decoded at play time (when the
+  mixer runs at another rate the frames are wrapped as WAV instead)
+- waiting is cancelled.wait(poll) rather than sleep(), so a cancel stops the
+  wait at once
+
+MixerPlayer drives pygame.mixer directly; ChannelPlayer plays the same
+buffers on the speech channel of an audio_output.AudioOutput, where music is
+ducked underneath instead of being stopped.
+
+stats records time to first sound (handoff to play()) per utterance.
+"""
+from __future__ import annotations
+import io
+import logging
+import threading
+import time
+import wave
+from typing import Callable, Optional
+
+from lazy_imports import lazy_import
+
+pygame = lazy_import('pygame')
+
+_logger = logging.getLogger('io.speech_playback')
+
+class SpeechBuffer:
+    __slots__ = ('data', 'format', 'rate', 'channels', 'width')
+
+    def __init__(self, data, format: str = 'mp3', rate: int = 0, channels: int = 1, width: int = 2) -> None:
+        self.data = data
+        self.format = format
+        self.rate = rate
+        self.channels = channels
+        self.width = width
+
+    @classmethod
+    def pcm(cls, frames, rate: int, channels: int = 1, width: int = 2) -> 'SpeechBuffer':
+        """Raw little-endian PCM frames (bytes, bytearray, memoryview or a NumPy array)."""
+        return cls(frames, 'pcm', rate, channels, width)
+
+    def stream(self) -> io.BytesIO:
+        """A file-like view of encoded audio for mixer.music.load()."""
+        data = self.data
+        if not isinstance(data, bytes):
+            data = bytes(data)  # BytesIO only shares immutable bytes
+        return io.BytesIO(data)
+
+    def __len__(self) -> int:
+        return memoryview(self.data).nbytes
+
+    def __repr__(self) -> str:
+        return f'<SpeechBuffer {self.format} {len(self)} bytes>'
+
+
+class MixerPlayer:
+    def __init__(self, mixer: Optional[Callable] = None, poll: float = 0.02) -> None:
+        self._mixer = mixer or (lambda: pygame.mixer)
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._channel = None  # channel of the Sound playing, or None for mixer.music
+        self._playing = False
+        self.stats = {'played': 0, 'stopped': 0, 'failed': 0, 'first_sound_seconds': 0.0}
+
+    @property
+    def playing(self) -> bool:
+        return self._playing
+
+    def _ready(self, buffer: SpeechBuffer):
+        mixer = self._mixer()
+        if not mixer.get_init():
+            if buffer.format == 'pcm':
+                mixer.init(frequency=buffer.rate, size=-8 * buffer.width, channels=buffer.channels)
+            else:
+                mixer.init()
+        return mixer
+
+    @staticmethod
+    def _wav(buffer: SpeechBuffer) -> SpeechBuffer:
+        """PCM in a WAV container, for a mixer opened at another format (music.load resamples it)."""
+        out = io.BytesIO()
+        with wave.open(out, 'wb') as w:
+            w.setnchannels(buffer.channels)
+            w.setsampwidth(buffer.width)
+            w.setframerate(buffer.rate)
+            w.writeframes(memoryview(buffer.data).cast('B'))
+        return SpeechBuffer(out.getvalue(), 'wav')
+
+    def play(self, buffer: SpeechBuffer, cancelled: Optional[threading.Event] = None, started: Optional[float] = None) -> bool:
+        """Play buffer to the end; False when cancelled. `started` (perf_counter) dates the request for stats."""
+        cancelled = cancelled or threading.Event()
+        started = time.perf_counter() if started is None else started
+        if cancelled.is_set():
+            return False
+        mixer = self._ready(buffer)
+        if buffer.format == 'pcm' and tuple(mixer.get_init()) != (buffer.rate, -8 * buffer.width, buffer.channels):
+            buffer = self._wav(buffer)
+        try:
+            if buffer.format == 'pcm':
+                sound = mixer.Sound(buffer=memoryview(buffer.data).cast('B'))
+                with self._lock:
+                    self._channel = sound.play()
+                    self._playing = True
+                busy = self._channel.get_busy if self._channel is not None else (lambda: False)
+            else:
+                mixer.music.load(buffer.stream(), buffer.format)
+                with self._lock:
+                    self._channel = None
+                    self._playing = True
+                mixer.music.play()
+                busy = mixer.music.get_busy
+        except Exception:
+            with self._lock:
+                self._playing = False
+                self.stats['failed'] += 1
+            raise
+        with self._lock:
+            self.stats['first_sound_seconds'] += time.perf_counter() - started
+        try:
+            while busy() and not cancelled.wait(self.poll):
+                pass
+        finally:
+            with self._lock:
+                self._playing = False
+                self._channel = None
+                self.stats['stopped' if cancelled.is_set() else 'played'] += 1
+        return not cancelled.is_set()
+
+    def stop(self) -> None:
+        """Stop the speech being played (no-op when idle)."""
+        with self._lock:
+            if not self._playing:
+                return
+            channel = self._channel
+        try:
+            if channel is not None:
+                channel.stop()
+            else:
+                self._mixer().music.stop()
+        except Exception:
+            _logger.exception('Stopping speech playback failed')
+
+
+class ChannelPlayer:
+    """MixerPlayer's interface on an AudioOutput channel (speech by default)."""
+
+    def __init__(self, output, channel: str = 'speech', poll: float = 0.02) -> None:
+        self.output = output
+        self.channel = channel
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._playback = None
+        self.stats = {'played': 0, 'stopped': 0, 'failed': 0, 'first_sound_seconds': 0.0}
+
+    @property
+    def playing(self) -> bool:
+        playback = self._playback
+        return playback is not None and playback.playing
+
+    def play(self, buffer: SpeechBuffer, cancelled: Optional[threading.Event] = None, started: Optional[float] = None) -> bool:
+        """Play buffer to the end; False when cancelled."""
+        cancelled = cancelled or threading.Event()
+        started = time.perf_counter() if started is None else started
+        if cancelled.is_set():
+            return False
+        try:
+            playback = self.output.play(self.channel, buffer)
+        except Exception:
+            with self._lock:
+                self.stats['failed'] += 1
+            raise
+        with self._lock:
+            self._playback = playback
+            self.stats['first_sound_seconds'] += time.perf_counter() - started
+        try:
+            while not playback.done.is_set() and not cancelled.wait(self.poll):
+                pass
+        finally:
+            if cancelled.is_set():
+                playback.stop()
+            with self._lock:
+                self._playback = None
+                self.stats['stopped' if cancelled.is_set() else 'played'] += 1
+        return not cancelled.is_set()
+
+    def stop(self) -> None:
+        playback = self._playback
+        if playback is not None:
+            playback.stop()
@@ -0,0 +1,77 @@
+# Tests for which queries the app launcher claims (apps_plugin.can_handle / handle)
+# Run: python -m pytest test_apps_plugin.py  (or python test_apps_plugin.py)
+import os
+import sys
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import apps_plugin
+
+APPS = {'apps': {'vscode': ['code.exe'], 'steam': ['steam.exe'], 'notepad': ['notepad.exe']},
+        'aliases': {'استیم': 'steam', 'وی اس کد': 'vscode', 'نوت پد': 'notepad'}}
+
+
+class Config:
+    """Swap in a known apps.json snapshot; restore the real one on exit."""
+
+    def __enter__(self):
+        apps_plugin._rebuild(APPS)
+        return apps_plugin
+
+    def __exit__(self, *exc):
+        apps_plugin._rebuild()
+
+
+def test_exact_names_and_aliases_are_claimed():
+    with Config() as plugin:
+        assert plugin.can_handle('vscode')
+        assert plugin.can_handle('استیم رو باز کن')
+        assert plugin.can_handle('نوت‌پد')  # ZWNJ folds to a space
+
+
+def test_verbs_match_whole_words_only():
+    with Config() as plugin:
+        # 'باز' inside 'بازی'/'بازار' and 'run' inside 'running' are not launch verbs
+        assert not plugin.can_handle('بازی کنیم')
+        assert not plugin.can_handle('بازار چطوره')
+        assert not plugin.can_handle('running late')
+        # ...so a near-miss app name next to them is not claimed either
+        assert not plugin.can_handle('running steem')
+        assert not plugin.can_handle('بازی استیمم')
+
+
+def test_misheard_names_need_a_launch_verb():
+    with Config() as plugin:
+        assert plugin.can_handle('open vscod')
+        assert plugin.can_handle('اجرای استیمم')
+        assert plugin.can_handle('استیمم رو باز کن')  # Persian order: name, then verb
+        assert not plugin.can_handle('vscod')
+
+
+def test_only_the_verb_object_is_fuzzy_matched():
+    with Config() as plugin:
+        assert plugin._verb_object('open the door please') == 'the door please'
+        assert plugin._verb_object('پنجره رو باز کن') == 'پنجره'
+        assert plugin._verb_object('صدا کم کن') is None
+        # other words of the query are never matched against app names
+        assert not plugin.can_handle('پنجره رو باز کن')
+        assert not plugin.can_handle('steem رو ببند')
+
+
+def test_handle_launches_the_resolved_app():
+    with Config() as plugin:
+        with mock.patch.object(plugin.os.path, 'exists', lambda p: p == 'steam.exe'), \
+                mock.patch.object(plugin, '_try_launch', return_value=(True, '')) as launch:
+            assert plugin.handle('اجرای استیمم') == {'handled': True, 'candidate': 'steam.exe'}
+            launch.assert_called_once_with('steam.exe')
+            assert plugin.handle('بازی کنیم') is False
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,146 @@
+# Tests for microphone selection and its persisted state (audio_devices.DeviceManager)
+# Run: python -m pytest test_audio_devices.py  (or python test_audio_devices.py)
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from audio_devices import DeviceManager, choose_microphone
+
+
+class Devices:
+    """Injectable device list and opener; `broken` indexes fail to open."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.broken = set()
+        self.opened = []
+
+    def list(self):
+        return list(self.names)
+
+    def open(self, index):
+        if index in self.broken:
+            raise OSError(f'device {index} unavailable')
+        self.opened.append(index)
+        return f'<source {index}>'
+
+
+class Workdir:
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix='io_test_devices_')
+        return os.path.join(self.root, 'audio_device.json')
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def manager(state_path, devices):
+    return DeviceManager(state_path=state_path, list_devices=devices.list, opener=devices.open)
+
+
+def test_choose_microphone_skips_loopback():
+    assert choose_microphone(['Stereo Mix (Realtek)', 'Microphone Array', 'USB Mic']) == 1
+    assert choose_microphone(['Speakers Loopback', 'Headset Mic']) == 1
+    assert choose_microphone(['Line In']) == 0  # the only device
+    assert choose_microphone(['Stereo Mix', 'Line In']) is None  # system default
+    assert choose_microphone([]) is None
+
+
+def test_enumerates_once_and_reuses_the_selection():
+    with Workdir() as state:
+        devices = Devices(['Stereo Mix', 'USB Microphone'])
+        dm = manager(state, devices)
+        assert dm.select() == (1, 'USB Microphone')
+        assert dm.open() == '<source 1>'
+        dm.open()
+        assert dm.enumerations == 1
+        with open(state, encoding='utf-8') as f:
+            assert json.load(f)['name'] == 'USB Microphone'
+
+
+def test_stored_choice_survives_restart_while_devices_match():
+    with Workdir() as state:
+        devices = Devices(['Stereo Mix', 'USB Microphone', 'Webcam Mic'])
+        dm = manager(state, devices)
+        dm.select()
+        dm.save_threshold(420.0)
+        # the user's stored choice is kept even though the heuristic would pick another one
+        with open(state, encoding='utf-8') as f:
+            saved = json.load(f)
+        saved.update(index=2, name='Webcam Mic')
+        with open(state, 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+        again = manager(state, devices)
+        assert again.select() == (2, 'Webcam Mic')
+        assert again.energy_threshold == 420.0
+
+
+def test_changed_device_list_selects_again_and_drops_calibration():
+    with Workdir() as state:
+        dm = manager(state, Devices(['Stereo Mix', 'USB Microphone']))
+        dm.select()
+        dm.save_threshold(420.0)
+        replugged = manager(state, Devices(['Headset Microphone', 'Stereo Mix', 'USB Microphone']))
+        assert replugged.select() == (0, 'Headset Microphone')
+        assert replugged.energy_threshold is None
+
+
+def test_open_failure_re_enumerates_and_falls_back():
+    with Workdir() as state:
+        devices = Devices(['Stereo Mix', 'USB Microphone'])
+        dm = manager(state, devices)
+        assert dm.open() == '<source 1>'
+        # the USB microphone is unplugged: opening fails once, then the new list is used
+        devices.broken.add(1)
+        devices.names = ['Stereo Mix', 'Built-in Microphone']
+        try:
+            dm.open()
+        except OSError:
+            pass
+        else:
+            raise AssertionError('open() should re-raise the failure')
+        devices.broken.clear()
+        assert dm.open() == '<source 1>'
+        assert dm.select() == (1, 'Built-in Microphone')
+        assert dm.enumerations == 2
+
+
+def test_unreadable_state_is_ignored():
+    with Workdir() as state:
+        with open(state, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        dm = manager(state, Devices(['USB Microphone']))
+        assert dm.select() == (0, 'USB Microphone')
+
+
+def test_listing_failure_uses_system_default():
+    with Workdir() as state:
+        def fail():
+            raise OSError('PortAudio not initialized')
+        dm = DeviceManager(state_path=state, list_devices=fail, opener=lambda index: index)
+        assert dm.select() == (None, None)
+        assert dm.open() is None
+
+
+def test_threshold_is_saved_only_when_it_moves():
+    with Workdir() as state:
+        dm = manager(state, Devices(['USB Microphone']))
+        dm.select()
+        dm.save_threshold(400.0)
+        dm.save_threshold(420.0)  # within 10%: not written
+        assert dm.energy_threshold == 400.0
+        dm.save_threshold(600.0)
+        assert manager(state, Devices(['USB Microphone'])).energy_threshold == 600.0
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
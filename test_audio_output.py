@@ -0,0 +1,166 @@
+# Tests for the shared audio output (audio_output.AudioOutput) with a NullSink and fake pygame music
+# Run: python -m pytest test_audio_output.py  (or python test_audio_output.py)
+import os
+import sys
+import time
+import types
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import numpy as np
+
+import audio_output
+from audio_output import ALERTS, MUSIC, SPEECH, AudioOutput, NullSink, Sound
+
+
+class FakeMusic:
+    """pygame.mixer.music stand-in: 'plays' for `seconds` of wall time."""
+
+    def __init__(self, seconds=0.3):
+        self.seconds = seconds
+        self.loaded = None
+        self.volumes = []
+        self.calls = []
+        self._end = None
+        self._paused_at = None
+
+    def load(self, path):
+        self.loaded = path
+        self.calls.append('load')
+
+    def play(self):
+        self._end = time.monotonic() + self.seconds
+        self.calls.append('play')
+
+    def get_busy(self):
+        return self._paused_at is None and self._end is not None and time.monotonic() < self._end
+
+    def pause(self):
+        self._paused_at = time.monotonic()
+        self.calls.append('pause')
+
+    def unpause(self):
+        self._end += time.monotonic() - self._paused_at
+        self._paused_at = None
+        self.calls.append('unpause')
+
+    def stop(self):
+        self._end = None
+        self.calls.append('stop')
+
+    def set_volume(self, volume):
+        self.volumes.append(volume)
+
+
+def fake_pygame(music):
+    mixer = types.SimpleNamespace(music=music, get_init=lambda: (22050, -16, 2), init=lambda **kw: None)
+    return types.SimpleNamespace(mixer=mixer)
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def tone(seconds, rate=audio_output.RATE):
+    t = np.arange(int(seconds * rate), dtype=np.float32) / rate
+    x = 0.2 * np.sin(2 * np.pi * 440 * t)
+    return Sound(np.stack([x, x], axis=1), rate, 'tone')
+
+
+def make_output():
+    return AudioOutput(NullSink(realtime=True))
+
+
+def no_ffmpeg(music):
+    """Patch audio_output as on a Windows machine without ffmpeg, with `music` as pygame.mixer.music."""
+    return mock.patch.multiple(audio_output, pygame=fake_pygame(music),
+                               shutil=types.SimpleNamespace(which=lambda name: None))
+
+
+def test_song_without_ffmpeg_is_streamed_not_decoded():
+    music = FakeMusic(seconds=0.3)
+    out = make_output()
+    try:
+        with no_ffmpeg(music), mock.patch.object(audio_output, 'decode', side_effect=AssertionError('decoded')):
+            started = time.perf_counter()
+            playback = out.play(MUSIC, 'song.mp3')
+            assert time.perf_counter() - started < 0.05  # the caller is not held up by decoding
+            assert music.loaded == 'song.mp3' and music.calls == ['load', 'play']
+            assert out.busy(MUSIC)
+            assert playback.wait(2)
+            assert not playback.stopped
+            assert not out.busy(MUSIC)
+    finally:
+        out.close()
+
+
+def test_streamed_song_pauses_stops_and_ducks():
+    music = FakeMusic(seconds=5.0)
+    out = make_output()
+    try:
+        with no_ffmpeg(music):
+            playback = out.play(MUSIC, 'song.ogg')
+            assert wait_until(lambda: music.volumes and music.volumes[-1] == 1.0)
+            out.pause(MUSIC)
+            time.sleep(0.05)
+            assert playback.playing and 'pause' in music.calls
+            out.resume(MUSIC)
+            assert 'unpause' in music.calls
+            with out.ducked():
+                assert wait_until(lambda: music.volumes[-1] == out.duck_gain)
+            assert wait_until(lambda: music.volumes[-1] == 1.0)
+            out.stop(MUSIC)
+            assert playback.wait(1) and playback.stopped
+            assert music.calls[-1] == 'stop'
+    finally:
+        out.close()
+
+
+def test_new_song_replaces_current_one():
+    out = make_output()
+    try:
+        first = out.play(MUSIC, tone(2.0))
+        second = out.play(MUSIC, tone(2.0))
+        assert first.wait(1) and first.stopped
+        assert second.playing
+    finally:
+        out.close()
+
+
+def test_speech_and_alerts_overlap_and_finish():
+    out = make_output()
+    try:
+        speech = out.play(SPEECH, tone(0.1))
+        chime = out.play(ALERTS, tone(0.05))
+        assert chime.wait(2) and speech.wait(2)
+        assert not speech.stopped and not chime.stopped
+        assert out.stats['voices'] == 2
+    finally:
+        out.close()
+
+
+def test_speech_ducks_music():
+    out = make_output()
+    try:
+        out.play(MUSIC, tone(3.0))
+        speech = out.play(SPEECH, tone(0.3))
+        assert wait_until(lambda: out._duck == out.duck_gain)
+        assert speech.wait(2)
+        assert wait_until(lambda: out._duck == 1.0)
+    finally:
+        out.close()
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
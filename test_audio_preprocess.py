@@ -0,0 +1,136 @@
+# Tests for the trim / gate / normalize / resample pass before recognition (audio_preprocess.Preprocessor)
+# Run: python -m pytest test_audio_preprocess.py  (or python test_audio_preprocess.py)
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from audio_preprocess import Preprocessor, decode, encode, frame_db, resample
+
+
+class Audio:
+    """The sr.AudioData fields the preprocessor reads and builds."""
+
+    def __init__(self, frame_data, sample_rate, sample_width):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    @property
+    def seconds(self):
+        return len(self.frame_data) / float(self.sample_rate * self.sample_width)
+
+
+def tone(seconds, rate, level, freq=440.0):
+    t = np.arange(int(seconds * rate)) / float(rate)
+    return (level * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(seconds, rate, level, seed=0):
+    return (np.random.RandomState(seed).uniform(-level, level, int(seconds * rate))).astype(np.float32)
+
+
+def captured(rate=48000, before=0.5, speech=0.6, after=0.8, level=0.1, hiss=0.002):
+    """A listener-shaped phrase: pre-roll, a quiet tone "command", a trailing pause, background hiss."""
+    x = np.concatenate([np.zeros(int(before * rate), np.float32), tone(speech, rate, level),
+                        np.zeros(int(after * rate), np.float32)])
+    x = x + noise(len(x) / float(rate), rate, hiss)[:len(x)]
+    return Audio(encode(x), rate, 2)
+
+
+def preprocessor(**kwargs):
+    return Preprocessor(audio_factory=Audio, **kwargs)
+
+
+def test_decode_encode_round_trip():
+    x = np.array([0.0, 0.5, -0.5, 0.25, -1.0], dtype=np.float32)
+    assert np.allclose(decode(encode(x), 2), x, atol=1e-4)
+    # 8-bit unsigned, 24-bit and 32-bit PCM decode to the same scale
+    assert np.allclose(decode(bytes([128, 192, 64]), 1), [0.0, 0.5, -0.5])
+    assert np.allclose(decode((1 << 22).to_bytes(3, 'little') + ((1 << 24) - (1 << 22)).to_bytes(3, 'little'), 3),
+                       [0.5, -0.5])
+    assert np.allclose(decode(np.array([1 << 30, -(1 << 30)], '<i4').tobytes(), 4), [0.5, -0.5])
+    # stereo is mixed down to mono
+    assert np.allclose(decode(encode(np.array([0.5, 0.0, -0.5, -0.5], np.float32)), 2, channels=2), [0.25, -0.5],
+                       atol=1e-4)
+    try:
+        decode(b'\0' * 5, 5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError for 5-byte samples')
+
+
+def test_resample_keeps_pitch_and_duration():
+    x = tone(1.0, 48000, 0.5)
+    y = resample(x, 48000, 16000)
+    assert len(y) == 16000 and y.dtype == np.float32
+    crossings = np.count_nonzero(np.diff(np.signbit(y)))
+    assert abs(crossings - 880) <= 4  # still 440 Hz
+    assert resample(x, 16000, 16000) is x
+
+
+def test_frame_levels():
+    x = np.concatenate([np.zeros(320, np.float32), np.full(320, 0.5, np.float32), np.full(100, 0.5, np.float32)])
+    levels = frame_db(x, 320)
+    assert len(levels) == 3
+    assert levels[0] < -90 and abs(levels[1] - 20 * np.log10(0.5)) < 0.01
+    assert levels[2] < levels[1]  # the partial frame is padded with zeros
+
+
+def test_phrase_is_trimmed_normalized_and_resampled():
+    pre = preprocessor()
+    audio = captured()
+    out = pre.process(audio)
+    assert out.sample_rate == 16000 and out.sample_width == 2
+    # the 0.6 s command plus `pad` on each side survives; pre-roll and pause are gone
+    assert abs(out.seconds - (0.6 + 2 * pre.pad)) < 0.05
+    y = decode(out.frame_data, 2)
+    assert abs(20 * np.log10(np.abs(y).max()) - pre.target_dbfs) < 0.1
+    # hiss in the padding is gated well below the command
+    head = y[:int(0.1 * 16000)]
+    assert 20 * np.log10(np.abs(head).max() / np.abs(y).max()) < -40
+    st = pre.summary()
+    assert st['phrases'] == 1 and st['bytes_out'] == len(out.frame_data)
+    assert st['bytes_ratio'] < 0.2  # 1.9 s at 48 kHz -> 0.9 s at 16 kHz
+
+
+def test_boost_is_capped():
+    pre = preprocessor(max_gain_db=20.0)
+    out = pre.process(captured(level=0.005, hiss=0.0))
+    peak_db = 20 * np.log10(np.abs(decode(out.frame_data, 2)).max())
+    assert abs(peak_db - (20 * np.log10(0.005) + 20.0)) < 0.5  # short of target_dbfs
+
+
+def test_silence_and_empty_audio_do_not_fail():
+    pre = preprocessor()
+    assert pre.process(Audio(b'', 48000, 2)).frame_data == b''
+    quiet = pre.process(Audio(b'\0' * 48000 * 2, 48000, 2))
+    assert quiet.sample_rate == 16000 and not np.any(decode(quiet.frame_data, 2))
+
+
+def test_without_numpy_audio_passes_through():
+    pre = preprocessor()
+    pre._available = False  # as if the lazy numpy import had failed
+    audio = captured()
+    assert pre.process(audio) is audio
+    st = pre.summary()
+    assert st['passed_through'] == 1 and st['bytes_in'] == 0 and st['mean_process_ms'] == 0.0
+
+
+def test_wrap_hands_the_recognizer_processed_audio():
+    seen = []
+    recognize = preprocessor().wrap(lambda audio: seen.append(audio) or 'ساعت')
+    assert recognize(captured()) == 'ساعت'
+    assert seen[0].sample_rate == 16000
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
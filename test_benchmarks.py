@@ -0,0 +1,68 @@
+# Tests for the benchmark harness itself: the JSON results document and the regression check
+# Run: python -m pytest test_benchmarks.py  (or python test_benchmarks.py)
+import contextlib
+import io
+import json
+import os
+import sys
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import benchmarks
+
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        result = fn(*args)
+    return result, out.getvalue()
+
+
+def doc(commit, **results):
+    return {'commit': commit, 'results': results}
+
+
+def test_slower_timings_count_as_regressions():
+    base = doc('a', notify={'dispatch_us': 10.0, 'index_us@64': 2.0, 'calls_ms': 5.0})
+    current = doc('b', notify={'dispatch_us': 11.5, 'index_us@64': 2.1, 'calls_ms': 4.0})
+    regressions, out = quiet(benchmarks.compare, base, current)
+    assert regressions == 1  # only dispatch_us got more than 10% slower
+    assert 'notify.dispatch_us' in out and 'slower' in out
+    assert quiet(benchmarks.compare, base, current, 0.2)[0] == 0
+
+
+def test_non_timing_metrics_are_informational():
+    base = doc('a', wake_word={'false_accept_rate': 0.01, 'speedup': 10.0})
+    current = doc('b', wake_word={'false_accept_rate': 0.05, 'speedup': 40.0})
+    assert quiet(benchmarks.compare, base, current)[0] == 0
+
+
+def test_new_and_zero_metrics_are_skipped():
+    base = doc('a', notify={'dispatch_us': 0.0})
+    current = doc('b', notify={'dispatch_us': 9.0, 'added_us': 3.0}, nbest={'pick_us': 1.0})
+    regressions, out = quiet(benchmarks.compare, base, current)
+    assert regressions == 0 and 'added_us' not in out and 'nbest' not in out
+
+
+def test_run_builds_a_json_document():
+    fake = {'fast': lambda: {'call_us': 1.5}, 'empty': lambda: None}
+    with mock.patch.dict(benchmarks.BENCHMARKS, fake, clear=True):
+        result, out = quiet(benchmarks.run, ['fast', 'empty', 'missing'])
+    assert result['results'] == {'fast': {'call_us': 1.5}, 'empty': {}}
+    assert 'Unknown benchmark: missing' in out
+    assert {'commit', 'timestamp', 'python', 'platform'} <= set(result)
+    assert json.loads(json.dumps(result)) == result
+
+
+def test_every_benchmark_is_registered_by_name():
+    assert 'notify' in benchmarks.BENCHMARKS and 'execute_action' in benchmarks.BENCHMARKS
+    assert all(fn.__name__ == 'bench_' + name for name, fn in benchmarks.BENCHMARKS.items())
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,83 @@
+# Tests for the built-in command table of io.py: triggers, argument extraction, plugins and the resolution cache
+# Run: python -m pytest test_commands.py  (or python test_commands.py)
+import os
+import sys
+import types
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import benchmarks
+import headless
+
+io = benchmarks._assistant()  # io.py, loaded without shadowing the stdlib io
+
+
+def resolved(query):
+    found = io.INTENTS.resolve(query)
+    return found and (found[0].name, found[1])
+
+
+def test_stop_is_an_exact_command():
+    assert resolved('توقف') == ('pause_music', {})
+    assert resolved('توقف موزیک') == ('pause_music', {})
+    assert resolved('توقف کن') is None  # only the bare word pauses
+
+
+def test_hardware_commands_accept_misheard_triggers():
+    assert resolved('کم کن صدارو') == ('volume_down', {})
+    assert resolved('کاهش صدااا') == ('volume_down', {})
+    assert resolved('صدای کمترر') == ('volume_down', {})
+    assert resolved('mutte') == ('mute', {})
+    assert resolved('unmutte') == ('unmute', {})
+    assert resolved('brightnes up') == ('brightness_up', {})
+
+
+def test_play_music_extracts_the_song_name():
+    assert resolved('پخش آهنگ شادمهر') == ('play_music', {'song_name': 'شادمهر'})
+    assert resolved('play music yesterday') == ('play_music', {'song_name': 'yesterday'})
+
+
+def test_zwnj_and_persian_digits_are_folded():
+    assert resolved('بی‌صدا') == resolved('بی صدا') == ('mute', {})
+    assert resolved('۵ درصد کم') == resolved('5 درصد کم') == ('volume_small_down', {})
+
+
+def test_plugins_that_decline_or_crash_fall_through_to_the_built_ins():
+    for outcome in (False, RuntimeError('boom')):
+        plugin = types.ModuleType('test_clock_plugin')
+        plugin.KEYWORDS = ['ساعت']
+        plugin.can_handle = lambda q: True
+        if isinstance(outcome, Exception):
+            plugin.handle = mock.Mock(side_effect=outcome)
+        else:
+            plugin.handle = mock.Mock(return_value=outcome)
+        io.register_plugin(plugin)
+        try:
+            with headless.dry_run(io, echo=False) as dry, \
+                    mock.patch.object(io, '_run_plugin', lambda mod, query: mod.handle(query)):
+                assert io.INTENTS.dispatch('ساعت چنده').name == 'tell_time'
+            plugin.handle.assert_called_once()
+            assert dry.spoken  # the built-in answered
+        finally:
+            io.INTENTS.unregister('plugin:test_clock_plugin')
+
+
+def test_cache_is_cleared_when_apps_json_changes():
+    cache = io.INTENTS.cache
+    with headless.dry_run(io, echo=False), mock.patch.object(cache, 'check_interval', 0):
+        io.INTENTS.dispatch('ساعت چنده')
+        assert cache.get(io.normalize_query('ساعت چنده'))[0]
+        before = cache.invalidations
+        with mock.patch.object(io.APPS_CONFIG, 'version', io.APPS_CONFIG.version + 1):
+            io.INTENTS.dispatch('ساعت چنده')
+        assert cache.invalidations == before + 1
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
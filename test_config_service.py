@@ -0,0 +1,161 @@
+# Tests for the shared config files (config_service.ConfigService)
+# Run: python -m pytest test_config_service.py  (or python test_config_service.py)
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import config_service
+from config_service import ConfigService, freeze, validate, validate_apps
+
+SCHEMA = {'voice': (bool, True), 'group_window_seconds': ((int, float), 5), 'levels': (dict, {})}
+
+
+def write(path, data, mtime_step=True):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    if mtime_step:
+        # make sure the stat changes even on coarse-mtime file systems
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+class Workdir:
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix='io_test_config_')
+        return self.root
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def test_validate_fills_defaults_and_replaces_wrong_types():
+    clean, errors = validate({'voice': 1, 'group_window_seconds': True, 'extra': 'kept'}, SCHEMA)
+    assert clean == {'voice': True, 'group_window_seconds': 5, 'levels': {}, 'extra': 'kept'}
+    assert len(errors) == 2
+    clean, errors = validate([], SCHEMA)
+    assert clean['voice'] is True and errors
+
+
+def test_validate_apps_normalizes_paths():
+    clean, errors = validate_apps({'apps': {'notepad': 'n.exe', 'code': ['a', 'b'], 'bad': 3},
+                                   'aliases': {'نوت پد': 'notepad', 'x': 1}})
+    assert clean['apps'] == {'notepad': ['n.exe'], 'code': ['a', 'b'], 'bad': []}
+    assert clean['aliases'] == {'نوت پد': 'notepad'}
+    assert len(errors) == 2
+
+
+def test_snapshots_are_read_only():
+    snap = freeze({'apps': {'a': ['x']}})
+    try:
+        snap['apps']['b'] = ['y']
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('snapshot was writable')
+    assert snap['apps']['a'] == ('x',)
+
+
+def test_reload_only_on_content_change():
+    with Workdir() as root:
+        path = os.path.join(root, 'apps.json')
+        write(path, {'apps': {'a': 'x'}})
+        service = ConfigService(interval=0)
+        config = service.register('apps', path, validate_apps, watch=False)
+        seen = []
+        config.subscribe(seen.append)
+        assert config.loaded and config.version == 1
+        assert service.poll() == []  # unchanged
+        os.utime(path)  # touched, same bytes
+        assert service.poll() == [] and config.version == 1
+        write(path, {'apps': {'a': 'x', 'b': 'y'}})
+        assert service.poll() == ['apps']
+        assert config.version == 2 and list(seen[-1]['apps']) == ['a', 'b']
+
+
+def test_invalid_json_keeps_previous_snapshot():
+    with Workdir() as root:
+        path = os.path.join(root, 'notifications.json')
+        write(path, {'voice': False})
+        service = ConfigService(interval=0)
+        config = service.register('notifications', path, lambda d: validate(d, SCHEMA), watch=False)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"voice": ')
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 20_000_000))
+        assert service.check_all() == []
+        assert config.snapshot['voice'] is False and config.version == 1
+
+
+def test_missing_file_uses_defaults_until_created():
+    with Workdir() as root:
+        path = os.path.join(root, 'later.json')
+        service = ConfigService(interval=0)
+        config = service.register('later', path, lambda d: validate(d, SCHEMA), watch=False)
+        assert not config.loaded and config.snapshot['group_window_seconds'] == 5
+        write(path, {'group_window_seconds': 2})
+        assert service.poll() == ['later'] and config.snapshot['group_window_seconds'] == 2
+
+
+def test_unwatched_files_reload_on_the_polling_thread_only():
+    with Workdir() as root:
+        apps_path = os.path.join(root, 'apps.json')
+        notif_path = os.path.join(root, 'notifications.json')
+        write(apps_path, {'apps': {}})
+        write(notif_path, {'voice': True})
+        service = ConfigService(interval=0.02)
+        try:
+            apps = service.register('apps', apps_path, validate_apps, watch=False)
+            notif = service.register('notifications', notif_path, lambda d: validate(d, SCHEMA))
+            threads = {}
+            apps.subscribe(lambda snap: threads.setdefault('apps', threading.current_thread().name))
+            notif.subscribe(lambda snap: threads.setdefault('notifications', threading.current_thread().name))
+            write(apps_path, {'apps': {'a': 'x'}})
+            write(notif_path, {'voice': False})
+            deadline = time.time() + 2
+            while 'notifications' not in threads and time.time() < deadline:
+                time.sleep(0.01)
+            assert threads.get('notifications') == 'io-config-watch'
+            time.sleep(0.1)
+            assert 'apps' not in threads and apps.version == 1  # the watcher leaves it alone
+            service.poll()
+            assert threads['apps'] == threading.current_thread().name and apps.version == 2
+        finally:
+            service.stop()
+
+
+def test_one_registration_per_path():
+    with Workdir() as root:
+        path = os.path.join(root, 'apps.json')
+        write(path, {'apps': {}})
+        service = ConfigService(interval=0)
+        first = service.register('apps', path, validate_apps, watch=False)
+        again = service.register('apps', os.path.join(root, '.', 'apps.json'), validate_apps, watch=False)
+        assert first is again and service.find(path) is first and service.get('apps') is first
+
+
+def test_apps_is_not_watched():
+    with Workdir() as root:
+        path = os.path.join(root, 'apps.json')
+        write(path, {'apps': {}})
+        saved = config_service.SERVICE
+        config_service.SERVICE = ConfigService(interval=0)
+        try:
+            assert config_service.apps(path).watched is False
+            assert config_service.SERVICE._thread is None
+        finally:
+            config_service.SERVICE = saved
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
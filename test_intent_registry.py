@@ -0,0 +1,151 @@
+# Tests for matching and dispatch order in the command table (intent_registry.IntentRegistry)
+# Run: python -m pytest test_intent_registry.py  (or python test_intent_registry.py)
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from intent_registry import IntentRegistry
+
+
+class Calls:
+    """Handler factory that records which intents ran, in order."""
+
+    def __init__(self):
+        self.ran = []
+
+    def handler(self, name, result=True):
+        def run(**kwargs):
+            self.ran.append(name)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return run
+
+
+def names(registry, query):
+    return [intent.name for intent, _ in registry.candidates(query)]
+
+
+def test_lower_priority_wins_and_ties_keep_registration_order():
+    reg, calls = IntentRegistry(), Calls()
+    reg.register('late', calls.handler('late'), triggers=['ساعت'], priority=30)
+    reg.register('first', calls.handler('first'), triggers=['ساعت'], priority=10)
+    reg.register('second', calls.handler('second'), triggers=['ساعت'], priority=10)
+    assert names(reg, 'ساعت چنده') == ['first', 'second', 'late']
+    assert reg.dispatch('ساعت چنده').name == 'first'
+    assert calls.ran == ['first']
+
+
+def test_declined_results_fall_through_to_the_next_intent():
+    for declined in (False, '', 0):
+        reg, calls = IntentRegistry(), Calls()
+        reg.register('plugin:x', calls.handler('plugin:x', declined), triggers=['باز'], priority=0, source='plugin')
+        reg.register('open_app', calls.handler('open_app', None), triggers=['باز'], priority=40)
+        assert reg.dispatch('باز کن').name == 'open_app'  # None counts as handled
+        assert calls.ran == ['plugin:x', 'open_app']
+
+
+def test_an_attempted_plugin_result_stops_dispatch():
+    # as in the old plugin loop: {'handled': False, 'error': ...} means "tried and failed", not "not mine"
+    reg, calls = IntentRegistry(), Calls()
+    failed = {'handled': False, 'error': 'no_candidate_found'}
+    reg.register('plugin:x', calls.handler('plugin:x', failed), triggers=['باز'], priority=0, source='plugin')
+    reg.register('open_app', calls.handler('open_app'), triggers=['باز'], priority=40)
+    assert reg.dispatch('باز کن').name == 'plugin:x'
+    assert calls.ran == ['plugin:x']
+
+
+def test_a_crashing_plugin_lets_the_built_ins_try():
+    reg, calls, errors = IntentRegistry(), Calls(), []
+    reg.on_error = lambda intent, exc: errors.append((intent.name, str(exc)))
+    reg.register('plugin:x', calls.handler('plugin:x', RuntimeError('boom')), triggers=['باز'], priority=0,
+                 source='plugin')
+    reg.register('open_app', calls.handler('open_app'), triggers=['باز'], priority=40)
+    assert reg.dispatch('باز کن').name == 'open_app'
+    assert calls.ran == ['plugin:x', 'open_app']
+    assert errors == [('plugin:x', 'boom')]
+
+
+def test_a_crashing_built_in_ends_dispatch():
+    reg, calls, errors = IntentRegistry(), Calls(), []
+    reg.on_error = lambda intent, exc: errors.append(intent.name)
+    reg.register('volume_down', calls.handler('volume_down', OSError('no mixer')), triggers=['صدا'], priority=10)
+    reg.register('volume_small_down', calls.handler('volume_small_down'), triggers=['صدا'], priority=20)
+    # the failing command is reported as the one that handled it; nothing else runs
+    assert reg.dispatch('صدا کم').name == 'volume_down'
+    assert calls.ran == ['volume_down']
+    assert errors == ['volume_down']
+
+
+def test_exact_phrases_match_the_whole_query_only():
+    reg, calls = IntentRegistry(), Calls()
+    reg.register('pause_music', calls.handler('pause_music'), triggers=['توقف موزیک'], exact=['توقف'])
+    assert names(reg, 'توقف') == ['pause_music']
+    assert names(reg, ' توقف ') == ['pause_music']
+    assert names(reg, 'توقف موزیک') == ['pause_music']
+    assert names(reg, 'توقف کن') == []
+
+
+def test_fuzzy_intents_match_misheard_triggers():
+    reg, calls = IntentRegistry(), Calls()
+    reg.register('mute', calls.handler('mute'), triggers=['mute'], fuzzy=True)
+    assert names(reg, 'mutte') == ['mute']
+    assert names(reg, 'hello') == []
+    strict = IntentRegistry()
+    strict.register('mute', calls.handler('mute'), triggers=['mute'])
+    assert names(strict, 'mutte') == []  # not registered with fuzzy=True
+
+
+def test_zwnj_and_persian_digits_are_folded():
+    reg, calls = IntentRegistry(), Calls()
+    reg.register('mute', calls.handler('mute'), triggers=['بی‌صدا'])
+    reg.register('volume_small_down', calls.handler('volume_small_down'), triggers=['۵ درصد کم'])
+    for query in ('بی‌صدا', 'بی صدا', 'بی صدا کن'):
+        assert names(reg, query) == ['mute'], query
+    assert names(reg, '5 درصد کم') == names(reg, '۵ درصد کم') == ['volume_small_down']
+
+
+def test_extractors_pass_arguments_and_can_reject():
+    reg, calls = IntentRegistry(), Calls()
+    reg.register('play_music', calls.handler('play_music'), triggers=['پخش'], priority=10,
+                 extract=lambda q: {'song_name': q.replace('پخش', '').strip()} if q != 'پخش' else None)
+    reg.register('resume_music', calls.handler('resume_music'), triggers=['پخش'], priority=20)
+    assert reg.resolve('پخش شادمهر')[1] == {'song_name': 'شادمهر'}
+    assert reg.resolve('پخش')[0].name == 'resume_music'
+
+
+def test_the_cache_is_cleared_when_a_dependency_changes():
+    reg, calls = IntentRegistry(), Calls()
+    reg.cache.check_interval = 0
+    version = [1]
+    reg.cache.add_dependency(lambda: version[0])
+    reg.register('tell_time', calls.handler('tell_time'), triggers=['ساعت'])
+    reg.dispatch('ساعت')
+    reg.dispatch('ساعت')
+    assert reg.cache.stats()['hits'] == 1
+    version[0] = 2
+    reg.dispatch('ساعت')
+    stats = reg.cache.stats()
+    assert stats['invalidations'] == 1 and stats['hits'] == 1 and stats['misses'] == 2
+    assert calls.ran == ['tell_time'] * 3
+
+
+def test_a_cached_handler_that_declines_is_skipped():
+    reg, calls = IntentRegistry(), Calls()
+    answers = iter([True, False])
+    reg.register('plugin:x', lambda query: calls.ran.append('plugin:x') or next(answers), triggers=['باز'],
+                 priority=0, extract=lambda q: {'query': q}, source='plugin')
+    reg.register('open_app', calls.handler('open_app'), triggers=['باز'], priority=40)
+    assert reg.dispatch('باز کن').name == 'plugin:x'
+    assert reg.dispatch('باز کن').name == 'open_app'
+    assert calls.ran == ['plugin:x', 'plugin:x', 'open_app']
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,47 @@
+# Tests for the shared lazy module proxies and the startup report (lazy_imports)
+# Run: python -m pytest test_lazy_imports.py  (or python test_lazy_imports.py)
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import lazy_imports
+from lazy_imports import LAZY_MODULES, StartupProfile, lazy_import
+
+
+def test_every_importer_shares_one_proxy():
+    loaded = []
+    try:
+        first = lazy_import('colorsys', on_load=lambda mod: loaded.append('first'))
+        second = lazy_import('colorsys', on_load=lambda mod: loaded.append('second'))
+        assert first is second and list(LAZY_MODULES).count('colorsys') == 1
+        assert not first.loaded
+        assert second.rgb_to_hsv(0, 0, 0) == (0.0, 0.0, 0.0)
+        assert loaded == ['first', 'second']
+        # a late importer of an already loaded module still gets its callback
+        lazy_import('colorsys', on_load=lambda mod: loaded.append('late'))
+        assert loaded == ['first', 'second', 'late']
+        assert [name for name, error in lazy_imports.load_all()].count('colorsys') == 1
+    finally:
+        LAZY_MODULES.pop('colorsys', None)
+
+
+def test_loads_after_ready_are_reported_as_deferred():
+    profile = StartupProfile()
+    profile.record('import', 'notification', 0.004)
+    profile.mark_ready()
+    profile.record('import', 'speech_recognition', 0.080)
+    assert profile.records == [('import', 'notification', 0.004)]
+    assert profile.deferred == [('import', 'speech_recognition', 0.080)]
+    startup, deferred = profile.report().split('deferred', 1)
+    assert 'notification' in startup and 'speech_recognition' not in startup
+    assert 'speech_recognition' in deferred and 'ready to listen' in startup
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,145 @@
+# Tests for phrase segmentation and pausing capture while the assistant talks (listener.BackgroundListener)
+# Run: python -m pytest test_listener.py  (or python test_listener.py)
+import math
+import os
+import sys
+import threading
+from array import array
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from listener import BackgroundListener
+from speech_output import SpeechOutput
+
+RATE = 16000
+CHUNK = 1024
+
+
+def pcm(seconds, amp=0):
+    """Tone (amp > 0) or near-silence, whole CHUNKs long."""
+    n = int(math.ceil(seconds * RATE / CHUNK)) * CHUNK
+    return array('h', (int(amp * math.sin(2 * math.pi * 220 * i / RATE)) + (i % 7) - 3
+                       for i in range(n))).tobytes()
+
+
+class ScriptedSource:
+    """sr.Microphone-shaped source playing a script of PCM bytes and callables.
+
+    Callables run on the capture thread right before the next buffer is read, so
+    pause()/resume() land at an exact point in the audio.
+    """
+
+    CHUNK = CHUNK
+    SAMPLE_RATE = RATE
+    SAMPLE_WIDTH = 2
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.stream = self
+        self.pending = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self, n):
+        while not self.pending and self.script:
+            step = self.script.pop(0)
+            if callable(step):
+                step()
+            else:
+                self.pending = step
+        buf, self.pending = self.pending[:n * 2], self.pending[n * 2:]
+        return buf
+
+
+def run(script, **kwargs):
+    """Capture the whole script; return (listener, phrases as byte strings)."""
+    holder = []
+    kwargs.setdefault('energy_threshold', 500.0)
+    listener = BackgroundListener(lambda: holder[0], dynamic_energy=False, max_phrases=16,
+                                  audio_factory=lambda raw, rate, width: raw, **kwargs)
+    holder.append(ScriptedSource(script(listener)))
+    listener.start()
+    phrases = []
+    while True:
+        phrase = listener.get_phrase(timeout=2)
+        if phrase is None:
+            break
+        phrases.append(phrase)
+    listener.stop()
+    return listener, phrases
+
+
+def test_phrases_are_segmented_on_pauses():
+    listener, phrases = run(lambda l: [pcm(0.5), pcm(0.6, 6000), pcm(1.0), pcm(0.4, 6000), pcm(1.0)])
+    assert len(phrases) == 2
+    assert listener.stats['phrases'] == 2
+
+
+def test_audio_while_paused_is_discarded():
+    # the assistant's reply (a loud tone) plays between pause() and resume()
+    def script(l):
+        return [pcm(0.5), l.pause, pcm(1.0, 8000), lambda: l.resume(0.3), pcm(0.2, 8000), pcm(0.5),
+                pcm(0.6, 6000), pcm(1.0)]
+    listener, phrases = run(script)
+    assert len(phrases) == 1  # only the user's phrase after the echo tail
+    voiced = len(pcm(0.6, 6000))
+    assert voiced <= len(phrases[0]) < voiced + len(pcm(0.5)) + len(pcm(1.0))
+    assert listener.stats['discarded_paused'] == 0  # nothing had started when it paused
+
+
+def test_pause_drops_a_phrase_in_progress():
+    def script(l):
+        return [pcm(0.3), pcm(0.4, 6000), l.pause, pcm(0.4, 6000), l.resume, pcm(1.0)]
+    listener, phrases = run(script)
+    assert phrases == []
+    assert listener.stats['discarded_paused'] == 1
+
+
+def test_calibration_waits_for_the_pause_to_end():
+    def script(l):
+        return [l.pause, pcm(1.0, 9000), l.resume, pcm(1.0)]
+    listener, phrases = run(script, energy_threshold=None, calibration=0.5)
+    assert phrases == []
+    assert listener.energy_threshold == listener.min_energy  # calibrated on quiet, not on the reply
+
+
+def test_speech_output_pauses_capture_around_each_utterance():
+    listener = BackgroundListener(lambda: None)
+    events = []
+    out = SpeechOutput(lambda text, opts, cancelled: events.append((text, listener.paused)))
+    out.observe(lambda item: listener.pause(), lambda item: listener.resume(0.2))
+    assert out.say('صدا کم شد.').result(2)
+    assert events == [('صدا کم شد.', True)]
+    assert listener.paused  # still inside the echo tail
+    assert listener._discarding(0.25) and not listener.paused
+
+
+def test_observing_while_speaking_pauses_at_once():
+    listener = BackgroundListener(lambda: None)
+    started, release = threading.Event(), threading.Event()
+
+    def render(text, opts, cancelled):
+        started.set()
+        release.wait(2)
+
+    out = SpeechOutput(render)
+    future = out.say('ساعت فعلی:')
+    assert started.wait(2)
+    out.observe(lambda item: listener.pause(), lambda item: listener.resume())
+    assert listener.paused
+    release.set()
+    assert future.result(2) and out.wait(2)
+    assert not listener.paused
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,56 @@
+# Tests for when notification sounds get preloaded (notification._preload_sounds)
+# Run: python -m pytest test_notification.py  (or python test_notification.py)
+import importlib
+import os
+import sys
+import threading
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import audio_output
+import config_service
+import notification
+
+
+class Output:
+    """audio_output.default() stand-in counting preload() calls."""
+
+    def __init__(self):
+        self.preloads = 0
+        self.done = threading.Event()
+
+    def preload(self, paths):
+        self.preloads += 1
+        self.done.set()
+        return len(paths)
+
+
+def show(message):
+    notification.notify({'title': 'iO', 'message': message, 'bypass_quiet': True, 'play_sound': False})
+
+
+def test_sounds_are_preloaded_on_first_notify_not_at_import():
+    output = Output()
+    with mock.patch.object(audio_output, 'default', return_value=output) as default:
+        importlib.reload(notification)
+        assert not default.called and notification._preloaded_config is None
+        with mock.patch.object(notification, 'plyer_notify', None):
+            show('یادآوری جلسه')
+            assert output.done.wait(2)
+            show('یادآوری دوم')
+            assert output.preloads == 1
+            # a new config snapshot (e.g. another sound pack) is preloaded by the next notification
+            output.done.clear()
+            notification._apply_config(config_service.freeze(dict(notification._config, sound_pack='soft')))
+            show('یادآوری سوم')
+            assert output.done.wait(2) and output.preloads == 2
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
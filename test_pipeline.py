@@ -0,0 +1,156 @@
+# Tests for the staged capture -> recognition -> dispatch pipeline (pipeline.SpeechPipeline)
+# Run: python -m pytest test_pipeline.py  (or python test_pipeline.py)
+import os
+import queue
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from pipeline import SpeechPipeline
+
+
+def scripted_capture(phrases):
+    """capture(timeout) stand-in: hands out the phrases, then reports silence."""
+    pending = queue.Queue()
+    for p in phrases:
+        pending.put(p)
+
+    def capture(timeout):
+        try:
+            return pending.get(timeout=min(timeout, 0.05))
+        except queue.Empty:
+            return None
+    return capture
+
+
+def test_transcripts_come_out_in_capture_order():
+    # the first phrase is the slowest to recognize; later ones finish first on other workers
+    delays = {'first': 0.2, 'second': 0.01, 'third': 0.05, 'fourth': 0.0}
+
+    def recognize(audio):
+        time.sleep(delays[audio])
+        return audio.upper()
+
+    p = SpeechPipeline(scripted_capture(list(delays)), recognize, workers=4).start()
+    try:
+        got = [p.get(timeout=2) for _ in delays]
+        assert [t.value for t in got] == ['FIRST', 'SECOND', 'THIRD', 'FOURTH']
+        assert [t.seq for t in got] == [0, 1, 2, 3]
+        assert p.stats['reorder'].max_depth >= 2  # later phrases did wait for the first
+    finally:
+        p.stop()
+
+
+def test_recognition_errors_are_delivered_in_place():
+    def recognize(audio):
+        if audio == 'bad':
+            raise ValueError('unintelligible')
+        return audio
+
+    p = SpeechPipeline(scripted_capture(['a', 'bad', 'c']), recognize, workers=2).start()
+    try:
+        first, second, third = (p.get(timeout=2) for _ in range(3))
+        assert first.value == 'a' and first.error is None
+        assert isinstance(second.error, ValueError) and second.value is None
+        assert third.value == 'c'
+    finally:
+        p.stop()
+
+
+def test_get_times_out_when_nothing_was_said():
+    p = SpeechPipeline(scripted_capture([]), lambda audio: audio).start()
+    try:
+        started = time.monotonic()
+        assert p.get(timeout=0.1) is None
+        assert time.monotonic() - started < 1.0
+        assert p.in_flight == 0
+    finally:
+        p.stop()
+
+
+def test_get_waits_past_timeout_for_a_phrase_in_flight():
+    release = threading.Event()
+
+    def recognize(audio):
+        release.wait(2)
+        return audio
+
+    p = SpeechPipeline(scripted_capture(['late']), recognize, workers=1).start()
+    try:
+        deadline = time.monotonic() + 1
+        while p.in_flight == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        threading.Timer(0.2, release.set).start()
+        item = p.get(timeout=0.05)  # captured already, so get() keeps waiting for it
+        assert item is not None and item.value == 'late'
+    finally:
+        p.stop()
+
+
+def test_capture_blocks_when_recognition_is_behind():
+    release = threading.Event()
+
+    def recognize(audio):
+        release.wait(2)
+        return audio
+
+    phrases = [f'p{i}' for i in range(10)]
+    p = SpeechPipeline(scripted_capture(phrases), recognize, workers=1, max_pending=2).start()
+    try:
+        time.sleep(0.3)
+        # one phrase in the worker, two queued, one held by the blocked capture stage
+        assert p.stats['capture'].count <= 4
+        release.set()
+        assert [p.get(timeout=2).value for _ in phrases] == phrases
+    finally:
+        p.stop()
+
+
+def test_drain_forgets_phrases_captured_so_far():
+    release = threading.Event()
+
+    def recognize(audio):
+        if audio == 'before':
+            release.wait(2)  # still being recognized when drain() runs
+        return audio
+
+    phrases = queue.Queue()
+    for p in ('before', 'queued'):
+        phrases.put(p)
+
+    def capture(timeout):
+        try:
+            return phrases.get(timeout=min(timeout, 0.05))
+        except queue.Empty:
+            return None
+
+    p = SpeechPipeline(capture, recognize, workers=1).start()
+    try:
+        deadline = time.monotonic() + 1
+        while p.in_flight < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert p.drain() == 2
+        release.set()
+        phrases.put('answer')
+        item = p.get(timeout=2)
+        assert item.value == 'answer' and item.seq == 2
+        assert p.stats['recognize'].count == 2  # 'queued' was skipped, not recognized
+    finally:
+        p.stop()
+
+
+def test_stop_unblocks_get():
+    p = SpeechPipeline(scripted_capture([]), lambda audio: audio).start()
+    threading.Timer(0.1, p.stop).start()
+    assert p.get() is None
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
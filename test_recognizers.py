@@ -0,0 +1,152 @@
+# Tests for the speech-to-text backend chain (recognizers.RecognizerChain) on WAV fixtures
+# Run: python -m pytest test_recognizers.py  (or python test_recognizers.py)
+import array
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import recognizers
+from recognizers import BackendError, FakeBackend, NoSpeech, RecognizerChain, audio_key
+from rescoring import VocabularyRescorer
+
+try:
+    import speech_recognition as sr
+except ImportError:  # the chain itself only needs get_raw_data()
+    sr = None
+
+
+class RawAudio:
+    """Stands in for sr.AudioData when speech_recognition is not installed."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def get_raw_data(self, convert_rate=None, convert_width=None):
+        return self.raw
+
+
+def fixture(root, name, freq, seconds=0.5, rate=16000):
+    """A tone WAV read back the way the listener hands audio to the chain."""
+    path = os.path.join(root, f'{name}.wav')
+    samples = array.array('h', (int(8000 * math.sin(2 * math.pi * freq * i / rate))
+                                for i in range(int(seconds * rate))))
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    if sr is None:
+        with wave.open(path, 'rb') as w:
+            return RawAudio(w.readframes(w.getnframes()))
+    with sr.AudioFile(path) as source:
+        return sr.Recognizer().record(source)
+
+
+class Fixtures:
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix='io_test_stt_')
+        self.time = fixture(self.root, 'time', 440)
+        self.date = fixture(self.root, 'date', 660)
+        self.silence = fixture(self.root, 'silence', 0)
+        return self
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def test_first_backend_that_understands_wins():
+    with Fixtures() as f:
+        offline = FakeBackend({audio_key(f.time): 'ساعت چنده'}, name='vosk')
+        online = FakeBackend({audio_key(f.time): 'ساعت چند است', audio_key(f.date): 'تاریخ'}, name='google')
+        chain = RecognizerChain([offline, online])
+        assert chain.recognize(f.time) == ('ساعت چنده', 'vosk')
+        # the offline model heard nothing in this one: the online backend gets the audio
+        assert chain.recognize(f.date) == ('تاریخ', 'google')
+        stats = chain.summary()
+        assert stats['vosk']['ok'] == 1 and stats['vosk']['no_speech'] == 1
+        assert stats['google']['calls'] == 1
+
+
+def test_slow_backend_times_out_and_falls_back():
+    with Fixtures() as f:
+        stuck = FakeBackend({audio_key(f.time): 'دیر'}, name='google', latency=1.0, timeout=0.1)
+        local = FakeBackend({audio_key(f.time): 'ساعت'}, name='vosk')
+        chain = RecognizerChain([stuck, local])
+        started = time.perf_counter()
+        assert chain.recognize(f.time) == ('ساعت', 'vosk')
+        assert time.perf_counter() - started < 0.6  # not held up by the stuck backend
+        assert chain.summary()['google']['timeouts'] == 1
+
+
+def test_failing_backend_falls_back():
+    with Fixtures() as f:
+        broken = FakeBackend([BackendError('unreachable')], name='google')
+        local = FakeBackend(['تاریخ'], name='vosk')
+        assert RecognizerChain([broken, local]).recognize(f.date) == ('تاریخ', 'vosk')
+
+
+def test_no_speech_when_every_backend_heard_nothing():
+    with Fixtures() as f:
+        chain = RecognizerChain([FakeBackend({}, name='vosk'), FakeBackend({}, name='google')])
+        try:
+            chain.recognize(f.silence)
+        except NoSpeech:
+            pass
+        else:
+            raise AssertionError('expected NoSpeech')
+
+
+def test_backend_error_when_none_could_run():
+    with Fixtures() as f:
+        chain = RecognizerChain([FakeBackend([BackendError('offline')], name='google'),
+                                 FakeBackend({audio_key(f.time): 'x'}, name='vosk', latency=0.5, timeout=0.05)])
+        try:
+            chain.recognize(f.time)
+        except BackendError as e:
+            assert 'google' in str(e) and 'timed out' in str(e)
+        else:
+            raise AssertionError('expected BackendError')
+
+
+def test_unavailable_backends_are_skipped():
+    with Fixtures() as f:
+        missing = recognizers.VoskBackend(os.path.join(f.root, 'no-such-model'))
+        assert not missing.available()
+        chain = RecognizerChain([missing, FakeBackend(['ساعت'], name='google')])
+        assert chain.recognize(f.time) == ('ساعت', 'google')
+        assert chain.summary()['vosk']['calls'] == 0
+
+
+def test_rescorer_picks_from_the_n_best_list():
+    with Fixtures() as f:
+        nbest = [('ساعد چنده', 0.8), ('ساعت چنده', None)]
+        rescorer = VocabularyRescorer(lambda: ['ساعت', 'تاریخ'])
+        chain = RecognizerChain([FakeBackend({audio_key(f.time): nbest}, name='google')], rescorer)
+        assert chain.recognize(f.time) == ('ساعت چنده', 'google')
+        assert chain.summary()['google']['rescored'] == 1
+        plain = RecognizerChain([FakeBackend({audio_key(f.time): nbest}, name='google')])
+        assert plain.recognize(f.time) == ('ساعد چنده', 'google')
+
+
+def test_build_chain_from_names():
+    chain = recognizers.build_chain(['vosk', 'bogus', 'google'], vosk_model=None, timeouts={'google': 3})
+    assert [b.name for b in chain.backends] == ['vosk', 'google']
+    assert chain.backends[1].timeout == 3.0
+    assert chain.rescorer is None
+    no_nbest = recognizers.build_chain(['google'], rescorer=object(), n_best=0)
+    assert no_nbest.rescorer is None
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
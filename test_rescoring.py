@@ -0,0 +1,74 @@
+# Tests for n-best rescoring (rescoring.VocabularyRescorer)
+# Run: python -m pytest test_rescoring.py  (or python test_rescoring.py)
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from rescoring import VocabularyRescorer
+
+VOCABULARY = ['ساعت', 'تاریخ', 'پخش موزیک', 'پخش آهنگ', 'ویکی پدیا', 'زیاد کن صدا', 'صدا زیاد']
+
+
+def make_rescorer():
+    return VocabularyRescorer(lambda: VOCABULARY)
+
+
+def test_misheard_top_is_replaced_by_command_alternative():
+    r = make_rescorer()
+    assert r.pick([('ساعد چنده', 0.8), ('ساعت چنده', None)]) == 'ساعت چنده'
+    assert r.pick([('گدت زیاد', 0.81), ('صدا زیاد', None)]) == 'صدا زیاد'
+    assert r.stats['rescued'] == 2
+
+
+def test_top_with_command_phrase_keeps_its_argument():
+    r = make_rescorer()
+    assert r.pick([('ویکی پدیا انیشتین', None), ('ویکی پدیا ساعت', None)]) == 'ویکی پدیا انیشتین'
+    assert r.pick([('پخش آهنگ شادمهر عقیلی', 0.9), ('پخش آهنگ', None)]) == 'پخش آهنگ شادمهر عقیلی'
+    assert r.stats['rescued'] == 0
+
+
+def test_argument_words_do_not_favour_shorter_alternatives():
+    # no phrase in either: the longer top one must not lose for its free-text words
+    r = make_rescorer()
+    assert r.pick([('پخش کن آهنگ شادمهر عقیلی', None), ('پخش کن آهنگ', None)]) == 'پخش کن آهنگ شادمهر عقیلی'
+
+
+def test_free_text_is_never_replaced():
+    r = make_rescorer()
+    assert r.pick([('هوا امروز خوب است', 0.7), ('ساعت', None)]) == 'ساعت'  # the top has no command at all
+    assert r.pick([('هوا امروز خوب است', 0.7), ('هوا امروز خوب نیست', None)]) == 'هوا امروز خوب است'
+    assert r.stats['out_of_vocabulary'] == 1
+
+
+def test_suspended_returns_top_hypothesis():
+    r = make_rescorer()
+    with r.suspended():
+        assert r.pick([('ساعد', 0.6), ('ساعت', None)]) == 'ساعد'
+    assert r.pick([('ساعد', 0.6), ('ساعت', None)]) == 'ساعت'
+    assert r.stats['bypassed'] == 1
+
+
+def test_empty_alternatives():
+    r = make_rescorer()
+    assert r.pick([]) == ''
+    assert r.pick([('  ', 0.5), ('ساعت', None)]) == 'ساعت'
+
+
+def test_vocabulary_recompiled_on_version_change():
+    words = list(VOCABULARY)
+    version = [1]
+    r = VocabularyRescorer(lambda: words, version=lambda: version[0])
+    assert r.pick([('نوتپد', 0.9), ('باز کن نوت پد', None)]) == 'نوتپد'
+    words.append('نوت پد')
+    version[0] += 1
+    assert r.pick([('نوتپد', 0.9), ('باز کن نوت پد', None)]) == 'باز کن نوت پد'
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
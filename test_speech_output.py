@@ -0,0 +1,148 @@
+# Tests for the prioritized speech worker (speech_output.SpeechOutput)
+# Run: python -m pytest test_speech_output.py  (or python test_speech_output.py)
+import os
+import queue
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from pipeline import SpeechPipeline
+from speech_output import NORMAL, NOTIFICATION, URGENT, SpeechOutput, join_texts
+
+
+class FakeVoice:
+    """render() stand-in: records what was spoken, can hold the worker until released."""
+
+    def __init__(self, hold=False):
+        self.spoken = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def render(self, text, opts, cancelled):
+        self.spoken.append(text)
+        self.started.set()
+        while not cancelled.is_set() and not self.release.wait(0.005):
+            pass
+
+
+def test_priority_order_while_busy():
+    voice = FakeVoice(hold=True)
+    out = SpeechOutput(voice.render)
+    out.say('first')
+    assert voice.started.wait(2)
+    out.say('notification', NOTIFICATION)
+    out.say('reply', NORMAL)
+    out.say('alert', URGENT)
+    voice.release.set()
+    assert out.wait(2)
+    assert voice.spoken == ['first', 'alert', 'reply', 'notification']
+
+
+def test_cancel_interrupts_current_and_drops_queue():
+    voice = FakeVoice(hold=True)
+    out = SpeechOutput(voice.render)
+    current = out.say('long answer')
+    assert voice.started.wait(2)
+    queued = [out.say(f'queued {i}') for i in range(3)]
+    assert out.cancel() == 4
+    assert current.result(2) is False
+    assert all(f.cancelled() for f in queued)
+    assert out.wait(2)
+    assert voice.spoken == ['long answer']
+    assert out.stats['interrupted'] == 1 and out.stats['dropped'] == 3
+
+
+def test_cancel_right_after_say_is_never_spoken():
+    # cancel() landing while the worker is between dequeuing and rendering must still win:
+    # render() only returns early when cancelled, so anything cancel() missed counts as spoken
+    out = SpeechOutput(lambda text, opts, cancelled: cancelled.wait(0.5))
+    for i in range(200):
+        out.say(f'utterance {i}')
+        out.cancel()
+        assert out.wait(2)
+    assert out.stats['spoken'] == 0
+    assert out.stats['interrupted'] + out.stats['dropped'] == 200
+
+
+def test_cancel_current_only_keeps_queue():
+    voice = FakeVoice(hold=True)
+    out = SpeechOutput(voice.render)
+    out.say('one')
+    assert voice.started.wait(2)
+    out.say('two')
+    assert out.cancel(pending=False) == 1
+    voice.release.set()
+    assert out.wait(2)
+    assert voice.spoken == ['one', 'two']
+
+
+def test_batch_merges_consecutive_calls():
+    voice = FakeVoice()
+    out = SpeechOutput(voice.render)
+    with out.batch():
+        a = out.say('تاریخ امروز')
+        b = out.say('میلادی: ۱۸ اکتبر')
+        c = out.say('هشدار', URGENT)
+    assert out.wait(2)
+    assert a.result(2) and b.result(2) and c.result(2)
+    # the urgent one may or may not overtake the merged reply, depending on when the worker wakes
+    assert sorted(voice.spoken) == sorted(['تاریخ امروز. میلادی: ۱۸ اکتبر', 'هشدار'])
+    assert out.stats['coalesced'] == 1
+
+
+def test_spoken_reply_fed_back_through_the_pipeline_is_an_echo():
+    # the microphone hears every reply; the recognizer drops punctuation and spells numbers out
+    heard = {'صدا کم شد.': 'صدا کم شد', 'صدا ۵ درصد کم شد.': 'صدا پنج درصد کم شد',
+             'ساعت فعلی: 10:30:00': 'ساعت فعلی ده و سی دقیقه',
+             'سیستم ریستارت می‌شود، لطفا صبر کنید!': 'سیستم ریستارت میشود لطفا صبر کنید'}
+    mic = queue.Queue()
+
+    def capture(timeout):
+        try:
+            return mic.get(timeout=min(timeout, 0.05))
+        except queue.Empty:
+            return None
+
+    out = SpeechOutput(lambda text, opts, cancelled: mic.put(heard.get(text, text)))
+    p = SpeechPipeline(capture, lambda audio: audio).start()
+    try:
+        for reply in heard:
+            assert out.say(reply).result(2)
+            item = p.get(timeout=2)
+            assert item.value == heard[reply]
+            assert out.is_echo(item.value, item.captured_at)
+        # the user's own commands are not echoes, even right after a reply
+        mic.put('صدا رو کم کن')
+        item = p.get(timeout=2)
+        assert not out.is_echo(item.value, item.captured_at)
+        assert not out.is_echo('ساعت چنده', item.captured_at)
+    finally:
+        p.stop()
+
+
+def test_echo_needs_the_reply_around_capture_time():
+    out = SpeechOutput(lambda text, opts, cancelled: None)
+    before = time.perf_counter()
+    assert out.say('صدا کم شد.').result(2) and out.wait(2)
+    now = time.perf_counter()
+    assert out.is_echo('صدا کم شد', now)
+    assert not out.is_echo('صدا کم شد', before)  # captured before the reply started
+    assert not out.is_echo('صدا کم شد', now + 5, window=2.0)  # long after it ended
+    assert not out.is_echo('', now)
+
+
+def test_join_texts_punctuation():
+    assert join_texts(['سلام', 'خوبی؟', '', 'بله']) == 'سلام. خوبی؟ بله'
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
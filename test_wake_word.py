@@ -0,0 +1,157 @@
+# Tests for the wake-word gate (wake_word.WakeWordGate with a TemplateSpotter) on synthetic WAV fixtures
+# Run: python -m pytest test_wake_word.py  (or python test_wake_word.py)
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import wave
+from array import array
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from wake_word import TemplateSpotter, WakeWordGate
+
+RATE = 16000
+# (seconds, amplitude, frequency) "syllables" of the wake word and of other speech
+WAKE = [(0.12, 7000, 300), (0.08, 2500, 2400), (0.18, 6000, 600), (0.10, 3000, 1800)]
+OTHER = [(0.30, 2000, 3000), (0.10, 7000, 200), (0.25, 4000, 1000), (0.15, 2000, 450), (0.20, 7000, 1500)]
+COMMAND = [(0.35, 2000, 3000), (0.35, 7000, 3000), (0.30, 4000, 450)]
+SILENCE = (0.15, 0, 0)
+
+
+def tone_word(syllables, tempo=1.0, gain=1.0, noise=40, seed=0):
+    rnd = random.Random(seed)
+    samples = array('h')
+    for seconds, amp, freq in syllables:
+        n = int(seconds * tempo * RATE)
+        samples.extend(max(-32768, min(32767, int(amp * gain * math.sin(2 * math.pi * freq * i / RATE))
+                                       + rnd.randint(-noise, noise))) for i in range(n))
+    return samples.tobytes()
+
+
+class Audio:
+    """The sr.AudioData fields the gate reads and builds."""
+
+    def __init__(self, frame_data, sample_rate=RATE, sample_width=2):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    @property
+    def seconds(self):
+        return len(self.frame_data) / float(self.sample_rate * self.sample_width)
+
+
+def spotter():
+    return TemplateSpotter([(tone_word([SILENCE] + WAKE + [SILENCE], seed=i), RATE, 2) for i in range(3)])
+
+
+def gate(**kwargs):
+    g = WakeWordGate([spotter()], audio_factory=Audio, **kwargs)
+    g.spotter = g.spotters[0]
+    return g
+
+
+def phrase(syllables, seed, tempo=1.0, gain=1.0):
+    return Audio(tone_word([SILENCE] + syllables + [SILENCE], tempo=tempo, gain=gain, seed=seed))
+
+
+def test_spotter_accepts_the_wake_word_and_rejects_other_speech():
+    s = spotter()
+    for i, (tempo, gain) in enumerate([(1.0, 1.0), (0.9, 0.7), (1.1, 1.3)]):
+        audio = phrase(WAKE, 100 + i, tempo, gain)
+        end = s.detect(audio.frame_data, RATE, 2)
+        assert end is not None and 0.4 < end < audio.seconds
+    for i in range(5):
+        audio = phrase(OTHER[i:] + OTHER[:i], 200 + i)
+        assert s.detect(audio.frame_data, RATE, 2) is None
+
+
+def test_wake_word_and_command_in_one_breath():
+    g = gate(awake_seconds=0)
+    wake_only = phrase(WAKE, 1).seconds
+    audio = phrase(WAKE + [SILENCE] + COMMAND, 2)
+    rest = g.filter(audio)
+    assert rest is not None
+    # only the part after the wake word is recognized
+    assert audio.seconds - wake_only - 0.2 < rest.seconds < audio.seconds - 0.4
+    assert g.stats['wake_hits'] == 1 and g.stats['wake_only'] == 0
+
+
+def test_wake_word_alone_opens_the_gate():
+    woke = []
+    g = gate(awake_seconds=0.3, on_wake=lambda: woke.append(True))
+    assert g.filter(phrase(WAKE, 3)) is None
+    assert woke == [True] and g.awake
+    command = phrase(COMMAND, 4)
+    assert g.filter(command) is command  # passes without the name while awake
+    time.sleep(0.35)
+    assert not g.awake
+    assert g.filter(phrase(COMMAND, 5)) is None
+    assert g.stats['passed_awake'] == 1 and g.stats['rejected'] == 1
+
+
+def test_other_speech_is_dropped():
+    g = gate()
+    assert all(g.filter(phrase(OTHER[i:] + OTHER[:i], 300 + i)) is None for i in range(5))
+    assert g.stats['rejected'] == 5 and g.stats['wake_hits'] == 0
+
+
+def test_without_a_usable_spotter_everything_passes():
+    root = tempfile.mkdtemp(prefix='io_test_wake_')
+    try:
+        templates = TemplateSpotter()
+        g = WakeWordGate([templates], audio_factory=Audio)
+        assert not g.configure('جارویس')  # no recordings of this name
+        assert not g.active
+        audio = phrase(OTHER, 6)
+        assert g.filter(audio) is audio and g.stats['passed_ungated'] == 1
+        # enrolled recordings under <directory>/<name>/ make it active
+        folder = os.path.join(root, 'جارویس')
+        os.makedirs(folder)
+        with wave.open(os.path.join(folder, 'take1.wav'), 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(RATE)
+            w.writeframes(tone_word([SILENCE] + WAKE + [SILENCE], seed=7))
+        assert templates.configure('جارویس', directory=root)
+        g.spotter = templates
+        assert g.filter(phrase(OTHER, 8)) is None
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def test_failing_spotter_passes_the_phrase_through():
+    class Broken:
+        def configure(self, name):
+            return True
+
+        def detect(self, raw, rate, width):
+            raise RuntimeError('model crashed')
+
+    g = WakeWordGate([Broken()], audio_factory=Audio)
+    assert g.configure('io')
+    audio = phrase(COMMAND, 9)
+    assert g.filter(audio) is audio
+
+
+def test_wrap_gates_a_capture_callable():
+    phrases = [phrase(OTHER, 10), phrase(WAKE + [SILENCE] + COMMAND, 11), None]
+    g = gate(awake_seconds=0)
+    capture = g.wrap(lambda timeout: phrases.pop(0))
+    assert capture(0.5) is None
+    assert capture(0.5) is not None
+    assert capture(0.5) is None
+    assert g.stats['phrases'] == 2
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
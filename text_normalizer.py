@@ -0,0 +1,74 @@
+"""Single-pass Persian/English query normalization shared by every matcher.
+
+normalize_query() runs once per utterance (memoized for repeats) and returns
+a NormalizedQuery: a str holding the folded text, plus the original text and
+a token list with offsets. Because it *is* a str, plugins and handlers that
+expect a plain query string keep working while reusing the folded form.
+
+Folding rules (normalize_text):
+- lowercase
+- Arabic yeh/alef maksura -> Persian yeh, Arabic kaf -> Persian kaf, teh marbuta -> heh
+- ZWNJ (half-space, as in "بی‌صدا") -> space; ZWJ, tatweel and diacritics removed
+- Persian and Arabic-Indic digits -> ASCII digits ("۵ درصد" == "5 درصد")
+- runs of whitespace collapsed to one space, ends stripped
+
+Every phrase table (intent index, fuzzy index, emotion words) is folded with
+the same function, so queries and vocabulary always compare like with like.
+"""
+from __future__ import annotations
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+_FOLD = {
+    '\u064a': '\u06cc', '\u0649': '\u06cc',  # Arabic yeh / alef maksura -> Persian yeh (ی)
+    '\u0643': '\u06a9',  # Arabic kaf -> Persian kaf (ک)
+    '\u0629': '\u0647', '\u06c0': '\u0647',  # teh marbuta / heh with yeh -> heh (ه)
+    '\u200c': ' ',  # ZWNJ (half-space)
+    '\u200d': None, '\u200e': None, '\u200f': None, '\u0640': None,  # ZWJ, LRM, RLM, tatweel
+}
+_FOLD.update({chr(c): None for c in range(0x064B, 0x0660)})  # harakat
+_FOLD['\u0670'] = None  # superscript alef
+_FOLD.update({chr(0x06F0 + d): str(d) for d in range(10)})  # Persian digits
+_FOLD.update({chr(0x0660 + d): str(d) for d in range(10)})  # Arabic-Indic digits
+_TABLE = str.maketrans(_FOLD)
+
+_TOKEN_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+Token = namedtuple('Token', 'text start end')
+
+
+def normalize_text(text) -> str:
+    """Fold characters, digits and whitespace (see module docstring)."""
+    return ' '.join(str(text or '').lower().translate(_TABLE).split())
+
+
+class NormalizedQuery(str):
+    """Folded query text (the str value) with `.raw` and `.tokens` attached."""
+
+    def __new__(cls, raw):
+        raw = '' if raw is None else str(raw)
+        self = super().__new__(cls, normalize_text(raw))
+        self.raw = raw
+        self.tokens = tuple(Token(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(self))
+        return self
+
+    @property
+    def words(self) -> list:
+        return [t.text for t in self.tokens]
+
+
+@lru_cache(maxsize=1024)
+def _normalize_cached(raw: str) -> NormalizedQuery:
+    return NormalizedQuery(raw)
+
+
+def normalize_query(query) -> NormalizedQuery:
+    """Return the NormalizedQuery for query (memoized; already-normalized input is returned as-is)."""
+    if isinstance(query, NormalizedQuery):
+        return query
+    return _normalize_cached('' if query is None else str(query))
+
+
+def cache_info():
+    return _normalize_cached.cache_info()
@@ -0,0 +1,260 @@
+"""Content-addressed disk cache for synthesized speech.
+
+Online TTS rendered every utterance with a fresh gTTS request into a temp
+mp3 that was deleted after playback, so fixed replies ("صدا کم شد.",
+"موزیک متوقف شد.", the wishme() greetings) went over the network every
+time. TTSCache keeps the rendered audio under ../cache/tts, one file per
+sha256(text, lang, rate, backend):
+
+    cache = TTSCache()
+    path = cache.fetch(cache_key(text, 'fa', None, 'gtts'), lambda: synthesize(text))
+    audio = path.read_bytes()                 # or fetch_bytes() for memory-first playback
+
+- writes are atomic (temp file in the cache directory + os.replace), so a
+  crash or a concurrent reader never sees half a file
+- the total size is capped; the least recently used files are evicted
+  (recency survives restarts through the files' mtimes)
+- concurrent fetches of the same key synthesize once
+- warm([(key, text), ...], synthesize) pre-renders phrases on a thread pool
+- fetch_bytes() serves playback from memory: recently played audio is kept
+  in a small in-memory LRU (`memory_bytes`) and a fresh render is handed
+  back at once while its disk copy is written on a background thread
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / 'cache' / 'tts'
+
+_logger = logging.getLogger('io.tts_cache')
+
+
+def cache_key(text, lang, rate, backend) -> str:
+    raw = '\x1f'.join(str(part) for part in (text, (lang or '').lower(), rate if rate is not None else '', backend))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes: int = 64 * 1024 * 1024, suffix: str = '.mp3',
+                 memory_bytes: int = 4 * 1024 * 1024) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._memory: OrderedDict = OrderedDict()  # key -> bytes of recently played audio
+        self._memory_size = 0
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._entries: Optional[OrderedDict] = None  # key -> size, least recently used first
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'synth_seconds': 0.0, 'errors': 0}
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f'{key}{self.suffix}'
+
+    def _index(self) -> OrderedDict:
+        """Scan the directory once; later changes are tracked in memory."""
+        if self._entries is None:
+            found = []
+            try:
+                for p in self.directory.glob(f'*{self.suffix}'):
+                    try:
+                        st = p.stat()
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, p.name[:-len(self.suffix)], st.st_size))
+            except OSError:
+                pass
+            found.sort()
+            self._entries = OrderedDict((key, size) for _mtime, key, size in found)
+            self._bytes = sum(self._entries.values())
+        return self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index())
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            self._index()
+            return self._bytes
+
+    def get(self, key: str) -> Optional[Path]:
+        """Path of the cached audio (marked as recently used), or None."""
+        with self._lock:
+            entries = self._index()
+            if key not in entries:
+                return None
+            path = self.path_for(key)
+            if not path.exists():  # removed behind our back
+                self._bytes -= entries.pop(key)
+                return None
+            entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        """Store data atomically under key and evict old entries beyond the size cap."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        fd, tmp = tempfile.mkstemp(prefix='.tts.', suffix='.part', dir=str(self.directory))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            entries = self._index()
+            self._bytes -= entries.pop(key, 0)
+            entries[key] = len(data)
+            self._bytes += len(data)
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        entries = self._entries
+        while self._bytes > self.max_bytes and len(entries) > 1:
+            key, size = next(iter(entries.items()))
+            if key == keep:
+                entries.move_to_end(key)
+                continue
+            del entries[key]
+            self._bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _synthesize(self, key: str, synthesize: Callable[[], bytes]) -> bytes:
+        self.stats['misses'] += 1
+        start = time.perf_counter()
+        data = synthesize()
+        self.stats['synth_seconds'] += time.perf_counter() - start
+        return data
+
+    def fetch(self, key: str, synthesize: Callable[[], bytes]) -> Path:
+        """Cached path for key, synthesizing (once, even with concurrent callers) on a miss."""
+        path = self.get(key)
+        if path is not None:
+            self.stats['hits'] += 1
+            return path
+        with self._key_lock(key):
+            path = self.get(key)
+            if path is not None:
+                self.stats['hits'] += 1
+                return path
+            path = self.put(key, self._synthesize(key, synthesize))
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return path
+
+    # --- in-memory tier ------------------------------------------------------------
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+                _key, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Cached audio bytes (from memory, else read from disk once), or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+        if data is not None:
+            return data
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def fetch_bytes(self, key: str, synthesize: Callable[[], bytes]) -> bytes:
+        """Like fetch(), but returns the audio itself; a fresh render is written to disk in the background."""
+        data = self.load(key)
+        if data is not None:
+            self.stats['hits'] += 1
+            return data
+        with self._key_lock(key):
+            data = self.load(key)
+            if data is not None:
+                self.stats['hits'] += 1
+                return data
+            data = self._synthesize(key, synthesize)
+            self._remember(key, data)
+        with self._lock:
+            self._key_locks.pop(key, None)
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='io-tts-cache')
+            writer = self._writer
+        writer.submit(self._persist, key, data)
+        return data
+
+    def _persist(self, key: str, data: bytes) -> None:
+        try:
+            self.put(key, data)
+        except Exception:
+            _logger.exception('Writing %s to the TTS cache failed', key[:12])
+            self.stats['errors'] += 1
+
+    def flush(self) -> None:
+        """Wait for background cache writes (shutdown, tests)."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+    def warm(self, items: Iterable[tuple], synthesize: Callable, workers: int = 4) -> dict:
+        """Pre-render (key, text) items with synthesize(text) -> bytes on a thread pool; returns counts."""
+        items = list(items)
+        todo = [(key, text) for key, text in items if self.get(key) is None]
+        done = {'cached': len(items) - len(todo), 'rendered': 0, 'failed': 0}
+
+        def render(item):
+            key, text = item
+            try:
+                self.fetch(key, lambda: synthesize(text))
+                return True
+            except Exception:
+                _logger.exception('Pre-rendering %r failed', text)
+                self.stats['errors'] += 1
+                return False
+
+        if todo:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='io-tts-warm') as pool:
+                for ok in pool.map(render, todo):
+                    done['rendered' if ok else 'failed'] += 1
+        return done
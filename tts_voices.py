@@ -0,0 +1,118 @@
+"""Installed TTS voices, probed once per engine.
+
+speak() decided between the local engine and online TTS by calling
+engine.getProperty('voices') and scanning every voice's id and name for a
+Persian marker on each call, and engine setup ran the same scan to pick the
+voice. VoiceRegistry probes the engine once (again only when the engine is
+re-created) and keeps, per language:
+
+- whether any installed voice speaks it
+- the preferred voice id (the first one found)
+
+so the per-utterance routing decision is a dict lookup:
+
+    VOICES.probe(engine)              # in engine init
+    VOICES.has('fa-IR')               # -> bool
+    VOICES.preferred('fa')            # -> voice id or None
+
+A voice's languages come from its `languages` attribute when the driver
+fills it, plus language markers found as whole tokens in its id and name
+("TTS_MS_FA-IR_...", "persian"), so "default" no longer counts as Persian.
+"""
+from __future__ import annotations
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+_logger = logging.getLogger('io.voices')
+
+# language code -> tokens that mark a voice as speaking it
+LANGUAGE_MARKERS = {
+    'fa': ('fa', 'farsi', 'persian', 'iran'),
+    'en': ('en', 'english'),
+    'ar': ('ar', 'arabic'),
+}
+
+_TOKEN = re.compile(r'[a-z]+')
+
+
+def _text(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode(errors='ignore')
+    return '' if value is None else str(value)
+
+
+def language_key(lang) -> str:
+    """'fa-IR' / 'fa_IR' / 'FA' -> 'fa'."""
+    return re.split(r'[-_]', str(lang or '').strip().lower(), 1)[0]
+
+
+class VoiceRegistry:
+    def __init__(self, markers: Optional[dict] = None) -> None:
+        self.markers = markers or LANGUAGE_MARKERS
+        self._by_language: dict[str, list[str]] = {}
+        self._voices: list[tuple[str, str]] = []
+        self.default: Optional[str] = None
+        self.probes = 0
+        self.probe_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def languages_of(self, voice) -> set:
+        """Language keys one voice speaks."""
+        found = set()
+        langs = getattr(voice, 'languages', None) or ()
+        if isinstance(langs, (str, bytes)):
+            langs = [langs]
+        for lang in langs:
+            key = language_key(_text(lang).lstrip('\x05'))  # espeak prefixes a priority byte
+            if key:
+                found.add(key)
+        tokens = set(_TOKEN.findall(f"{_text(getattr(voice, 'id', ''))} {_text(getattr(voice, 'name', ''))}".lower()))
+        for key, marks in self.markers.items():
+            if tokens.intersection(marks):
+                found.add(key)
+        return found
+
+    def probe(self, engine) -> 'VoiceRegistry':
+        """Scan the engine's voices once; call again after the engine is re-created."""
+        start = time.perf_counter()
+        try:
+            voices = engine.getProperty('voices')
+        except Exception:
+            _logger.exception('Listing TTS voices failed')
+            voices = None
+        if voices is None:
+            voices = []
+        elif isinstance(voices, (str, bytes)) or not hasattr(voices, '__iter__'):
+            voices = [voices]
+        by_language: dict[str, list[str]] = {}
+        listed = []
+        for voice in voices:
+            voice_id = _text(getattr(voice, 'id', None))
+            listed.append((voice_id, _text(getattr(voice, 'name', ''))))
+            for key in self.languages_of(voice):
+                by_language.setdefault(key, []).append(voice_id)
+        with self._lock:
+            self._by_language = by_language
+            self._voices = listed
+            self.default = listed[0][0] if listed else None
+            self.probes += 1
+            self.probe_seconds += time.perf_counter() - start
+        _logger.debug('Probed %d TTS voices; languages: %s', len(listed), sorted(by_language))
+        return self
+
+    def has(self, lang) -> bool:
+        return language_key(lang) in self._by_language
+
+    def preferred(self, lang) -> Optional[str]:
+        ids = self._by_language.get(language_key(lang))
+        return ids[0] if ids else None
+
+    def languages(self) -> dict:
+        """{language key: number of voices}."""
+        return {key: len(ids) for key, ids in self._by_language.items()}
+
+    def __len__(self) -> int:
+        return len(self._voices)
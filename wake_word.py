@@ -0,0 +1,316 @@
+"""Local wake-word gate in front of speech recognition.
+
+Every segment above the energy threshold used to go to full recognition; in
+a noisy room that meant a stream of recognizer calls and "متاسفم، متوجه
+نشدم" retries. WakeWordGate runs a cheap keyword spotter on the raw frames
+of each captured phrase and only lets audio through after a wake hit:
+
+- "<name> ساعت چنده" in one breath: the audio after the name is recognized
+- "<name>" alone: the gate opens for `awake_seconds`, and the next phrase(s)
+  pass without the name (each passed phrase extends the window)
+- anything else is dropped before it reaches a recognizer backend
+
+The keyword comes from load_name() and follows set_name() (gate.configure).
+When no spotter can handle the name the gate passes everything through.
+Spotters, tried in this order:
+
+TemplateSpotter
+    language independent, so it works for Persian names. A few recordings of
+    the name (config/wake/<name>/*.wav) are matched against the start of each
+    phrase with open-end DTW over per-10 ms log energy and zero-crossing
+    rate. Cost is about 10 ms of CPU per phrase.
+VoskSpotter
+    the local Vosk model restricted to a grammar of just the name, for names
+    the model's vocabulary knows.
+
+benchmarks.py wake_word measures false-accept / false-reject rates and CPU
+cost on WAV fixtures.
+"""
+from __future__ import annotations
+import json
+import logging
+import math
+import threading
+import time
+import wave
+from array import array
+from pathlib import Path
+from typing import Callable, Optional
+
+from lazy_imports import lazy_import
+from listener import audioop, rms
+from text_normalizer import normalize_text
+
+sr = lazy_import('speech_recognition')
+vosk = lazy_import('vosk')
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / 'config' / 'wake'
+
+_logger = logging.getLogger('io.wake')
+
+FRAME_SECONDS = 0.010
+
+
+def zero_crossings(data: bytes, width: int) -> int:
+    if audioop is not None:
+        return audioop.cross(data, width)
+    samples = array('h', data[:len(data) - len(data) % 2]) if width == 2 else array('h')
+    return sum(1 for a, b in zip(samples, samples[1:]) if (a < 0) != (b < 0))
+
+
+def features(raw: bytes, sample_rate: int, sample_width: int, max_seconds: Optional[float] = None) -> list:
+    """Per-10 ms (log energy, zero-crossing rate) frames, normalized to zero mean / unit variance."""
+    step = max(1, int(sample_rate * FRAME_SECONDS)) * sample_width
+    end = len(raw) if max_seconds is None else min(len(raw), int(max_seconds * sample_rate) * sample_width)
+    frames = []
+    for pos in range(0, end - step + 1, step):
+        chunk = raw[pos:pos + step]
+        frames.append((math.log(rms(chunk, sample_width) + 1.0), zero_crossings(chunk, sample_width) / (step / sample_width)))
+    if not frames:
+        return []
+    dims = len(frames[0])
+    means = [sum(f[d] for f in frames) / len(frames) for d in range(dims)]
+    stds = [math.sqrt(sum((f[d] - means[d]) ** 2 for f in frames) / len(frames)) or 1.0 for d in range(dims)]
+    return [tuple((f[d] - means[d]) / stds[d] for d in range(dims)) for f in frames]
+
+
+def open_end_dtw(template: list, query: list, band: float = 0.5) -> tuple:
+    """Best (normalized distance, end frame) aligning all of template with a prefix of query."""
+    n, m = len(template), len(query)
+    if not n or not m:
+        return math.inf, 0
+    inf = math.inf
+    prev = [inf] * (m + 1)
+    prev[0] = 0.0
+    # the prefix may be shorter or longer than the template by `band`
+    width = max(1, int(n * band))
+    for i in range(1, n + 1):
+        cur = [inf] * (m + 1)
+        t = template[i - 1]
+        lo, hi = max(1, i - width), min(m, i + width)
+        for j in range(lo, hi + 1):
+            q = query[j - 1]
+            cost = sum(abs(a - b) for a, b in zip(t, q))
+            best = prev[j - 1]
+            if prev[j] < best:
+                best = prev[j]
+            if cur[j - 1] < best:
+                best = cur[j - 1]
+            cur[j] = cost + best
+        prev = cur
+    best_d, best_j = inf, 0
+    for j in range(1, m + 1):
+        d = prev[j] / (n + j)
+        if d < best_d:
+            best_d, best_j = d, j
+    return best_d, best_j
+
+
+def _read_wav(path) -> tuple:
+    with wave.open(str(path), 'rb') as w:
+        return w.readframes(w.getnframes()), w.getframerate(), w.getsampwidth()
+
+
+def _voice_start(raw: bytes, sample_width: int, frame: int = 320) -> int:
+    """Byte offset where the first non-silent frame starts (0 when nothing stands out)."""
+    step = frame * sample_width
+    levels = [rms(raw[p:p + step], sample_width) for p in range(0, len(raw), step)]
+    if not levels:
+        return 0
+    floor = max(levels) * 0.1
+    return next((i * step for i, v in enumerate(levels) if v > floor), 0)
+
+
+class TemplateSpotter:
+    """Matches enrolled recordings of the wake word against the start of each phrase."""
+
+    def __init__(self, templates=(), threshold: float = 0.4, search_seconds: float = 2.0) -> None:
+        self.threshold = threshold
+        self.search_seconds = search_seconds
+        self.templates: list = []
+        for raw, rate, width in templates:
+            self.add_template(raw, rate, width)
+
+    def add_template(self, raw: bytes, sample_rate: int, sample_width: int) -> None:
+        # leading silence is dropped from templates and phrases alike; the pause after the
+        # name stays in the template so the per-recording normalization matches the phrase
+        feats = features(raw[_voice_start(raw, sample_width):], sample_rate, sample_width)
+        if feats:
+            self.templates.append(feats)
+
+    def configure(self, name: str, directory=TEMPLATES_DIR) -> bool:
+        """Load config/wake/<name>/*.wav; returns False when there are no recordings for that name."""
+        folder = Path(directory) / normalize_text(name)
+        self.templates = []
+        for path in sorted(folder.glob('*.wav')) if folder.is_dir() else ():
+            try:
+                self.add_template(*_read_wav(path))
+            except Exception:
+                _logger.exception('Bad wake-word template %s', path)
+        return bool(self.templates)
+
+    def available(self) -> bool:
+        return bool(self.templates)
+
+    def detect(self, raw: bytes, sample_rate: int, sample_width: int) -> Optional[float]:
+        """Seconds into the audio where the wake word ends, or None."""
+        if not self.templates:
+            return None
+        start = _voice_start(raw[:int(self.search_seconds * sample_rate) * sample_width], sample_width)
+        query = features(raw[start:], sample_rate, sample_width, self.search_seconds)
+        best_d, best_end = math.inf, 0
+        for template in self.templates:
+            d, end = open_end_dtw(template, query)
+            if d < best_d:
+                best_d, best_end = d, end
+        if best_d > self.threshold:
+            return None
+        return start / float(sample_rate * sample_width) + best_end * FRAME_SECONDS
+
+
+class VoskSpotter:
+    """The local Vosk model constrained to a one-word grammar: the assistant's name."""
+
+    sample_rate = 16000
+
+    def __init__(self, model_path=None, search_seconds: float = 2.0) -> None:
+        self.model_path = Path(model_path) if model_path else None
+        self.search_seconds = search_seconds
+        self.words: list = []
+        self._model = None
+        self._lock = threading.Lock()
+
+    def configure(self, name: str) -> bool:
+        """Use `name` as the grammar; False unless the model is present and knows every word of it."""
+        self.words = [w for w in normalize_text(name).split() if w]
+        if not self.available():
+            return False
+        model = self._get_model()
+        # words outside the vocabulary are dropped from the grammar and would never be spotted
+        find = getattr(model, 'find_word', None)
+        return find is None or all(find(w) >= 0 for w in self.words)
+
+    def available(self) -> bool:
+        if not self.words or self.model_path is None or not self.model_path.is_dir():
+            return False
+        try:
+            vosk.Model  # noqa: B018 - triggers the lazy import
+        except ImportError:
+            return False
+        return True
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = vosk.Model(str(self.model_path))
+            return self._model
+
+    def detect(self, raw: bytes, sample_rate: int, sample_width: int) -> Optional[float]:
+        model = self._get_model()
+        audio = sr.AudioData(raw[:int(self.search_seconds * sample_rate) * sample_width], sample_rate, sample_width)
+        grammar = json.dumps([' '.join(self.words), '[unk]'], ensure_ascii=False)
+        recognizer = vosk.KaldiRecognizer(model, self.sample_rate, grammar)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        result = json.loads(recognizer.FinalResult())
+        hits = [w for w in result.get('result', []) if w.get('word') in self.words]
+        return float(hits[-1]['end']) if hits else None
+
+
+class WakeWordGate:
+    """Wraps a capture callable so only audio after a wake hit reaches recognition.
+
+    `spotters` are tried in order by configure(name); the first one that can
+    spot that name is used. With none usable the gate passes everything
+    through, exactly like running without it.
+    """
+
+    def __init__(self, spotters=(), awake_seconds: float = 8.0, min_command_seconds: float = 0.4,
+                 on_wake: Optional[Callable] = None, audio_factory: Optional[Callable] = None) -> None:
+        self.spotters = list(spotters)
+        self.spotter = None
+        self.name: Optional[str] = None
+        self.awake_seconds = awake_seconds
+        self.min_command_seconds = min_command_seconds
+        self.on_wake = on_wake
+        self.audio_factory = audio_factory
+        self.awake_until = 0.0
+        self.stats = {'phrases': 0, 'passed_awake': 0, 'passed_ungated': 0, 'wake_hits': 0, 'wake_only': 0,
+                      'rejected': 0, 'spot_seconds': 0.0}
+
+    def configure(self, name: str) -> bool:
+        """Spot `name` from now on; returns False (and gates nothing) when no spotter supports it."""
+        self.name = name
+        self.spotter = None
+        for spotter in self.spotters:
+            try:
+                if spotter.configure(name):
+                    self.spotter = spotter
+                    break
+            except Exception:
+                _logger.exception('Configuring wake-word spotter %s failed', type(spotter).__name__)
+        if self.spotter is None:
+            _logger.info('No wake-word spotter for %r; every phrase goes to recognition', name)
+        else:
+            _logger.info('Wake word %r spotted by %s', name, type(self.spotter).__name__)
+        return self.spotter is not None
+
+    @property
+    def active(self) -> bool:
+        return self.spotter is not None
+
+    @property
+    def awake(self) -> bool:
+        """Inside the window after a wake hit, when phrases pass without the name."""
+        return time.monotonic() < self.awake_until
+
+    def wrap(self, capture: Callable) -> Callable:
+        def gated(timeout=None):
+            audio = capture(timeout)
+            return None if audio is None else self.filter(audio)
+        return gated
+
+    def filter(self, audio):
+        """Return the audio to recognize (possibly with the wake word cut off), or None to drop it."""
+        self.stats['phrases'] += 1
+        spotter = self.spotter
+        if spotter is None:
+            self.stats['passed_ungated'] += 1
+            return audio
+        now = time.monotonic()
+        if now < self.awake_until:
+            self.awake_until = now + self.awake_seconds
+            self.stats['passed_awake'] += 1
+            return audio
+        raw, rate, width = audio.frame_data, audio.sample_rate, audio.sample_width
+        start = time.process_time()
+        try:
+            end = spotter.detect(raw, rate, width)
+        except Exception:
+            _logger.exception('Wake-word spotting failed; passing the phrase through')
+            return audio
+        finally:
+            self.stats['spot_seconds'] += time.process_time() - start
+        if end is None:
+            self.stats['rejected'] += 1
+            return None
+        self.stats['wake_hits'] += 1
+        self.awake_until = now + self.awake_seconds
+        rest = raw[int(end * rate) * width:]
+        if len(rest) / float(rate * width) < self.min_command_seconds:
+            self.stats['wake_only'] += 1
+            if self.on_wake is not None:
+                try:
+                    self.on_wake()
+                except Exception:
+                    _logger.exception('Wake callback failed')
+            return None
+        factory = self.audio_factory or sr.AudioData
+        return factory(rest, rate, width)
+
+
+def gate_for(name: str, vosk_model=None, **kwargs) -> WakeWordGate:
+    """Gate for the assistant name: enrolled templates first, then the Vosk grammar spotter."""
+    gate = WakeWordGate([TemplateSpotter(), VoskSpotter(vosk_model)], **kwargs)
+    gate.configure(name)
+    return gate